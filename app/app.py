@@ -3,13 +3,10 @@
 
 # ========== Standard Libraries ==========
 import os
-import io
-import json
 import time
 import logging
-from io import StringIO
+import pickle
 from pathlib import Path
-import datetime
 
 from werkzeug.middleware.proxy_fix import ProxyFix
 
@@ -21,62 +18,26 @@ from dash import Input, Output, State, ctx, html, MATCH
 from dash.exceptions import PreventUpdate
 
 import pandas as pd
-import geopandas as gpd
 import boto3
 import psutil
 from dotenv import load_dotenv
 
-from shapely.geometry import Polygon
-from h3.api.basic_int import cell_to_boundary
-
 # ========== Custom Modules ==========
 
 from callbacks import callbacks_emissions
 from callbacks import callbacks_waiting
 from callbacks import callbacks_energy
 from callbacks import callbacks_explorer
-from charts.charts_energy import get_country_name
+from data_utils.map_processing import CellGeometryCache
+from data_utils.s3_cache import S3ObjectCache, added_partitions
+from data_utils.schemas import dataset_schemas, history_filter
+from data_utils.preprocessing import extend_state
+from data_utils.registry import DataNotReady, DataRegistry
+from data_utils.snapshot import build_snapshot, load_snapshot
 import routes
 
 import layout
 
-PRIORITY_VESSEL_TYPES = [
-    "Bulk Carrier",
-    "Container",
-    "Oil tanker",
-    "Chemical tanker",
-    "Liquified gas tanker",
-]
-
-PRIORITY_STOP_AREAS = [
-    "PPC Balboa",
-    "MIT",
-    "Panama Canal South Transit",
-    "Panama Canal North Transit",
-]
-
-
-def reorder_with_priority(options, priority):
-    """Reorder options placing priority items first.
-
-    Parameters
-    ----------
-    options : iterable
-        Original option values.
-    priority : list
-        Values that should appear first if present in ``options``.
-
-    Returns
-    -------
-    list
-        Reordered list with priority values leading.
-    """
-    options = list(options)
-    priority_items = [p for p in priority if p in options]
-    remaining = [o for o in options if o not in priority_items]
-    return priority_items + remaining
-
-
 # ========================== LOGS CONFIGURATION ==========================
 
 # Configure logging to show up in nohup.out
@@ -125,6 +86,28 @@ bucket_name = os.getenv("bucket_name")
 file_name_emissions = os.getenv("file_name_emissions")
 file_name_waiting = os.getenv("file_name_waiting")
 file_name_energy = os.getenv("file_name_energy")
+# Optional S3-compatible endpoint (e.g. a local stand-in) and local download
+# cache; set S3_CACHE_DIR to an empty string to read from S3 in place
+s3_endpoint_url = os.getenv("S3_ENDPOINT_URL") or None
+s3_cache_dir = os.getenv("S3_CACHE_DIR", str(Path(__file__).resolve().parent / ".cache" / "s3")) or None
+# H3 cell boundaries kept across restarts; empty to compute them in memory
+h3_geometry_cache = os.getenv(
+    "H3_GEOMETRY_CACHE", str(Path(__file__).resolve().parent / ".cache" / "h3_boundaries.npz")
+) or None
+# Threads used to fetch and preprocess the datasets at startup
+startup_workers = int(os.getenv("STARTUP_WORKERS", "4"))
+# Prebuilt serving snapshot (see data_utils/snapshot.py); built live when unset
+serving_snapshot = os.getenv("SERVING_SNAPSHOT")
+# Seconds between checks for new source data; 0 disables hot reloads
+data_reload_interval = float(os.getenv("DATA_RELOAD_INTERVAL", "0"))
+# Load the datasets in the background after startup instead of before serving
+lazy_data_loading = os.getenv("LAZY_DATA_LOADING", "true").lower() == "true"
+# Seconds a callback waits for the first load before leaving its outputs as they are
+data_wait_timeout = float(os.getenv("DATA_WAIT_TIMEOUT", "20"))
+# Weight waiting/service time means by the number of vessels behind each row
+weight_waiting_by_sample_size = os.getenv("WEIGHT_WAITING_BY_SAMPLE_SIZE", "false").lower() == "true"
+# Earliest year loaded from the datasets; older rows are skipped while reading
+data_start_year = int(os.getenv("DATA_START_YEAR")) if os.getenv("DATA_START_YEAR") else None
 
 # ========================== 2️⃣ DATABASE CONNECTION ==========================
 
@@ -133,8 +116,14 @@ file_name_energy = os.getenv("file_name_energy")
 s3_client = boto3.client(
     "s3",
     aws_access_key_id=access_key,
-    aws_secret_access_key=secret_key
+    aws_secret_access_key=secret_key,
+    endpoint_url=s3_endpoint_url,
 )
+s3_cache = S3ObjectCache(s3_client, s3_cache_dir)
+cell_geometry = CellGeometryCache(h3_geometry_cache)
+
+# Rows parsed per chunk when streaming CSV objects
+CSV_CHUNK_ROWS = 100_000
 
 def read_csv_from_s3(bucket, file):
     """Read a CSV file from S3.
@@ -152,318 +141,124 @@ def read_csv_from_s3(bucket, file):
         Loaded DataFrame.
     """
     obj = s3_client.get_object(Bucket=bucket, Key=file)
-    data = obj['Body'].read().decode('utf-8')
-    return pd.read_csv(StringIO(data))
-
-def read_parquet_from_s3(bucket, file):
-    """Read a Parquet file from S3.
-
-    Parameters
-    ----------
-    bucket : str
-        S3 bucket name.
-    file : str
-        Object key within the bucket.
-
-    Returns
-    -------
-    pandas.DataFrame
-        Loaded DataFrame.
-    """
-    obj = s3_client.get_object(Bucket=bucket, Key=file)
-    data = obj['Body'].read()
-    return pd.read_parquet(io.BytesIO(data))
-
-def prepare_emissions_controls(df):
-    """Build control options for the emissions tab.
-
-    Parameters
-    ----------
-    df : pandas.DataFrame
-        Emissions data including ``StandardVesselType`` and ``year_month``.
-
-    Returns
-    -------
-    dict
-        Dictionary of control values such as vessel types and date range info.
-    """
-
-    # Vessel types
-    vessel_types = reorder_with_priority(
-        df['StandardVesselType'].unique(), PRIORITY_VESSEL_TYPES
-    )
-
-    # Date slider values
-    unique_year_months = sorted(df["year_month"].unique())
-    year_month_map = {ym: i for i, ym in enumerate(unique_year_months)}
-    index_to_year_month = {i: ym for ym, i in year_month_map.items()}
-    min_index = min(year_month_map.values())
-    max_index = max(year_month_map.values())
-    # Set default start date to 2022-01 instead of minimum value
-    default_start_ym = 202301  # 2022-01
-    if default_start_ym in year_month_map:
-        default_start_index = year_month_map[default_start_ym]
-    else:
-        # If 2022-01 doesn't exist, find the closest date after it
-        available_dates = [ym for ym in unique_year_months if ym >= default_start_ym]
-        if available_dates:
-            default_start_index = year_month_map[min(available_dates)]
-        else:
-            # Fallback to minimum if no dates after 2022-01
-            default_start_index = min_index
-
-    return {
-        "vessel_types": vessel_types,
-        "date_range": {
-            "min_index": min_index,
-            "max_index": max_index,
-            "default_start_index": default_start_index,  # New field for default start
-            "unique_year_months": unique_year_months,
-            "index_to_year_month": index_to_year_month,
-        }
-    }
-
-def prepare_waiting_time_controls(df):
-    """Build control options for waiting time and service time tabs.
+    # Parse straight from the response stream in chunks instead of holding
+    # the raw and decoded text next to the frame
+    chunks = pd.read_csv(obj['Body'], encoding='utf-8', chunksize=CSV_CHUNK_ROWS)
+    return pd.concat(chunks, ignore_index=True)
 
-    Parameters
-    ----------
-    df : pandas.DataFrame
-        Waiting/service time data with ``StandardVesselType``, ``stop_area`` and ``year_month``.
+# ========================== 6️⃣ READ & PREPROCESS DATA ==========================
 
-    Returns
-    -------
-    dict
-        Dictionary of control values including vessel types, stop areas and date range info.
-    """
+startup_options = {
+    "weight_waiting_column": "sample_size" if weight_waiting_by_sample_size else None,
+    "start_year": data_start_year,
+}
 
-    # Vessel types
-    vessel_types = reorder_with_priority(
-        df['StandardVesselType'].unique(), PRIORITY_VESSEL_TYPES
-    )
-    stop_area = reorder_with_priority(
-        df['stop_area'].unique(), PRIORITY_STOP_AREAS
-    )
 
-    # Date slider values
-    unique_year_months = sorted(df["year_month"].unique())
-    year_month_map = {ym: i for i, ym in enumerate(unique_year_months)}
-    index_to_year_month = {i: ym for ym, i in year_month_map.items()}
-    min_index = min(year_month_map.values())
-    max_index = max(year_month_map.values())
-    # Set default start date to 2022-01 instead of minimum value
-    default_start_ym = 202301  # 2022-01
-    if default_start_ym in year_month_map:
-        default_start_index = year_month_map[default_start_ym]
-    else:
-        # If 2022-01 doesn't exist, find the closest date after it
-        available_dates = [ym for ym in unique_year_months if ym >= default_start_ym]
-        if available_dates:
-            default_start_index = year_month_map[min(available_dates)]
-        else:
-            # Fallback to minimum if no dates after 2022-01
-            default_start_index = min_index
-
-    return {
-        "vessel_types": vessel_types,
-        "stop_area": stop_area,
-        "date_range": {
-            "min_index": min_index,
-            "max_index": max_index,
-            "default_start_index": default_start_index,  # New field for default start
-            "unique_year_months": unique_year_months,
-            "index_to_year_month": index_to_year_month,
-        }
-    }
-
-def prepare_energy_controls(df):
-    """Build control options for the energy tab.
-
-    Parameters
-    ----------
-    df : pandas.DataFrame
-        Energy demand data with country codes and ``year_week``.
-
-    Returns
-    -------
-    dict
-        Control values for origin/destination countries and date ranges.
-    """
-    # Unique origin and destination countries (use full names for controls)
-    country_before = sorted(df['country_before_name'].unique())
-    country_after = sorted(df['country_after_name'].unique())
-
-    # Maps from country name to ISO-2 code for filtering
-    country_before_map = dict(
-        df[['country_before_name', 'country_before']].drop_duplicates().values
-    )
-    country_after_map = dict(
-        df[['country_after_name', 'country_after']].drop_duplicates().values
-    )
-
-    # Date slider values for year_week
-    unique_year_weeks = sorted(df["year_week"].unique())
-    year_week_map = {yw: i for i, yw in enumerate(unique_year_weeks)}
-    index_to_year_week = {i: yw for yw, i in year_week_map.items()}
-    min_index = min(year_week_map.values())
-    max_index = max(year_week_map.values())
-
-    return {
-        "country_before": country_before,
-        "country_after": country_after,
-        "country_before_map": country_before_map,
-        "country_after_map": country_after_map,
-        "date_range": {
-            "min_index": min_index,
-            "max_index": max_index,
-            "unique_year_week": unique_year_weeks,
-            "index_to_year_week": index_to_year_week,
-        }
-    }
-
-def _yw_to_month(yw: int) -> int:
-    """Convert ``YYYYWW`` integers to ``YYYYMM`` format.
-
-    Parameters
-    ----------
-    yw : int
-        Year-week integer.
+dataset_names = (file_name_emissions, file_name_waiting, file_name_energy)
+# Columns read from each dataset and rows kept while decoding
+dataset_reads = [
+    {"schema": schema, "filters": history_filter(data_start_year)}
+    for schema in dataset_schemas(startup_options["weight_waiting_column"])
+]
 
-    Returns
-    -------
-    int
-        Year-month integer for slider controls.
-    """
-    year = int(str(yw)[:4])
-    week = int(str(yw)[4:])
-    date_val = datetime.date.fromisocalendar(year, week, 1)
-    return int(date_val.strftime("%Y%m"))
 
+def load_sources(previous=None, version=None):
+    """Read the datasets from S3 and build every serving structure.
 
-def prepare_explorer_controls(df_emissions, df_waiting, df_energy):
-    """Assemble control options for the explorer tab.
+    When only new partitions were added since ``previous`` was loaded, just
+    those are read and appended to it; otherwise everything is rebuilt.
 
     Parameters
     ----------
-    df_emissions, df_waiting, df_energy : pandas.DataFrame
-        Datasets used for emissions, waiting/service times and energy.
+    previous : DatasetVersion, optional
+        Version currently served.
+    version : tuple, optional
+        Token of the data at the source, from :func:`probe_sources`.
 
     Returns
     -------
     dict
-        Control metadata including sources and date/week ranges.
+        Serving structures.
     """
-    energy_months = [_yw_to_month(yw) for yw in df_energy["year_week"]]
-    all_months = sorted(
-        set(df_emissions["year_month"]).union(df_waiting["year_month"]).union(energy_months)
+    if previous is not None and previous.version is not None and version is not None:
+        added = [
+            added_partitions(old, new) for old, new in zip(previous.version, version)
+        ]
+        if all(keys is not None for keys in added):
+            try:
+                return extend_state(previous.state, *(
+                    s3_cache.read_dataset(bucket_name, name, keys, **read) if keys else None
+                    for name, keys, read in zip(dataset_names, added, dataset_reads)
+                ), geometry=cell_geometry)
+            except ValueError as error:
+                logger.warning("Cannot append new partitions, rebuilding: %s", error)
+    return build_snapshot(
+        *(
+            lambda name=name, read=read: s3_cache.read_dataset(bucket_name, name, **read)
+            for name, read in zip(dataset_names, dataset_reads)
+        ),
+        weight_waiting_column=startup_options["weight_waiting_column"],
+        max_workers=startup_workers,
+        log=log_step,
+        geometry=cell_geometry,
     )
-    year_month_map = {ym: i for i, ym in enumerate(all_months)}
-    index_to_year_month = {i: ym for ym, i in year_month_map.items()}
-
-    unique_year_weeks = sorted(df_energy["year_week"].unique())
-    year_week_map = {yw: i for i, yw in enumerate(unique_year_weeks)}
-    index_to_year_week = {i: yw for yw, i in year_week_map.items()}
-
-    return {
-        "sources": ["emissions", "waiting_time", "service_time", "energy"],
-        "date_range": {
-            "min_index": min(year_month_map.values()),
-            "max_index": max(year_month_map.values()),
-            "unique_year_months": all_months,
-            "index_to_year_month": index_to_year_month,
-        },
-        "week_range": {
-            "min_index": min(year_week_map.values()) if year_week_map else 0,
-            "max_index": max(year_week_map.values()) if year_week_map else 0,
-            "unique_year_week": unique_year_weeks,
-            "index_to_year_week": index_to_year_week,
-        },
-    }
-
-# ========================== 3️⃣ READ & PREPROCESS DATA ==========================
-
-# ✅ Read the data
-df_emissions = read_parquet_from_s3(bucket_name, file_name_emissions)
-df_emissions["year_month"] = (
-    df_emissions["year"].astype(str) + df_emissions["month"].astype(str).str.zfill(2)
-).astype(int)
-
-# Pre-sort the DataFrame by year_month for better performance in callbacks
-df_emissions = df_emissions.sort_values("year_month").reset_index(drop=True)
-
-# Optimize data types for better memory usage and performance
-df_emissions = df_emissions.astype({
-    "year": "int16",
-    "month": "int8", 
-    "year_month": "int32",
-    "co2_equivalent_t": "float32"
-})
-
-controls_emissions = prepare_emissions_controls(df_emissions)
-
-
-# Read Waiting Time Data
-df_waiting_times = read_parquet_from_s3(bucket_name, file_name_waiting)
-df_waiting_times["year_month"] = (
-    df_waiting_times["year"].astype(str) + df_waiting_times["month"].astype(str).str.zfill(2)
-).astype(int)
-
-controls_waiting_times = prepare_waiting_time_controls(df_waiting_times)
-
-# Read Energy Demand Data
-df_energy_demand = read_parquet_from_s3(bucket_name, file_name_energy)
-df_energy_demand["year_week"] = (
-    df_energy_demand["year"].astype(str) + df_energy_demand["week"].astype(str).str.zfill(2)
-).astype(int)
-df_energy_demand["year_month"] = df_energy_demand.apply(
-    lambda row: int(
-        datetime.date.fromisocalendar(int(row["year"]), int(row["week"]), 1).strftime("%Y%m")
-    ),
-    axis=1,
-)
 
-df_energy_demand["country_before_name"] = df_energy_demand["country_before"].apply(get_country_name)
-df_energy_demand["country_after_name"] = df_energy_demand["country_after"].apply(get_country_name)
 
-controls_energy = prepare_energy_controls(df_energy_demand)
-controls_explorer = prepare_explorer_controls(
-    df_emissions,
-    df_waiting_times,
-    df_energy_demand,
+def probe_sources():
+    """Return the ETags identifying the current version of the S3 datasets."""
+    return tuple(s3_cache.dataset_version(bucket_name, name) for name in dataset_names)
+
+
+def load_serving_snapshot(_previous=None, _version=None):
+    """Load the prebuilt snapshot configured by ``SERVING_SNAPSHOT``."""
+    return load_snapshot(serving_snapshot, options=startup_options)
+
+
+def probe_serving_snapshot():
+    """Return the modification time identifying the current snapshot."""
+    return str(os.stat(serving_snapshot).st_mtime_ns)
+
+
+# ✅ Serve from a prebuilt snapshot when one is configured; loading it only
+# maps the file, so it happens right away
+startup, version = None, None
+if serving_snapshot:
+    try:
+        version = probe_serving_snapshot()
+        startup = load_serving_snapshot()
+        probe, loader = probe_serving_snapshot, load_serving_snapshot
+    except (OSError, ValueError, pickle.UnpicklingError) as error:
+        logger.warning("Ignoring serving snapshot %s: %s", serving_snapshot, error)
+if startup is None:
+    # Otherwise the datasets are fetched and prepared in the background so
+    # the worker serves static pages and health checks immediately; each
+    # step runs as soon as its inputs are ready
+    probe, loader = probe_sources, load_sources
+
+# ✅ Callbacks read the current version from the registry, which waits for
+# the first load and swaps in new data when the poller sees the source change
+data_registry = DataRegistry(
+    startup,
+    version,
+    probe=probe,
+    loader=loader,
+    poll_interval=data_reload_interval,
+    wait_timeout=data_wait_timeout,
 )
-
-# ========================== 5️⃣ MAP PROCESSING ==========================
-
-def h3_to_polygon(h3_index):
-    """Convert an H3 index to a Shapely ``Polygon``.
-
-    Parameters
-    ----------
-    h3_index : int | str
-        H3 index as integer or hexadecimal string.
-
-    Returns
-    -------
-    Polygon
-        Polygon representing the cell.
-    """
-    boundary = cell_to_boundary(h3_index)
-    return Polygon([(lng, lat) for lat, lng in boundary])
-
-
-def generate_unique_polygons(df_with_resolution_id):
-    """Create GeoDataFrame of unique ``resolution_id`` polygons."""
-    unique_ids = df_with_resolution_id[["resolution_id"]].drop_duplicates().copy()
-    unique_ids["geometry"] = unique_ids["resolution_id"].apply(h3_to_polygon)
-    return gpd.GeoDataFrame(unique_ids, geometry="geometry", crs="EPSG:4326")
+# The loading thread starts with a worker's first request, in the process
+# serving it, so workers forked from a preloaded app (gunicorn --preload)
+# each load and poll for themselves. Without lazy loading the first version
+# is loaded here, before any fork, and shared by the workers
+if not lazy_data_loading:
+    data_registry.start()
+    data_registry.wait_ready()
 
 
-def create_geojson_template(geo_df):
-    """Convert a GeoDataFrame to a GeoJSON dictionary."""
-    return json.loads(geo_df.to_json())
-
-unique_polygons_gdf = generate_unique_polygons(df_emissions)
-geojson_template = create_geojson_template(unique_polygons_gdf)
+def handle_callback_error(error):
+    """Leave outputs unchanged while the datasets are still loading."""
+    if isinstance(error, DataNotReady):
+        return dash.no_update
+    raise error
 
 # ========================== 7️⃣ DASHBOARD LAYOUT ==========================
 
@@ -475,6 +270,7 @@ app = dash.Dash(
     url_base_pathname=None,  # Allow URL routing
     routes_pathname_prefix='/',
     compress=True,  # Enable compression
+    on_error=handle_callback_error,
     # Use local assets for better performance and reliability
     serve_locally=True,  # Use local assets instead of CDN
     # Add error handling for asset loading
@@ -492,8 +288,11 @@ server = app.server
 # This ensures correct URLs when the app is served behind a proxy
 server.wsgi_app = ProxyFix(server.wsgi_app, x_proto=1, x_host=1)
 
+# Start loading and polling in each worker when it gets its first request
+server.before_request(data_registry.start)
+
 # Register additional routes
-routes.register_routes(app)
+routes.register_routes(app, data_registry)
 
 
 # Inline the local stylesheet and preload external CSS to minimise
@@ -564,24 +363,11 @@ app.layout = html.Div([
 
 # ========================== 8️⃣ CALLBACKS ==========================
 
-callbacks_emissions.setup_emissions_callbacks(
-    app,
-    df_emissions,
-    controls_emissions,
-    geojson_template,
-    unique_polygons_gdf)
-
-callbacks_waiting.setup_waiting_times_callbacks(
-    app,
-    df_waiting_times,
-    controls_waiting_times
-)
+callbacks_emissions.setup_emissions_callbacks(app, data_registry)
 
-callbacks_energy.setup_energy_callbacks(
-    app,
-    df_energy_demand,
-    controls_energy
-)
+callbacks_waiting.setup_waiting_times_callbacks(app, data_registry)
+
+callbacks_energy.setup_energy_callbacks(app, data_registry)
 
 @app.callback(
     Output("chart-tabs-store", "data"),
@@ -740,11 +526,13 @@ def handle_initial_url(pathname):
 
 @app.callback(
     Output("tab-content", "children"),
+    Output("data-loading-retry", "disabled"),
     Input("chart-tabs-store", "data"),
-    Input("initial-delay", "n_intervals")
+    Input("initial-delay", "n_intervals"),
+    Input("data-loading-retry", "n_intervals"),
 )
 
-def update_tab_content(selected_tab, n_intervals):
+def update_tab_content(selected_tab, n_intervals, _retries):
     """Render layout components for the selected tab.
 
     Parameters
@@ -753,56 +541,83 @@ def update_tab_content(selected_tab, n_intervals):
         Active tab identifier.
     n_intervals : int | None
         Number of intervals elapsed; used to delay rendering.
+    _retries : int
+        Ticks of the interval polling for the datasets while they load.
 
     Returns
     -------
-    dash.html.Div | str
-        Layout for the selected tab or empty string during initial delay.
+    tuple
+        Layout for the selected tab (a loading placeholder while the
+        datasets load, or empty string during initial delay) and whether
+        to stop polling for the datasets.
     """
     # Don't show content until initial delay is complete
     if n_intervals is None or n_intervals == 0:
-        return ""
+        return "", dash.no_update
+    if selected_tab == "about":
+        return html.Div([
+            dbc.Container([
+            layout.build_about_us()
+        ], fluid=True)
+        ]), True
+    if not data_registry.ready:
+        return html.Div([
+            dbc.Spinner(color="primary"),
+            html.P("Loading data, this page will update shortly.", className="text-muted mt-2"),
+        ], className="text-center p-5"), False
+    return build_tab_content(selected_tab, data_registry.current), True
+
+
+def build_tab_content(selected_tab, data):
+    """Return the sidebar and charts of a data tab.
+
+    Parameters
+    ----------
+    selected_tab : str
+        Active tab identifier.
+    data : DatasetVersion
+        Version whose controls populate the sidebar.
+
+    Returns
+    -------
+    dash.html.Div | None
+        Layout for the tab.
+    """
     if selected_tab == "emissions":
         return html.Div([
             dbc.Row([
-                layout.build_sidebar_emissions(controls_emissions),
+                layout.build_sidebar_emissions(data["controls_emissions"]),
                 layout.build_main_container_emissions()
             ], className="g-0")
         ])
     elif selected_tab == "waiting":
         return html.Div([
             dbc.Row([
-            layout.build_sidebar_waiting_times(controls_waiting_times),  # Your existing sidebar
+            layout.build_sidebar_waiting_times(data["controls_waiting_times"]),  # Your existing sidebar
             layout.build_main_container_waiting_times()
         ], className="g-0")
         ])
     elif selected_tab == "service":
         return html.Div([
             dbc.Row([
-            layout.build_sidebar_waiting_times(controls_waiting_times),  # Your existing sidebar
+            layout.build_sidebar_waiting_times(data["controls_waiting_times"]),  # Your existing sidebar
             layout.build_main_container_service_times()
         ], className="g-0")
         ])
     elif selected_tab == "energy":
         return html.Div([
             dbc.Row([
-            layout.build_sidebar_energy(controls_energy),
+            layout.build_sidebar_energy(data["controls_energy"]),
             layout.build_main_container_energy()
         ], className="g-0")
         ])
     elif selected_tab == "explorer":
         return html.Div([
             dbc.Row([
-                layout.build_sidebar_explorer(controls_explorer),
+                layout.build_sidebar_explorer(data["controls_explorer"]),
                 layout.build_main_container_explorer()
             ], className="g-0")
         ])
-    elif selected_tab == "about":
-        return html.Div([
-            dbc.Container([
-            layout.build_about_us()
-        ], fluid=True)
-        ])
 
 
 @app.callback(
@@ -888,13 +703,7 @@ def toggle_chart_modal(open_clicks, close_clicks, is_open):
     return is_open
 
 
-callbacks_explorer.setup_explorer_callbacks(
-    app,
-    df_emissions,
-    df_waiting_times,
-    df_energy_demand,
-    controls_explorer,
-)
+callbacks_explorer.setup_explorer_callbacks(app, data_registry)
 
 # Run the app
 if __name__ == '__main__':
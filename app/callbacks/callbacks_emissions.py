@@ -3,17 +3,66 @@
 """Module for emissions dashboard callbacks."""
 
 from dash import Input, Output, State, callback
-from dash import html, ctx
+from dash import html, ctx, no_update
+from dash.exceptions import PreventUpdate
 import plotly.graph_objects as go
 
-from data_utils import map_processing
+from data_utils.filter_cache import memoize_filter, normalize_selection
+from charts.figures import patch_figure_updates
 from charts import charts_emissions
 
 
-def setup_emissions_callbacks(app, df_emissions, controls_emissions, geojson_template, unique_polygons_gdf):
+MAP_GRAPHS = ("emissions--chart--3", "emissions--chart--3-fullscreen")
+
+# Runs in the browser on every pan and zoom of either map and only stores
+# the new view, which redraws the map on the server, when the zoom calls for
+# another level of the pyramid than the one drawn
+MAP_VIEW_CHANGE = """
+function (relayout, relayoutFullscreen, drawn) {
+    const noUpdate = window.dash_clientside.no_update;
+    const triggered = window.dash_clientside.callback_context.triggered;
+    const fullscreen = triggered.length > 0
+        && triggered[0].prop_id.startsWith("%s.");
+    const moved = fullscreen ? relayoutFullscreen : relayout;
+    if (!drawn || !moved || moved["map.zoom"] === undefined) {
+        return noUpdate;
+    }
+    const lat = moved["map.center"] ? moved["map.center"].lat : drawn.lat;
+    const equatorZoom = moved["map.zoom"] - Math.log2(Math.cos(lat * Math.PI / 180));
+    const level = drawn.levels.find(([, minZoom]) => equatorZoom >= minZoom);
+    const resolution = level ? level[0] : drawn.levels[drawn.levels.length - 1][0];
+    if (resolution === drawn.resolution) {
+        return noUpdate;
+    }
+    return {zoom: moved["map.zoom"], lat: lat};
+}
+""" % MAP_GRAPHS[1]
+
+
+def setup_emissions_callbacks(app, registry):
     """
     These are the callbacks for the emissions dashboard.
+
+    Each callback reads ``registry.current`` once, so a dataset reload never
+    mixes versions within a request.
     """
+    @memoize_filter
+    def filter_emissions(data, selected_vessel_types, start_idx, end_idx):
+        """Select the emissions cube once per refresh and share it with sibling callbacks.
+
+        The returned selection is shared between callbacks and must not be
+        modified in place.
+        """
+        controls_emissions = data["controls_emissions"]
+        start_ym = controls_emissions["date_range"]["index_to_year_month"][start_idx]
+        end_ym = controls_emissions["date_range"]["index_to_year_month"][end_idx]
+        selection = data["emissions_cube"].select(
+            start_ym, end_ym, normalize_selection(selected_vessel_types)
+        )
+        return start_ym, end_ym, selection
+
+    registry.add_listener(lambda _version: filter_emissions.clear())
+
     @app.callback(
         Output("emissions--checklist--vessel", "options"),
         Output("emissions--checklist--vessel", "value"),
@@ -26,7 +75,7 @@ def setup_emissions_callbacks(app, df_emissions, controls_emissions, geojson_tem
     def update_vessel_checklist(_select_all_clicks, _clear_all_clicks,
                                 search_value, selected_values):
         """Update vessel checklist options and selected values."""
-        vessel_types = controls_emissions["vessel_types"]
+        vessel_types = registry.current["controls_emissions"]["vessel_types"]
 
         if search_value:
             search_value = search_value.lower()
@@ -56,6 +105,7 @@ def setup_emissions_callbacks(app, df_emissions, controls_emissions, geojson_tem
     )
     def validate_date_range(start_idx, end_idx):
         """Ensure the start date is not after the end date."""
+        controls_emissions = registry.current["controls_emissions"]
         if start_idx is None:
             start_idx = controls_emissions["date_range"].get("default_start_index", controls_emissions["date_range"]["min_index"])
         if end_idx is None:
@@ -72,6 +122,7 @@ def setup_emissions_callbacks(app, df_emissions, controls_emissions, geojson_tem
         [
             Output("emissions--chart--1", "figure"),
             Output("emissions--chart--1-fullscreen", "figure"),
+            Output("emissions--chart--1-structure", "data"),
         ],
         Input("emissions--btn--refresh", "n_clicks"),
         [
@@ -79,8 +130,10 @@ def setup_emissions_callbacks(app, df_emissions, controls_emissions, geojson_tem
             State("emissions--checklist--vessel", "value"),
             State("emissions--start-date", "value"),
             State("emissions--end-date", "value"),
+            State("emissions--chart--1-structure", "data"),
         ]
     )
+    @patch_figure_updates
     def update_chart_1(_n_clicks, current_tab, selected_vessel_types, start_idx, end_idx):
         """Updates chart 1 only."""
         # Don't update charts if we don't have a valid tab
@@ -91,22 +144,14 @@ def setup_emissions_callbacks(app, df_emissions, controls_emissions, geojson_tem
         if start_idx is None or end_idx is None:
             return {}, {}
         
-        start_ym = controls_emissions["date_range"]["index_to_year_month"][start_idx]
-        end_ym = controls_emissions["date_range"]["index_to_year_month"][end_idx]
-        
-        # Filter data for this specific chart
-        filtered_df = df_emissions[
-            (df_emissions["year_month"] >= start_ym) &
-            (df_emissions["year_month"] <= end_ym) &
-            (df_emissions["StandardVesselType"].isin(selected_vessel_types))
-        ]
+        start_ym, end_ym, selection = filter_emissions(registry.current, selected_vessel_types, start_idx, end_idx)
         
-        if filtered_df.empty:
+        if selection.empty:
             empty_fig = go.Figure()
             return empty_fig, empty_fig
         
         # Chart 1: Line chart of emissions by year and month
-        df_year_month = filtered_df.groupby(['year', 'month'], as_index=False)['co2_equivalent_t'].sum()
+        df_year_month = selection.by_year_month()
         fig = charts_emissions.plot_line_chart_emissions_by_year_month(df_year_month)
         return fig, fig
 
@@ -114,6 +159,7 @@ def setup_emissions_callbacks(app, df_emissions, controls_emissions, geojson_tem
         [
             Output("emissions--chart--2", "figure"),
             Output("emissions--chart--2-fullscreen", "figure"),
+            Output("emissions--chart--2-structure", "data"),
         ],
         Input("emissions--btn--refresh", "n_clicks"),
         [
@@ -121,8 +167,10 @@ def setup_emissions_callbacks(app, df_emissions, controls_emissions, geojson_tem
             State("emissions--checklist--vessel", "value"),
             State("emissions--start-date", "value"),
             State("emissions--end-date", "value"),
+            State("emissions--chart--2-structure", "data"),
         ]
     )
+    @patch_figure_updates
     def update_chart_2(_n_clicks, current_tab, selected_vessel_types, start_idx, end_idx):
         """Updates chart 2 only."""
         # Don't update charts if we don't have a valid tab
@@ -133,72 +181,93 @@ def setup_emissions_callbacks(app, df_emissions, controls_emissions, geojson_tem
         if start_idx is None or end_idx is None:
             return {}, {}
         
-        start_ym = controls_emissions["date_range"]["index_to_year_month"][start_idx]
-        end_ym = controls_emissions["date_range"]["index_to_year_month"][end_idx]
-        
-        filtered_df = df_emissions[
-            (df_emissions["year_month"] >= start_ym) &
-            (df_emissions["year_month"] <= end_ym) &
-            (df_emissions["StandardVesselType"].isin(selected_vessel_types))
-        ]
+        start_ym, end_ym, selection = filter_emissions(registry.current, selected_vessel_types, start_idx, end_idx)
         
-        if filtered_df.empty:
+        if selection.empty:
             empty_fig = go.Figure()
             return empty_fig, empty_fig
         
         # Chart 2: Bar chart of emissions by vessel type
-        vessel_emissions = filtered_df.groupby('StandardVesselType')['co2_equivalent_t'].sum()
+        vessel_emissions = selection.by_vessel_type()
         df_type = vessel_emissions.nlargest(6)
         fig = charts_emissions.plot_bar_chart_emissions_by_type(df_type)
         return fig, fig
 
+    app.clientside_callback(
+        MAP_VIEW_CHANGE,
+        Output("emissions--map-view", "data"),
+        [Input(graph_id, "relayoutData") for graph_id in MAP_GRAPHS],
+        State("emissions--map-drawn", "data"),
+        prevent_initial_call=True,
+    )
+
     @app.callback(
         [
             Output("emissions--chart--3", "figure"),
             Output("emissions--chart--3-fullscreen", "figure"),
+            Output("emissions--map-drawn", "data"),
+            Output("emissions--chart--3-structure", "data"),
+        ],
+        [
+            Input("emissions--btn--refresh", "n_clicks"),
+            Input("emissions--map-view", "data"),
         ],
-        Input("emissions--btn--refresh", "n_clicks"),
         [
             State("chart-tabs-store", "data"),
             State("emissions--checklist--vessel", "value"),
             State("emissions--start-date", "value"),
             State("emissions--end-date", "value"),
+            State("emissions--map-drawn", "data"),
+            State("emissions--chart--3-structure", "data"),
         ]
     )
-    def update_chart_3(_n_clicks, current_tab, selected_vessel_types, start_idx, end_idx):
-        """Updates chart 3 only."""
+    @patch_figure_updates
+    def update_chart_3(_n_clicks, view, current_tab, selected_vessel_types, start_idx, end_idx,
+                       drawn):
+        """Updates chart 3 only.
+
+        The map is drawn at the H3 resolution suiting its zoom. The browser
+        only sends a new view when panning or zooming calls for another
+        level of the pyramid (see ``MAP_VIEW_CHANGE``).
+        """
         # Don't update charts if we don't have a valid tab
         if current_tab is None:
             empty_fig = go.Figure()
-            return empty_fig, empty_fig
+            return empty_fig, empty_fig, no_update
         
         if start_idx is None or end_idx is None:
-            return {}, {}
-        
-        start_ym = controls_emissions["date_range"]["index_to_year_month"][start_idx]
-        end_ym = controls_emissions["date_range"]["index_to_year_month"][end_idx]
-        
-        filtered_df = df_emissions[
-            (df_emissions["year_month"] >= start_ym) &
-            (df_emissions["year_month"] <= end_ym) &
-            (df_emissions["StandardVesselType"].isin(selected_vessel_types))
-        ]
+            return {}, {}, no_update
+        
+        data = registry.current
+        pyramid = data["map_pyramid"]
+        if view is None:
+            # A newly rendered map starts from the initial view
+            view = {"zoom": charts_emissions.MAP_ZOOM, "lat": charts_emissions.MAP_CENTER["lat"]}
+        resolution = pyramid.resolution_for_zoom(view["zoom"], view["lat"])
+        if (ctx.triggered_id == "emissions--map-view" and drawn is not None
+                and resolution == drawn["resolution"]):
+            raise PreventUpdate
+        drawn = {"resolution": resolution, "lat": view["lat"], "levels": pyramid.zoom_levels()}
+
+        start_ym, end_ym, selection = filter_emissions(data, selected_vessel_types, start_idx, end_idx)
         
-        if filtered_df.empty:
+        if selection.empty:
             empty_fig = go.Figure()
-            return empty_fig, empty_fig
+            return empty_fig, empty_fig, drawn
         
         # Chart 3: Map of emissions
-        gdf_json, df_h3 = map_processing.generate_h3_map_data(
-            filtered_df, unique_polygons_gdf, geojson_template
+        # Polygons of each level are fetched once by the browser from their own URL
+        df_h3 = pyramid.aggregate(selection.cells(), resolution)
+        fig = charts_emissions.plot_emissions_map(
+            app.get_relative_path(pyramid.resources[resolution].url), df_h3
         )
-        fig = charts_emissions.plot_emissions_map(gdf_json, df_h3)
-        return fig, fig
+        return fig, fig, drawn
 
     @app.callback(
         [
             Output("emissions--chart--4", "figure"),
             Output("emissions--chart--4-fullscreen", "figure"),
+            Output("emissions--chart--4-structure", "data"),
         ],
         Input("emissions--btn--refresh", "n_clicks"),
         [
@@ -206,8 +275,10 @@ def setup_emissions_callbacks(app, df_emissions, controls_emissions, geojson_tem
             State("emissions--checklist--vessel", "value"),
             State("emissions--start-date", "value"),
             State("emissions--end-date", "value"),
+            State("emissions--chart--4-structure", "data"),
         ]
     )
+    @patch_figure_updates
     def update_chart_4(_n_clicks, current_tab, selected_vessel_types, start_idx, end_idx):
         """Updates chart 4 only."""
         # Don't update charts if we don't have a valid tab
@@ -218,21 +289,14 @@ def setup_emissions_callbacks(app, df_emissions, controls_emissions, geojson_tem
         if start_idx is None or end_idx is None:
             return {}, {}
         
-        start_ym = controls_emissions["date_range"]["index_to_year_month"][start_idx]
-        end_ym = controls_emissions["date_range"]["index_to_year_month"][end_idx]
-        
-        filtered_df = df_emissions[
-            (df_emissions["year_month"] >= start_ym) &
-            (df_emissions["year_month"] <= end_ym) &
-            (df_emissions["StandardVesselType"].isin(selected_vessel_types))
-        ]
+        start_ym, end_ym, selection = filter_emissions(registry.current, selected_vessel_types, start_idx, end_idx)
         
-        if filtered_df.empty:
+        if selection.empty:
             empty_fig = go.Figure()
             return empty_fig, empty_fig
         
         # Chart 4: Line chart of emissions by type and year/month
-        df_type_ym = filtered_df.groupby(['StandardVesselType', 'year_month'], as_index=False)['co2_equivalent_t'].sum()
+        df_type_ym = selection.by_vessel_type_year_month()
         fig = charts_emissions.plot_line_chart_emissions_by_type_year_month(df_type_ym)
         return fig, fig
 
@@ -255,17 +319,10 @@ def setup_emissions_callbacks(app, df_emissions, controls_emissions, geojson_tem
         if start_idx is None or end_idx is None:
             return ""
         
-        start_ym = controls_emissions["date_range"]["index_to_year_month"][start_idx]
-        end_ym = controls_emissions["date_range"]["index_to_year_month"][end_idx]
-        
-        filtered_df = df_emissions[
-            (df_emissions["year_month"] >= start_ym) &
-            (df_emissions["year_month"] <= end_ym) &
-            (df_emissions["StandardVesselType"].isin(selected_vessel_types))
-        ]
+        start_ym, end_ym, selection = filter_emissions(registry.current, selected_vessel_types, start_idx, end_idx)
         
         # Calculate KPI
-        total_emissions = filtered_df["co2_equivalent_t"].sum()
+        total_emissions = selection.total()
         
         # Use the proper plot_kpi function for consistent styling
         kpi_component = charts_emissions.plot_kpi(
@@ -301,17 +358,10 @@ def setup_emissions_callbacks(app, df_emissions, controls_emissions, geojson_tem
         if start_idx is None or end_idx is None:
             return False, ""
         
-        start_ym = controls_emissions["date_range"]["index_to_year_month"][start_idx]
-        end_ym = controls_emissions["date_range"]["index_to_year_month"][end_idx]
-        
-        filtered_df = df_emissions[
-            (df_emissions["year_month"] >= start_ym) &
-            (df_emissions["year_month"] <= end_ym) &
-            (df_emissions["StandardVesselType"].isin(selected_vessel_types))
-        ]
+        start_ym, end_ym, selection = filter_emissions(registry.current, selected_vessel_types, start_idx, end_idx)
         
         # Check if data exists
-        has_data = len(filtered_df) > 0
+        has_data = not selection.empty
         
         # Format date range
         def _fmt(ym: int) -> str:
@@ -6,13 +6,37 @@ from dash import Input, Output, State, callback, ctx
 from dash import html
 import plotly.graph_objects as go
 
+from data_utils.filter_cache import memoize_filter, normalize_selection
+from charts.figures import patch_figure_updates
 from charts import charts_energy 
 
-def setup_energy_callbacks(app, df_energy, controls_energy):
+def setup_energy_callbacks(app, registry):
     """
     Set up all callbacks for the energy dashboard.
+
+    Every chart reads from the ``energy_tensor`` of ``registry.current``, an
+    ``EnergyFlowTensor`` of energy by week, origin and destination.
     """
 
+    @memoize_filter
+    def filter_energy(data, start_idx, end_idx, selected_country_before, selected_country_after):
+        """Select the energy tensor once per refresh.
+
+        Country names from the checklists are matched against the tensor's
+        name axes, so no per-call name-to-code mapping is needed.
+        """
+        index_to_year_week = data["controls_energy"]["date_range"]["index_to_year_week"]
+        start_yw = index_to_year_week[start_idx]
+        end_yw = index_to_year_week[end_idx]
+        return data["energy_tensor"].select(
+            start_yw,
+            end_yw,
+            normalize_selection(selected_country_before),
+            normalize_selection(selected_country_after),
+        )
+
+    registry.add_listener(lambda _version: filter_energy.clear())
+
     @app.callback(
         Output("energy--start-date", "value"),
         Output("energy--end-date", "value"),
@@ -21,6 +45,7 @@ def setup_energy_callbacks(app, df_energy, controls_energy):
         prevent_initial_call=True,
     )
     def validate_date_range(start_idx, end_idx):
+        controls_energy = registry.current["controls_energy"]
         if start_idx is None:
             start_idx = controls_energy["date_range"]["min_index"]
         if end_idx is None:
@@ -42,7 +67,7 @@ def setup_energy_callbacks(app, df_energy, controls_energy):
         prevent_initial_call=True,
     )
     def update_country_before_checklist(_select_all, _clear_all, search_value, selected_values):
-        country_before = controls_energy["country_before"]
+        country_before = registry.current["controls_energy"]["country_before"]
         if search_value:
             search_value = search_value.lower()
             filtered = [v for v in country_before if search_value in v.lower()]
@@ -84,7 +109,7 @@ def setup_energy_callbacks(app, df_energy, controls_energy):
         prevent_initial_call=True,
     )
     def update_country_after_checklist(_select_all, _clear_all, search_value, selected_values):
-        country_after = controls_energy["country_after"]
+        country_after = registry.current["controls_energy"]["country_after"]
         if search_value:
             search_value = search_value.lower()
             filtered = [v for v in country_after if search_value in v.lower()]
@@ -105,6 +130,7 @@ def setup_energy_callbacks(app, df_energy, controls_energy):
         [
             Output("energy--chart--1", "figure"),
             Output("energy--chart--1-fullscreen", "figure"),
+            Output("energy--chart--1-structure", "data"),
         ],
         Input("emissions--btn--refresh", "n_clicks"),
         [
@@ -112,35 +138,23 @@ def setup_energy_callbacks(app, df_energy, controls_energy):
             State("energy--checklist--country-after", "value"),
             State("energy--start-date", "value"),
             State("energy--end-date", "value"),
+            State("energy--chart--1-structure", "data"),
         ]
     )
+    @patch_figure_updates
     def update_chart_1(_n_clicks, selected_country_before, selected_country_after, start_idx, end_idx):
         """Updates chart 1 only."""
         if start_idx is None or end_idx is None:
             return {}, {}
         
-        index_to_year_week = controls_energy["date_range"]["index_to_year_week"]
-        start_yw = index_to_year_week[start_idx]
-        end_yw = index_to_year_week[end_idx]
-        
-        before_map = controls_energy["country_before_map"]
-        after_map = controls_energy["country_after_map"]
-        selected_before_codes = [before_map.get(n, n) for n in selected_country_before]
-        selected_after_codes = [after_map.get(n, n) for n in selected_country_after]
-
-        filtered_df = df_energy[
-            (df_energy["year_week"] >= start_yw) &
-            (df_energy["year_week"] <= end_yw) &
-            (df_energy["country_before"].isin(selected_before_codes)) &
-            (df_energy["country_after"].isin(selected_after_codes))
-        ]
+        selection = filter_energy(registry.current, start_idx, end_idx, selected_country_before, selected_country_after)
         
-        if filtered_df.empty:
+        if selection.empty:
             empty_fig = go.Figure()
             return empty_fig, empty_fig
         
         # Chart 1: Line chart of energy demand by year and week
-        df_year_week = filtered_df.groupby(['year','week'])['sum_energy'].sum().reset_index()
+        df_year_week = selection.by_year_week()
         fig = charts_energy.plot_line_chart_energy_demand_by_year_week(df_year_week)
         return fig, fig
 
@@ -148,6 +162,7 @@ def setup_energy_callbacks(app, df_energy, controls_energy):
         [
             Output("energy--chart--2", "figure"),
             Output("energy--chart--2-fullscreen", "figure"),
+            Output("energy--chart--2-structure", "data"),
         ],
         Input("emissions--btn--refresh", "n_clicks"),
         Input("energy--role-chart2", "data"),
@@ -156,36 +171,25 @@ def setup_energy_callbacks(app, df_energy, controls_energy):
             State("energy--checklist--country-after", "value"),
             State("energy--start-date", "value"),
             State("energy--end-date", "value"),
+            State("energy--chart--2-structure", "data"),
         ]
     )
+    @patch_figure_updates
     def update_chart_2(_n_clicks, role_chart2, selected_country_before, selected_country_after, start_idx, end_idx):
         """Updates chart 2 only."""
         if start_idx is None or end_idx is None:
             return {}, {}
         
-        index_to_year_week = controls_energy["date_range"]["index_to_year_week"]
-        start_yw = index_to_year_week[start_idx]
-        end_yw = index_to_year_week[end_idx]
-        
-        before_map = controls_energy["country_before_map"]
-        after_map = controls_energy["country_after_map"]
-        selected_before_codes = [before_map.get(n, n) for n in selected_country_before]
-        selected_after_codes = [after_map.get(n, n) for n in selected_country_after]
-
-        filtered_df = df_energy[
-            (df_energy["year_week"] >= start_yw) &
-            (df_energy["year_week"] <= end_yw) &
-            (df_energy["country_before"].isin(selected_before_codes)) &
-            (df_energy["country_after"].isin(selected_after_codes))
-        ]
+        selection = filter_energy(registry.current, start_idx, end_idx, selected_country_before, selected_country_after)
         
-        if filtered_df.empty:
+        if selection.empty:
             empty_fig = go.Figure()
             return empty_fig, empty_fig
         
         # Chart 2: Bar chart of energy by country
-        country_col = "country_before_name" if role_chart2 == "country_before" else "country_after_name"
-        df_country = filtered_df.groupby(country_col)["sum_energy"].sum().reset_index()
+        country_role = "country_before" if role_chart2 == "country_before" else "country_after"
+        country_col = f"{country_role}_name"
+        df_country = selection.by_country_name(country_role)
         top_countries = df_country.sort_values("sum_energy", ascending=False).head(6)
         fig = charts_energy.plot_bar_chart_energy_by_country(top_countries, value_column=country_col)
         return fig, fig
@@ -194,6 +198,7 @@ def setup_energy_callbacks(app, df_energy, controls_energy):
         [
             Output("energy--chart--3", "figure"),
             Output("energy--chart--3-fullscreen", "figure"),
+            Output("energy--chart--3-structure", "data"),
         ],
         Input("emissions--btn--refresh", "n_clicks"),
         Input("energy--role-chart3", "data"),
@@ -202,41 +207,33 @@ def setup_energy_callbacks(app, df_energy, controls_energy):
             State("energy--checklist--country-after", "value"),
             State("energy--start-date", "value"),
             State("energy--end-date", "value"),
+            State("energy--chart--3-structure", "data"),
         ]
     )
+    @patch_figure_updates
     def update_chart_3(_n_clicks, role_chart3, selected_country_before, selected_country_after, start_idx, end_idx):
         """Updates chart 3 only."""
         if start_idx is None or end_idx is None:
             return {}, {}
         
-        index_to_year_week = controls_energy["date_range"]["index_to_year_week"]
-        start_yw = index_to_year_week[start_idx]
-        end_yw = index_to_year_week[end_idx]
-        
-        before_map = controls_energy["country_before_map"]
-        after_map = controls_energy["country_after_map"]
-        selected_before_codes = [before_map.get(n, n) for n in selected_country_before]
-        selected_after_codes = [after_map.get(n, n) for n in selected_country_after]
-
-        filtered_df = df_energy[
-            (df_energy["year_week"] >= start_yw) &
-            (df_energy["year_week"] <= end_yw) &
-            (df_energy["country_before"].isin(selected_before_codes)) &
-            (df_energy["country_after"].isin(selected_after_codes))
-        ]
+        data = registry.current
+        selection = filter_energy(data, start_idx, end_idx, selected_country_before, selected_country_after)
         
-        if filtered_df.empty:
+        if selection.empty:
             empty_fig = go.Figure()
             return empty_fig, empty_fig
         
         # Chart 3: Bubble map
-        fig = charts_energy.generate_energy_bubble_map(filtered_df, country_role=role_chart3)
+        fig = charts_energy.generate_energy_bubble_map(
+            selection.by_country(role_chart3), country_role=role_chart3, countries=data["countries"]
+        )
         return fig, fig
 
     @app.callback(
         [
             Output("energy--chart--4", "figure"),
             Output("energy--chart--4-fullscreen", "figure"),
+            Output("energy--chart--4-structure", "data"),
         ],
         Input("emissions--btn--refresh", "n_clicks"),
         [
@@ -244,35 +241,23 @@ def setup_energy_callbacks(app, df_energy, controls_energy):
             State("energy--checklist--country-after", "value"),
             State("energy--start-date", "value"),
             State("energy--end-date", "value"),
+            State("energy--chart--4-structure", "data"),
         ]
     )
+    @patch_figure_updates
     def update_chart_4(_n_clicks, selected_country_before, selected_country_after, start_idx, end_idx):
         """Updates chart 4 only."""
         if start_idx is None or end_idx is None:
             return {}, {}
         
-        index_to_year_week = controls_energy["date_range"]["index_to_year_week"]
-        start_yw = index_to_year_week[start_idx]
-        end_yw = index_to_year_week[end_idx]
+        selection = filter_energy(registry.current, start_idx, end_idx, selected_country_before, selected_country_after)
         
-        before_map = controls_energy["country_before_map"]
-        after_map = controls_energy["country_after_map"]
-        selected_before_codes = [before_map.get(n, n) for n in selected_country_before]
-        selected_after_codes = [after_map.get(n, n) for n in selected_country_after]
-
-        filtered_df = df_energy[
-            (df_energy["year_week"] >= start_yw) &
-            (df_energy["year_week"] <= end_yw) &
-            (df_energy["country_before"].isin(selected_before_codes)) &
-            (df_energy["country_after"].isin(selected_after_codes))
-        ]
-        
-        if filtered_df.empty:
+        if selection.empty:
             empty_fig = go.Figure()
             return empty_fig, empty_fig
         
         # Chart 4: Sankey diagram
-        fig = charts_energy.plot_sankey_before_after(filtered_df, origin_col="country_before_name", dest_col="country_after_name")
+        fig = charts_energy.plot_sankey_before_after(selection.flows(), origin_col="country_before_name", dest_col="country_after_name")
         return fig, fig
 
     @app.callback(
@@ -290,24 +275,10 @@ def setup_energy_callbacks(app, df_energy, controls_energy):
         if start_idx is None or end_idx is None:
             return False
         
-        index_to_year_week = controls_energy["date_range"]["index_to_year_week"]
-        start_yw = index_to_year_week[start_idx]
-        end_yw = index_to_year_week[end_idx]
-        
-        before_map = controls_energy["country_before_map"]
-        after_map = controls_energy["country_after_map"]
-        selected_before_codes = [before_map.get(n, n) for n in selected_country_before]
-        selected_after_codes = [after_map.get(n, n) for n in selected_country_after]
-
-        filtered_df = df_energy[
-            (df_energy["year_week"] >= start_yw) &
-            (df_energy["year_week"] <= end_yw) &
-            (df_energy["country_before"].isin(selected_before_codes)) &
-            (df_energy["country_after"].isin(selected_after_codes))
-        ]
+        selection = filter_energy(registry.current, start_idx, end_idx, selected_country_before, selected_country_after)
         
         # Check if data exists
-        has_data = len(filtered_df) > 0
+        has_data = not selection.empty
         return not has_data
 
     @app.callback(
@@ -323,7 +294,7 @@ def setup_energy_callbacks(app, df_energy, controls_energy):
         if start_idx is None or end_idx is None:
             return ""
         
-        index_to_year_week = controls_energy["date_range"]["index_to_year_week"]
+        index_to_year_week = registry.current["controls_energy"]["date_range"]["index_to_year_week"]
         start_yw = index_to_year_week[start_idx]
         end_yw = index_to_year_week[end_idx]
         
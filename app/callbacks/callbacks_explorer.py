@@ -2,14 +2,22 @@
 
 """Callbacks for the explorer tab."""
 
+import pandas as pd
 from dash import Input, Output, State, dcc, ctx, html
 from dash.exceptions import PreventUpdate
+from charts.figures import patch_figure_updates
 from charts import charts_explorer
 from data_utils.form_saver import append_form_row
 
 
-def setup_explorer_callbacks(app, df_emissions, df_waiting, df_energy, controls):
-    """Register callbacks for the explorer tab."""
+def setup_explorer_callbacks(app, registry):
+    """Register callbacks for the explorer tab.
+
+    Each callback reads ``registry.current`` once. Its ``indexes`` map
+    ``"emissions"``, ``"waiting_times"`` and ``"energy"`` to the per-column
+    indexes of each dataset, and ``explorer_series`` maps each explorer
+    source to its ``PrefixSumSeries``.
+    """
 
     @app.callback(
         Output("explorer--start-date", "value"),
@@ -18,6 +26,7 @@ def setup_explorer_callbacks(app, df_emissions, df_waiting, df_energy, controls)
         Input("explorer--end-date", "value"),
     )
     def validate_dates(start_idx, end_idx):
+        controls = registry.current["controls_explorer"]
         if start_idx is None:
             start_idx = controls["date_range"]["min_index"]
         if end_idx is None:
@@ -35,6 +44,7 @@ def setup_explorer_callbacks(app, df_emissions, df_waiting, df_energy, controls)
         Input("explorer--end-date", "value"),
     )
     def update_label(start_idx, end_idx):
+        controls = registry.current["controls_explorer"]
         start_ym = controls["date_range"]["index_to_year_month"][start_idx]
         end_ym = controls["date_range"]["index_to_year_month"][end_idx]
 
@@ -51,6 +61,7 @@ def setup_explorer_callbacks(app, df_emissions, df_waiting, df_energy, controls)
         Input("explorer--end-week", "value"),
     )
     def validate_weeks(start_idx, end_idx):
+        controls = registry.current["controls_explorer"]
         if start_idx is None:
             start_idx = controls["week_range"]["min_index"]
         if end_idx is None:
@@ -68,7 +79,7 @@ def setup_explorer_callbacks(app, df_emissions, df_waiting, df_energy, controls)
         Input("explorer--end-week", "value"),
     )
     def update_week_label(start_idx, end_idx):
-        index_map = controls["week_range"]["index_to_year_week"]
+        index_map = registry.current["controls_explorer"]["week_range"]["index_to_year_week"]
         start_yw = index_map[start_idx]
         end_yw = index_map[end_idx]
 
@@ -98,42 +109,49 @@ def setup_explorer_callbacks(app, df_emissions, df_waiting, df_energy, controls)
         Output("explorer--chart-fullscreen", "figure"),
         Output("explorer--table", "data"),
         Output("explorer--table", "columns"),
+        Output("explorer--chart-structure", "data"),
         Input("explorer--source", "value"),
         Input("explorer--start-date", "value"),
         Input("explorer--end-date", "value"),
         Input("explorer--start-week", "value"),
         Input("explorer--end-week", "value"),
+        State("explorer--chart-structure", "data"),
     )
+    @patch_figure_updates
     def update_chart(source, start_month_idx, end_month_idx, start_week_idx, end_week_idx):
+        data = registry.current
+        controls = data["controls_explorer"]
+        indexes = data["indexes"]
+        series = data["explorer_series"]
         start_ym = controls["date_range"]["index_to_year_month"].get(start_month_idx)
         end_ym = controls["date_range"]["index_to_year_month"].get(end_month_idx)
         start_yw = controls["week_range"]["index_to_year_week"].get(start_week_idx)
         end_yw = controls["week_range"]["index_to_year_week"].get(end_week_idx)
 
+        # Summary totals come from prefix sums; only the sample rows touch the frame
         if source == "emissions":
-            df = df_emissions
             value_col = "co2_equivalent_t"
-            filtered = df[(df["year_month"] >= start_ym) & (df["year_month"] <= end_ym)]
-            summary = filtered.groupby("year_month")[value_col].sum().reset_index()
-            summary["date"] = summary["year_month"].astype(str).str.slice(0, 4) + "-" + summary["year_month"].astype(str).str.slice(4, 6)
+            filtered = indexes["emissions"]["year_month"].slice(data["emissions"], start_ym, end_ym)
+            periods, totals = series[source].series(start_ym, end_ym)
         elif source == "waiting_time":
-            df = df_waiting
             value_col = "waiting_time"
-            filtered = df[(df["year_month"] >= start_ym) & (df["year_month"] <= end_ym)]
-            summary = filtered.groupby("year_month")[value_col].sum().reset_index()
-            summary["date"] = summary["year_month"].astype(str).str.slice(0, 4) + "-" + summary["year_month"].astype(str).str.slice(4, 6)
+            filtered = indexes["waiting_times"]["year_month"].slice(data["waiting_times"], start_ym, end_ym)
+            periods, totals = series[source].series(start_ym, end_ym)
         elif source == "service_time":
-            df = df_waiting
             value_col = "service_time"
-            filtered = df[(df["year_month"] >= start_ym) & (df["year_month"] <= end_ym)]
-            summary = filtered.groupby("year_month")[value_col].sum().reset_index()
-            summary["date"] = summary["year_month"].astype(str).str.slice(0, 4) + "-" + summary["year_month"].astype(str).str.slice(4, 6)
+            filtered = indexes["waiting_times"]["year_month"].slice(data["waiting_times"], start_ym, end_ym)
+            periods, totals = series[source].series(start_ym, end_ym)
         else:  # energy
-            df = df_energy
             value_col = "sum_energy"
-            filtered = df[(df["year_week"] >= start_yw) & (df["year_week"] <= end_yw)]
-            summary = filtered.groupby("year_week")[value_col].sum().reset_index()
-            summary["date"] = summary["year_week"].astype(str).str.slice(0, 4) + "-W" + summary["year_week"].astype(str).str.slice(4, None)
+            filtered = indexes["energy"]["year_week"].slice(data["energy"], start_yw, end_yw)
+            periods, totals = series[source].series(start_yw, end_yw)
+
+        labels = pd.Series(periods).astype(str)
+        separator = "-W" if source == "energy" else "-"
+        summary = pd.DataFrame({
+            "date": labels.str.slice(0, 4) + separator + labels.str.slice(4, None),
+            value_col: totals,
+        })
         fig = charts_explorer.plot_line_chart(summary, value_col)
         table = filtered.head(6)
         columns = [{"name": c.replace("_", " ").title(), "id": c} for c in table.columns]
@@ -179,6 +197,7 @@ def setup_explorer_callbacks(app, df_emissions, df_waiting, df_energy, controls)
         data_type = data_type_map.get(source, source.replace('_', ' ').title())
         
         # Get date range
+        controls = registry.current["controls_explorer"]
         if source == "energy":
             if start_week_idx is not None and end_week_idx is not None:
                 start_yw = controls["week_range"]["index_to_year_week"].get(start_week_idx)
@@ -260,23 +279,20 @@ def setup_explorer_callbacks(app, df_emissions, df_waiting, df_energy, controls)
         
         Example: panama_canal_emissions_data_2023-01_to_2023-12.csv
         """
+        data = registry.current
+        controls = data["controls_explorer"]
+        indexes = data["indexes"]
         start_ym = controls["date_range"]["index_to_year_month"].get(start_month_idx)
         end_ym = controls["date_range"]["index_to_year_month"].get(end_month_idx)
         start_yw = controls["week_range"]["index_to_year_week"].get(start_week_idx)
         end_yw = controls["week_range"]["index_to_year_week"].get(end_week_idx)
 
         if source == "emissions":
-            df = df_emissions
-            filtered = df[(df["year_month"] >= start_ym) & (df["year_month"] <= end_ym)]
-        elif source == "waiting_time":
-            df = df_waiting
-            filtered = df[(df["year_month"] >= start_ym) & (df["year_month"] <= end_ym)]
-        elif source == "service_time":
-            df = df_waiting
-            filtered = df[(df["year_month"] >= start_ym) & (df["year_month"] <= end_ym)]
+            filtered = indexes["emissions"]["year_month"].slice(data["emissions"], start_ym, end_ym)
+        elif source in ("waiting_time", "service_time"):
+            filtered = indexes["waiting_times"]["year_month"].slice(data["waiting_times"], start_ym, end_ym)
         else:
-            df = df_energy
-            filtered = df[(df["year_week"] >= start_yw) & (df["year_week"] <= end_yw)]
+            filtered = indexes["energy"]["year_week"].slice(data["energy"], start_yw, end_yw)
 
         # Save form information to S3 before returning the file
         if source == "energy":
@@ -7,13 +7,38 @@ from dash import html, ctx
 import plotly.graph_objects as go
 
 from data_utils import map_processing
+from data_utils.filter_cache import memoize_filter, normalize_selection
+from charts.figures import patch_figure_updates
 from charts import charts_waiting_times
 
 
-def setup_waiting_times_callbacks(app, df, controls):
+def setup_waiting_times_callbacks(app, registry):
     """
     These are the callbacks for the waiting times dashboard.
+
+    Both the waiting and the service tab read from the ``waiting_cube`` of
+    ``registry.current``, a ``WaitingTimeCube`` holding sums and counts for
+    both time columns.
     """
+    @memoize_filter
+    def filter_waiting_times(data, start_idx, end_idx, selected_vessels, selected_areas):
+        """Select the waiting time cube once per refresh.
+
+        The selection covers both time columns, so it is shared between the
+        sibling callbacks and across waiting/service tab switches.
+        """
+        controls = data["controls_waiting_times"]
+        start_ym = controls["date_range"]["index_to_year_month"][start_idx]
+        end_ym = controls["date_range"]["index_to_year_month"][end_idx]
+        return data["waiting_cube"].select(
+            start_ym,
+            end_ym,
+            normalize_selection(selected_vessels),
+            normalize_selection(selected_areas),
+        )
+
+    registry.add_listener(lambda _version: filter_waiting_times.clear())
+
     @app.callback(
         Output("time--checklist--vessel", "options"),
         Output("time--checklist--vessel", "value"),
@@ -26,7 +51,7 @@ def setup_waiting_times_callbacks(app, df, controls):
     def update_vessel_checklist(_select_all_clicks, _clear_all_clicks,
                                 search_value, selected_values):
         """Update vessel checklist options and selected values."""
-        vessel_types = controls["vessel_types"]
+        vessel_types = registry.current["controls_waiting_times"]["vessel_types"]
 
         if search_value:
             search_value = search_value.lower()
@@ -60,7 +85,7 @@ def setup_waiting_times_callbacks(app, df, controls):
     def update_checklist_stop_area(_select_all_clicks, _clear_all_clicks,
                                    search_value, selected_values):
         """Update stop area checklist options and values."""
-        stop_areas = controls["stop_area"]
+        stop_areas = registry.current["controls_waiting_times"]["stop_area"]
 
         if search_value:
             search_value = search_value.lower()
@@ -89,6 +114,7 @@ def setup_waiting_times_callbacks(app, df, controls):
     )
     def validate_date_range(start_idx, end_idx):
         """Ensure the start date is not after the end date."""
+        controls = registry.current["controls_waiting_times"]
         if start_idx is None:
             start_idx = controls["date_range"].get("default_start_index", controls["date_range"]["min_index"])
         if end_idx is None:
@@ -105,6 +131,7 @@ def setup_waiting_times_callbacks(app, df, controls):
         [
             Output("time--chart--1", "figure"),
             Output("time--chart--1-fullscreen", "figure"),
+            Output("time--chart--1-structure", "data"),
         ],
         Input("time--btn--refresh", "n_clicks"),
         [
@@ -112,9 +139,11 @@ def setup_waiting_times_callbacks(app, df, controls):
             State("time--start-date", "value"),
             State("time--end-date", "value"),
             State("time--checklist--vessel", "value"),
-            State("time--checklist--stop-area", "value")
+            State("time--checklist--stop-area", "value"),
+            State("time--chart--1-structure", "data")
         ]
     )
+    @patch_figure_updates
     def update_chart_1(_n_clicks, current_tab, start_idx, end_idx, selected_vessels, selected_areas):
         """Updates chart 1 only."""
         # Don't update charts if we don't have a valid tab
@@ -126,25 +155,14 @@ def setup_waiting_times_callbacks(app, df, controls):
             return {}, {}
         
         time_col = "waiting_time" if current_tab == "waiting" else "service_time"
-        start_ym = controls["date_range"]["index_to_year_month"][start_idx]
-        end_ym = controls["date_range"]["index_to_year_month"][end_idx]
-
-        filtered_df = df[
-            (df["year_month"] >= start_ym) &
-            (df["year_month"] <= end_ym) &
-            (df["StandardVesselType"].isin(selected_vessels)) &
-            (df["stop_area"].isin(selected_areas))
-        ]
-
-        # Sort by year_month
-        filtered_df = filtered_df.sort_values("year_month")
+        selection = filter_waiting_times(registry.current, start_idx, end_idx, selected_vessels, selected_areas)
 
-        if filtered_df.empty:
+        if selection.empty:
             empty_fig = go.Figure()
             return empty_fig, empty_fig
         
         # Chart 1: Line chart of waiting/service time by year and month
-        df_waiting_time_avg = filtered_df.groupby(['year', 'month'])[time_col].mean().reset_index()
+        df_waiting_time_avg = selection.by_year_month(time_col)
         fig = charts_waiting_times.plot_line_chart_waiting_time_by_year_month(df_waiting_time_avg, value_column=time_col)
         return fig, fig
 
@@ -152,6 +170,7 @@ def setup_waiting_times_callbacks(app, df, controls):
         [
             Output("time--chart--2", "figure"),
             Output("time--chart--2-fullscreen", "figure"),
+            Output("time--chart--2-structure", "data"),
         ],
         Input("time--btn--refresh", "n_clicks"),
         [
@@ -159,9 +178,11 @@ def setup_waiting_times_callbacks(app, df, controls):
             State("time--start-date", "value"),
             State("time--end-date", "value"),
             State("time--checklist--vessel", "value"),
-            State("time--checklist--stop-area", "value")
+            State("time--checklist--stop-area", "value"),
+            State("time--chart--2-structure", "data")
         ]
     )
+    @patch_figure_updates
     def update_chart_2(_n_clicks, current_tab, start_idx, end_idx, selected_vessels, selected_areas):
         """Updates chart 2 only."""
         # Don't update charts if we don't have a valid tab
@@ -173,25 +194,14 @@ def setup_waiting_times_callbacks(app, df, controls):
             return {}, {}
         
         time_col = "waiting_time" if current_tab == "waiting" else "service_time"
-        start_ym = controls["date_range"]["index_to_year_month"][start_idx]
-        end_ym = controls["date_range"]["index_to_year_month"][end_idx]
+        selection = filter_waiting_times(registry.current, start_idx, end_idx, selected_vessels, selected_areas)
 
-        filtered_df = df[
-            (df["year_month"] >= start_ym) &
-            (df["year_month"] <= end_ym) &
-            (df["StandardVesselType"].isin(selected_vessels)) &
-            (df["stop_area"].isin(selected_areas))
-        ]
-
-        # Sort by year_month
-        filtered_df = filtered_df.sort_values("year_month")
-
-        if filtered_df.empty:
+        if selection.empty:
             empty_fig = go.Figure()
             return empty_fig, empty_fig
         
         # Chart 2: Bar chart of waiting/service time by stop area
-        avg_waiting_times = filtered_df.groupby('stop_area')[time_col].mean().reset_index()
+        avg_waiting_times = selection.by_stop_area(time_col)
         top_areas = avg_waiting_times.sort_values(time_col, ascending=False).head(6)
         fig = charts_waiting_times.plot_bar_chart_waiting_by_stop_area(top_areas, value_column=time_col)
         return fig, fig
@@ -200,6 +210,7 @@ def setup_waiting_times_callbacks(app, df, controls):
         [
             Output("time--chart--3", "figure"),
             Output("time--chart--3-fullscreen", "figure"),
+            Output("time--chart--3-structure", "data"),
         ],
         Input("time--btn--refresh", "n_clicks"),
         [
@@ -207,9 +218,11 @@ def setup_waiting_times_callbacks(app, df, controls):
             State("time--start-date", "value"),
             State("time--end-date", "value"),
             State("time--checklist--vessel", "value"),
-            State("time--checklist--stop-area", "value")
+            State("time--checklist--stop-area", "value"),
+            State("time--chart--3-structure", "data")
         ]
     )
+    @patch_figure_updates
     def update_chart_3(_n_clicks, current_tab, start_idx, end_idx, selected_vessels, selected_areas):
         """Updates chart 3 only."""
         # Don't update charts if we don't have a valid tab
@@ -221,25 +234,14 @@ def setup_waiting_times_callbacks(app, df, controls):
             return {}, {}
         
         time_col = "waiting_time" if current_tab == "waiting" else "service_time"
-        start_ym = controls["date_range"]["index_to_year_month"][start_idx]
-        end_ym = controls["date_range"]["index_to_year_month"][end_idx]
-
-        filtered_df = df[
-            (df["year_month"] >= start_ym) &
-            (df["year_month"] <= end_ym) &
-            (df["StandardVesselType"].isin(selected_vessels)) &
-            (df["stop_area"].isin(selected_areas))
-        ]
-
-        # Sort by year_month
-        filtered_df = filtered_df.sort_values("year_month")
+        selection = filter_waiting_times(registry.current, start_idx, end_idx, selected_vessels, selected_areas)
 
-        if filtered_df.empty:
+        if selection.empty:
             empty_fig = go.Figure()
             return empty_fig, empty_fig
         
         # Chart 3: Bar chart of waiting/service time by vessel type
-        top_waiting_by_vessel = filtered_df.groupby('StandardVesselType')[time_col].mean().sort_values(ascending=False).head(6)
+        top_waiting_by_vessel = selection.by_vessel_type(time_col).sort_values(ascending=False).head(6)
         fig = charts_waiting_times.plot_bar_chart_waiting_by_vessel_type(top_waiting_by_vessel, value_column=time_col)
         return fig, fig
 
@@ -247,6 +249,7 @@ def setup_waiting_times_callbacks(app, df, controls):
         [
             Output("time--chart--4", "figure"),
             Output("time--chart--4-fullscreen", "figure"),
+            Output("time--chart--4-structure", "data"),
         ],
         Input("time--btn--refresh", "n_clicks"),
         [
@@ -254,9 +257,11 @@ def setup_waiting_times_callbacks(app, df, controls):
             State("time--start-date", "value"),
             State("time--end-date", "value"),
             State("time--checklist--vessel", "value"),
-            State("time--checklist--stop-area", "value")
+            State("time--checklist--stop-area", "value"),
+            State("time--chart--4-structure", "data")
         ]
     )
+    @patch_figure_updates
     def update_chart_4(_n_clicks, current_tab, start_idx, end_idx, selected_vessels, selected_areas):
         """Updates chart 4 only."""
         # Don't update charts if we don't have a valid tab
@@ -268,25 +273,14 @@ def setup_waiting_times_callbacks(app, df, controls):
             return {}, {}
         
         time_col = "waiting_time" if current_tab == "waiting" else "service_time"
-        start_ym = controls["date_range"]["index_to_year_month"][start_idx]
-        end_ym = controls["date_range"]["index_to_year_month"][end_idx]
+        selection = filter_waiting_times(registry.current, start_idx, end_idx, selected_vessels, selected_areas)
 
-        filtered_df = df[
-            (df["year_month"] >= start_ym) &
-            (df["year_month"] <= end_ym) &
-            (df["StandardVesselType"].isin(selected_vessels)) &
-            (df["stop_area"].isin(selected_areas))
-        ]
-
-        # Sort by year_month
-        filtered_df = filtered_df.sort_values("year_month")
-
-        if filtered_df.empty:
+        if selection.empty:
             empty_fig = go.Figure()
             return empty_fig, empty_fig
         
         # Chart 4: Line chart of waiting/service time by vessel type and year/month
-        df_type_week = filtered_df.groupby(["StandardVesselType", "year_month"])[time_col].mean().reset_index()
+        df_type_week = selection.by_vessel_type_year_month(time_col)
         fig = charts_waiting_times.plot_line_chart_waiting_by_type_week(df_type_week, value_column=time_col)
         return fig, fig
 
@@ -310,22 +304,10 @@ def setup_waiting_times_callbacks(app, df, controls):
         if start_idx is None or end_idx is None:
             return False
         
-        time_col = "waiting_time" if current_tab == "waiting" else "service_time"
-        start_ym = controls["date_range"]["index_to_year_month"][start_idx]
-        end_ym = controls["date_range"]["index_to_year_month"][end_idx]
-
-        filtered_df = df[
-            (df["year_month"] >= start_ym) &
-            (df["year_month"] <= end_ym) &
-            (df["StandardVesselType"].isin(selected_vessels)) &
-            (df["stop_area"].isin(selected_areas))
-        ]
-
-        # Sort by year_month
-        filtered_df = filtered_df.sort_values("year_month")
+        selection = filter_waiting_times(registry.current, start_idx, end_idx, selected_vessels, selected_areas)
         
         # Check if data exists
-        has_data = len(filtered_df) > 0
+        has_data = not selection.empty
         return not has_data
 
     @app.callback(
@@ -341,6 +323,7 @@ def setup_waiting_times_callbacks(app, df, controls):
         if start_idx is None or end_idx is None:
             return ""
         
+        controls = registry.current["controls_waiting_times"]
         start_ym = controls["date_range"]["index_to_year_month"][start_idx]
         end_ym = controls["date_range"]["index_to_year_month"][end_idx]
 
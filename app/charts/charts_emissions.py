@@ -3,8 +3,12 @@ This module contains functions to create various charts related to emissions dat
 """
 
 from dash import html, dcc
-import plotly.graph_objects as go
 import theme
+from charts.figures import figure, trace
+
+# Initial view of the emissions map
+MAP_CENTER = {"lat": 9.117975, "lon": -79.735890}
+MAP_ZOOM = 7
 
 def plot_kpi(name, value, start_date, end_date, comparison_label="", comparison_value=0, delta=None, delta_percent=None):
     """
@@ -71,10 +75,8 @@ def plot_line_chart_emissions_by_year_month(df, top_padding_pct=0.1, bottom_padd
     """
     Function to create a line chart of emissions by year and month.
     """
-    fig = go.Figure()
-
     if df.empty:
-        return fig  # Return an empty figure
+        return figure()  # Return an empty figure
 
     # === Styling Setup ===
     last_year = df['year'].max()
@@ -90,10 +92,12 @@ def plot_line_chart_emissions_by_year_month(df, top_padding_pct=0.1, bottom_padd
     highlight_width = 3
 
     # === Add traces per year ===
+    traces = []
     for year in df['year'].unique():
         year_data = df[df['year'] == year]
         is_latest = year == last_year
-        fig.add_trace(go.Scatter(
+        traces.append(trace(
+            "scatter",
             x=year_data['month'],
             y=year_data['co2_equivalent_t'],
             mode='lines+markers',
@@ -113,14 +117,7 @@ def plot_line_chart_emissions_by_year_month(df, top_padding_pct=0.1, bottom_padd
         ))
 
     # === Layout ===
-    fig.update_layout(
-        height=300,
-
-        dragmode="zoom",
-
-        hovermode="x unified",
-
-
+    return figure(traces, layout=dict(
         xaxis=dict(
             tickmode="array",
             tickvals=list(range(1, 13)),
@@ -132,6 +129,7 @@ def plot_line_chart_emissions_by_year_month(df, top_padding_pct=0.1, bottom_padd
             showgrid=True
         ),
         yaxis=dict(
+            tickfont=dict(color=theme.DARK_GRAY),
             range=[y_min * (1 - bottom_padding_pct), y_max * (1 + top_padding_pct)],
             showgrid=True,
             gridcolor="lightgray",
@@ -141,12 +139,9 @@ def plot_line_chart_emissions_by_year_month(df, top_padding_pct=0.1, bottom_padd
             zerolinewidth=1.5,
             side="left",
             anchor="free",
-            tickfont_color=theme.DARK_GRAY,
             shift=-10,
             tickformat=".2e"
         ),
-
-        showlegend=True,
         legend=dict(
             x=-0.09,
             y=1.1,
@@ -154,24 +149,24 @@ def plot_line_chart_emissions_by_year_month(df, top_padding_pct=0.1, bottom_padd
             yanchor="top",
             orientation="h"
         ),
-
         margin=dict(l=0, r=0, t=0, b=0),
+        height=300,
+        dragmode="zoom",
+        hovermode="x unified",
+        showlegend=True,
         plot_bgcolor="white"
-    )
-
-    return fig
+    ))
 
 def plot_bar_chart_emissions_by_type(df):
     """
     Function to create a horizontal bar chart of emissions by vessel type.
     """
-    fig = go.Figure()
-
     if df.empty:
-        return fig
+        return figure()
 
     # === Add traces ===
-    fig.add_trace(go.Bar(
+    bar = trace(
+        "bar",
         y=df.index,  # Vessel types on Y-axis
         x=df.values,  # Emission values on X-axis
         orientation="h",
@@ -180,14 +175,9 @@ def plot_bar_chart_emissions_by_type(df):
             line=dict(color="black", width=0)  # Border for better visibility
         ),
         hovertemplate='%{x:.2e} tonnes CO<sub>2</sub><sub>-eq</sub><extra></extra>'
+    )
 
-    ))
-
-    fig.update_layout(
-        height=300,  # Keeps height fixed
-
-        dragmode=False,
-
+    return figure([bar], layout=dict(
         xaxis=dict(
             showgrid=True, gridcolor="lightgray", gridwidth=0,
             zeroline=False,  # Removes the thick zero line
@@ -195,30 +185,24 @@ def plot_bar_chart_emissions_by_type(df):
             tickformat=".2e"
         ),
         yaxis=dict(
+            tickfont=dict(size=12, color=theme.DARK_GRAY),  # Make labels more readable
             showgrid=False,
             categoryorder="total ascending",  # Ensure correct sorting
             automargin=True,  # Allows automatic space adjustment for labels
             tickmode="array",
-            tickfont=dict(size=12),  # Make labels more readable
-            tickfont_color=theme.DARK_GRAY,
-
         ),
-
         margin=dict(l=0, r=0, t=0, b=0),
+        height=300,  # Keeps height fixed
+        dragmode=False,
         plot_bgcolor="white"
-
-    )
-
-    return fig
+    ))
 
 def plot_line_chart_emissions_by_type_year_month(df, top_padding_pct=0.1, bottom_padding_pct=0.1):
     """
     Function to create a line chart of emissions by vessel type and year/month.
     """
-    fig = go.Figure()
-
     if df.empty or "StandardVesselType" not in df.columns:
-        return fig  # Return empty figure if no data
+        return figure()  # Return empty figure if no data
 
     # Top 3 vessel types by average emissions
     avg_emissions = df.groupby("StandardVesselType")["co2_equivalent_t"].sum()
@@ -236,6 +220,7 @@ def plot_line_chart_emissions_by_type_year_month(df, top_padding_pct=0.1, bottom
             return f"{ym_str[:4]}-{ym_str[4:]}"
         return ym_str
 
+    traces = []
     for vessel_type in df["StandardVesselType"].unique():
         vessel_data = df[df["StandardVesselType"] == vessel_type]
         if vessel_data.empty:
@@ -247,7 +232,8 @@ def plot_line_chart_emissions_by_type_year_month(df, top_padding_pct=0.1, bottom
         # Format the year_month values for hover display
         formatted_dates = [format_year_month(ym) for ym in vessel_data["year_month"]]
 
-        fig.add_trace(go.Scatter(
+        traces.append(trace(
+            "scatter",
             x=vessel_data["year_month"],
             y=vessel_data["co2_equivalent_t"],
             mode="lines",
@@ -286,9 +272,7 @@ def plot_line_chart_emissions_by_type_year_month(df, top_padding_pct=0.1, bottom
         selected_year_months = unique_year_months
         selected_labels = formatted_labels
 
-    fig.update_layout(
-        height=300,
-        dragmode="zoom",
+    return figure(traces, layout=dict(
         xaxis=dict(
             showgrid=False,
             type="category",
@@ -299,6 +283,7 @@ def plot_line_chart_emissions_by_type_year_month(df, top_padding_pct=0.1, bottom
             tickangle=0
         ),
         yaxis=dict(
+            tickfont=dict(color=theme.DARK_GRAY),
             range=[y_min * (1 - bottom_padding_pct), y_max * (1 + top_padding_pct)],
             showgrid=True,
             gridcolor="lightgray",
@@ -307,7 +292,6 @@ def plot_line_chart_emissions_by_type_year_month(df, top_padding_pct=0.1, bottom
             zerolinewidth=1.5,
             side="left",
             anchor="free",
-            tickfont_color=theme.DARK_GRAY,
             shift=-10,
             tickformat=".2e"
         ),
@@ -318,10 +302,10 @@ def plot_line_chart_emissions_by_type_year_month(df, top_padding_pct=0.1, bottom
             orientation="h"
         ),
         margin=dict(l=0, r=0, t=0, b=0),
+        height=300,
+        dragmode="zoom",
         plot_bgcolor="white"
-    )
-
-    return fig
+    ))
 
 def plot_emissions_map(gdf_json, gdf):
     """
@@ -333,49 +317,35 @@ def plot_emissions_map(gdf_json, gdf):
 
     values = gdf["co2_equivalent_t"]
 
-    fig = go.Figure(go.Choroplethmap(
-
+    choropleth = trace(
+        "choroplethmap",
+        # GeoJSON dict, or the URL plotly.js downloads it from
         geojson=gdf_json,
         locations=gdf["resolution_id"],
         z=values,
-
         featureidkey="properties.resolution_id",
         colorscale=[[0, 'rgb(238,238,238)'], [1, theme.PRIMARY_COLOR]],
-
-        marker_opacity=0.7,
-        marker_line_width=0.5,
-        marker_line_color="lightgray",
-
-
+        marker=dict(opacity=0.7, line=dict(width=0.5, color="lightgray")),
         name="",  # Prevents "trace 0" in the tooltip
         hovertemplate='%{z:.2e} tonnes CO<sub>2</sub><sub>-eq</sub><extra></extra>',
-
         showscale=False,
-
-        colorbar_title="Emissions (tonnes CO<sub>2</sub><sub>-eq</sub>)",
-
         colorbar=dict(
             orientation="h",
             thickness=10,
             tickfont=dict(size=9),
-            title="Emissions (tonnes CO<sub>2</sub><sub>-eq</sub>)",
+            title=dict(text="Emissions (tonnes CO<sub>2</sub><sub>-eq</sub>)"),
             tickformat=".2e"
         )
     )
-    )
 
-    if gdf.empty:
-        return fig  # Return an empty figure gracefully
-
-
-    fig.update_layout(
-        height=300,
+    return figure([choropleth], layout=dict(
         map=dict(
-            center={"lat": 9.117975, "lon": -79.735890},
-            zoom=7,
+            center=MAP_CENTER,
+            zoom=MAP_ZOOM,
             style="light"  # or "white-bg", "stamen-terrain", etc.
         ),
         margin={"r": 0, "t": 0, "l": 0, "b": 0},
-    )
-
-    return fig
+        height=300,
+        # Keep the user's pan and zoom when the map switches resolution
+        uirevision="emissions-map",
+    ))
@@ -1,19 +1,19 @@
-import plotly.graph_objects as go
 import pandas as pd
-import plotly.express as px
 import pycountry
 
 import theme
+from charts.figures import figure, trace
+
+# Largest bubble diameter in pixels, as plotly.express draws it
+BUBBLE_SIZE_MAX = 20
 
 
 def plot_line_chart_energy_demand_by_year_week(df, top_padding_pct=0.1, bottom_padding_pct=0.1):
     """
     Function to create a line chart of emissions by year and month.
     """
-    fig = go.Figure()
-
     if df.empty:
-        return fig  # Return an empty figure
+        return figure()  # Return an empty figure
 
     # === Styling Setup ===
     last_year = df['year'].max()
@@ -29,10 +29,12 @@ def plot_line_chart_energy_demand_by_year_week(df, top_padding_pct=0.1, bottom_p
     highlight_width = 3
 
     # === Add traces per year ===
+    traces = []
     for year in df['year'].unique():
         year_data = df[df['year'] == year]
         is_latest = year == last_year
-        fig.add_trace(go.Scatter(
+        traces.append(trace(
+            "scatter",
             x=year_data['week'],
             y=year_data['sum_energy'],
             mode='lines',
@@ -50,14 +52,7 @@ def plot_line_chart_energy_demand_by_year_week(df, top_padding_pct=0.1, bottom_p
     tickvals = list(range(2, 53, 2))  # 2, 4, 6, ..., 52
     ticktext = [f"{week}" for week in tickvals]
 
-    fig.update_layout(
-        height=300,
-
-        dragmode="zoom",
-
-        hovermode="x unified",
-
-
+    return figure(traces, layout=dict(
         xaxis=dict(
             tickmode="array",
             tickvals=tickvals,
@@ -66,6 +61,7 @@ def plot_line_chart_energy_demand_by_year_week(df, top_padding_pct=0.1, bottom_p
             showgrid=True
         ),
         yaxis=dict(
+            tickfont=dict(color=theme.DARK_GRAY),
             range=[y_min * (1 - bottom_padding_pct), y_max * (1 + top_padding_pct)],
             showgrid=True,
             gridcolor="lightgray",
@@ -75,12 +71,9 @@ def plot_line_chart_energy_demand_by_year_week(df, top_padding_pct=0.1, bottom_p
             zerolinewidth=1.5,
             side="left",
             anchor="free",
-            tickfont_color=theme.DARK_GRAY,
             shift=-10,
             tickformat=".2e"
         ),
-
-        showlegend=True,
         legend=dict(
             x=-0.09,
             y=1.1,
@@ -88,12 +81,13 @@ def plot_line_chart_energy_demand_by_year_week(df, top_padding_pct=0.1, bottom_p
             yanchor="top",
             orientation="h"
         ),
-
         margin=dict(l=0, r=0, t=0, b=0),
+        height=300,
+        dragmode="zoom",
+        hovermode="x unified",
+        showlegend=True,
         plot_bgcolor="white"
-    )
-
-    return fig
+    ))
 
 
 def plot_bar_chart_energy_by_country(df, value_column="country_before"):
@@ -108,13 +102,12 @@ def plot_bar_chart_energy_by_country(df, value_column="country_before"):
 
     Returns
     -------
-    plotly.graph_objects.Figure
+    dict
         Bar chart figure.
     """
 
-    fig = go.Figure()
-
-    fig.add_trace(go.Bar(
+    bar = trace(
+        "bar",
         y=df[value_column],
         x=df['sum_energy'],
         orientation='h',
@@ -123,12 +116,9 @@ def plot_bar_chart_energy_by_country(df, value_column="country_before"):
             line=dict(color="black", width=0)
         ),
         hovertemplate='%{y}<br>%{x:.2e} kWh<extra></extra>'
-    ))
-
-    fig.update_layout(
-        height=300,
-        dragmode=False,
+    )
 
+    return figure([bar], layout=dict(
         xaxis=dict(
             showgrid=True, gridcolor="lightgray", gridwidth=0,
             zeroline=False,
@@ -136,17 +126,16 @@ def plot_bar_chart_energy_by_country(df, value_column="country_before"):
             tickformat=".2e"
         ),
         yaxis=dict(
+            tickfont=dict(size=12, color=theme.DARK_GRAY),
             showgrid=False,
             automargin=True,
             categoryorder="total ascending",
-            tickfont=dict(size=12, color=theme.DARK_GRAY),
         ),
-
         margin=dict(l=0, r=0, t=0, b=0),
+        height=300,
+        dragmode=False,
         plot_bgcolor="white"
-    )
-
-    return fig
+    ))
 
 
 def plot_sankey_before_after(df, origin_col="country_before", dest_col="country_after", top_n=10,):
@@ -159,7 +148,7 @@ def plot_sankey_before_after(df, origin_col="country_before", dest_col="country_
     - title (str): Title of the Sankey diagram
 
     Returns:
-    - fig (plotly.graph_objects.Figure): Sankey diagram figure
+    - fig (dict): Sankey diagram figure
     """
     # Step 1: Group by origin and destination
     sankey_data = (
@@ -186,7 +175,8 @@ def plot_sankey_before_after(df, origin_col="country_before", dest_col="country_
     link_colors = [link_color] * len(sankey_data)
 
     # Step 5: Create Sankey
-    fig = go.Figure(data=[go.Sankey(
+    sankey = trace(
+        "sankey",
         node=dict(
             label=all_labels,
             pad=15,
@@ -201,12 +191,11 @@ def plot_sankey_before_after(df, origin_col="country_before", dest_col="country_
             color=link_colors,
             hovertemplate='%{source.label} → %{target.label}<br>%{value:.2e} kWh<extra></extra>'
         )
-    )])
-    fig.update_layout(
-        height=300,  # Increased height for better visibility
-        margin=dict(l=5, r=5, t=5, b=5)
     )
-    return fig
+    return figure([sankey], layout=dict(
+        margin=dict(l=5, r=5, t=5, b=5),
+        height=300,  # Increased height for better visibility
+    ))
 
 
 
@@ -225,7 +214,7 @@ def get_country_name(code2):
     except:
         return code2
 
-def generate_energy_bubble_map(df, country_role='country_before', title="Energy by Country"):
+def generate_energy_bubble_map(df, country_role='country_before', title="Energy by Country", countries=None):
     """
     Creates a bubble map using Plotly, where bubble size = sum_energy for each country.
 
@@ -233,9 +222,11 @@ def generate_energy_bubble_map(df, country_role='country_before', title="Energy
     - df: pandas DataFrame with ['country_before', 'country_after', 'country_code_before', 'country_code_after', 'sum_energy']
     - country_role: 'country_before' or 'country_after'
     - title: Chart title
+    - countries: country dimension table (see data_utils.countries) used to
+      look up ISO-3 codes; falls back to pycountry when not given
 
     Returns:
-    - fig: Plotly figure
+    - fig: Plotly figure dict
     """
 
     # Step 1: Choose role and corresponding ISO code
@@ -243,33 +234,46 @@ def generate_energy_bubble_map(df, country_role='country_before', title="Energy
     #iso_code_col = 'country_code_before' if country_role == 'country_before' else 'country_code_after'
 
     # Step 2: Group by country
-    grouped = df.groupby([country_role])['sum_energy'].sum().reset_index()
+    grouped = df.groupby([country_role], observed=True)['sum_energy'].sum().reset_index()
     grouped.columns = ['iso2', 'sum_energy']
 
     # Step 3: Convert ISO-2 to ISO-3 (for Plotly)
-    grouped['iso3'] = grouped['iso2'].apply(get_iso3)
+    if countries is not None:
+        grouped['iso3'] = countries['iso3'].reindex(grouped['iso2']).to_numpy()
+    else:
+        grouped['iso3'] = grouped['iso2'].apply(get_iso3)
     grouped = grouped.dropna(subset=['iso3'])  # drop rows without a valid ISO3
 
     # Step 4: Plot
-    fig = px.scatter_geo(
-        grouped,
-        locations="iso3",
-        size="sum_energy",
-        projection="natural earth",
-        hover_data={'iso3': True, 'sum_energy': True},  # Hide iso3, show sum_energy
-        custom_data=['iso2', 'sum_energy']  # Add custom data for tooltip
-    )
-
-    # Update tooltip with custom formatting
-    fig.update_traces(
+    # Bubbles are sized by area, the largest BUBBLE_SIZE_MAX pixels across,
+    # as plotly.express.scatter_geo draws them
+    bubbles = trace(
+        "scattergeo",
+        geo="geo",
+        locations=grouped['iso3'],
+        # Custom data for the tooltip, followed by the ISO-3 code as
+        # plotly.express adds its hover data
+        customdata=grouped[['iso2', 'sum_energy', 'iso3']].to_numpy(),
+        # Update tooltip with custom formatting
         hovertemplate="<b>%{customdata[0]}</b>: %{customdata[1]:.2e} kWh<extra></extra>",
-        marker=dict(color=theme.PRIMARY_COLOR)
+        marker=dict(
+            color=theme.PRIMARY_COLOR,
+            size=grouped['sum_energy'],
+            sizemode="area",
+            sizeref=float(grouped['sum_energy'].max()) / BUBBLE_SIZE_MAX ** 2,
+            symbol="circle",
+        ),
+        mode="markers",
+        legendgroup="",
+        name="",
+        showlegend=False,
     )
-    
-    fig.update_layout(
-        height=300,  # Increased height for bigger chart
-        #width=500,   # Set width for better proportions
+
+    return figure([bubbles], layout=dict(
         geo=dict(
+            domain=dict(x=[0.0, 1.0], y=[0.0, 1.0]),
+            projection=dict(type="natural earth"),
+            center=dict(),
             showland=True,
             #landcolor="LightGrey",
             showframe=True,
@@ -279,6 +283,8 @@ def generate_energy_bubble_map(df, country_role='country_before', title="Energy
             #showocean=True,
             #oceancolor="lightblue"
         ),
-        margin=dict(l=0, r=0, t=0, b=0)  # Remove margins to use full container space
-    )
-    return fig
+        legend=dict(tracegroupgap=0, itemsizing="constant"),
+        margin=dict(t=0, l=0, r=0, b=0),  # Remove margins to use full container space
+        height=300,  # Increased height for bigger chart
+        #width=500,   # Set width for better proportions
+    ))
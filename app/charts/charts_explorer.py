@@ -1,29 +1,26 @@
 """Charts for the explorer tab."""
 
-import plotly.graph_objects as go
-
+from charts.figures import figure, trace
 from theme import PRIMARY_COLOR
 
 
 def plot_line_chart(df, value_column):
     """Create a simple line chart."""
-    fig = go.Figure()
-
     if df.empty:
-        return fig
+        return figure()
 
-    fig.add_trace(go.Scatter(
+    line = trace(
+        "scatter",
         x=df["date"],
         y=df[value_column],
         mode="lines",
         line=dict(color=PRIMARY_COLOR)
-    ))
+    )
 
-    fig.update_layout(
-        height=300,
+    return figure([line], layout=dict(
         margin=dict(l=0, r=0, t=0, b=0),
-        xaxis_title="Date",
-        yaxis_title=value_column.replace("_", " ").title(),
+        height=300,
+        xaxis=dict(title=dict(text="Date")),
+        yaxis=dict(title=dict(text=value_column.replace("_", " ").title())),
         plot_bgcolor="white",
-    )
-    return fig
+    ))
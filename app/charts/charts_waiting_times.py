@@ -2,15 +2,13 @@
 This module contains functions to create the charts related to emissions data.
 """
 
-import plotly.graph_objects as go
 import theme
+from charts.figures import figure, trace
 
 def plot_line_chart_waiting_time_by_year_month(df, value_column="waiting_time", top_padding_pct=0.1, bottom_padding_pct=0.1):
     """
     Function to create a line chart of waiting times by year and month.
     """
-    fig = go.Figure()
-
     last_year = df['year'].max()
     y_max = df[value_column].max()
     y_min = df[value_column].min()
@@ -23,10 +21,12 @@ def plot_line_chart_waiting_time_by_year_month(df, value_column="waiting_time",
     highlight_opacity = 1
     highlight_width = 3
 
+    traces = []
     for year in df['year'].unique():
         year_data = df[df['year'] == year]
         is_latest = year == last_year
-        fig.add_trace(go.Scatter(
+        traces.append(trace(
+            "scatter",
             x=year_data['month'],
             y=year_data[value_column],
             mode='lines+markers',
@@ -45,10 +45,7 @@ def plot_line_chart_waiting_time_by_year_month(df, value_column="waiting_time",
             showlegend=True
         ))
 
-    fig.update_layout(
-        height=300,
-        dragmode="zoom",
-        hovermode="x unified",
+    return figure(traces, layout=dict(
         xaxis=dict(
             tickmode="array",
             tickvals=list(range(1, 13)),
@@ -59,6 +56,7 @@ def plot_line_chart_waiting_time_by_year_month(df, value_column="waiting_time",
             showgrid=True
         ),
         yaxis=dict(
+            tickfont=dict(color=theme.DARK_GRAY),
             range=[y_min * (1 - bottom_padding_pct), y_max * (1 + top_padding_pct)],
             showgrid=True,
             gridcolor="lightgray",
@@ -68,7 +66,6 @@ def plot_line_chart_waiting_time_by_year_month(df, value_column="waiting_time",
             zerolinewidth=1.5,
             side="left",
             anchor="free",
-            tickfont_color=theme.DARK_GRAY,
             shift=-10
         ),
         legend=dict(
@@ -77,10 +74,11 @@ def plot_line_chart_waiting_time_by_year_month(df, value_column="waiting_time",
             orientation="h"
         ),
         margin=dict(l=0, r=0, t=0, b=0),
+        height=300,
+        dragmode="zoom",
+        hovermode="x unified",
         plot_bgcolor="white"
-    )
-
-    return fig
+    ))
 
 
 def plot_bar_chart_waiting_by_stop_area(df, value_column="waiting_time"):
@@ -99,9 +97,8 @@ def plot_bar_chart_waiting_by_stop_area(df, value_column="waiting_time"):
         Bar chart figure.
     """
 
-    fig = go.Figure()
-
-    fig.add_trace(go.Bar(
+    bar = trace(
+        "bar",
         y=df['stop_area'],
         x=df[value_column],
         orientation='h',
@@ -110,29 +107,25 @@ def plot_bar_chart_waiting_by_stop_area(df, value_column="waiting_time"):
             line=dict(color="black", width=0)
         ),
         hovertemplate='%{y}<br>%{x:.2f} hours<extra></extra>'
-    ))
-
-    fig.update_layout(
-        height=300,
-        dragmode=False,
+    )
 
+    return figure([bar], layout=dict(
         xaxis=dict(
             showgrid=True, gridcolor="lightgray", gridwidth=0,
             zeroline=False,
             range=[-df[value_column].max() * 0.05, df[value_column].max()]
         ),
         yaxis=dict(
+            tickfont=dict(size=12, color=theme.DARK_GRAY),
             showgrid=False,
             automargin=True,
             categoryorder="total ascending",
-            tickfont=dict(size=12, color=theme.DARK_GRAY),
         ),
-
         margin=dict(l=0, r=0, t=0, b=0),
+        height=300,
+        dragmode=False,
         plot_bgcolor="white"
-    )
-
-    return fig
+    ))
 
 
 def plot_bar_chart_waiting_by_vessel_type(df_summary, value_column="waiting_time"):
@@ -150,9 +143,8 @@ def plot_bar_chart_waiting_by_vessel_type(df_summary, value_column="waiting_time
     plotly.graph_objects.Figure
         Bar chart figure.
     """
-    fig = go.Figure()
-
-    fig.add_trace(go.Bar(
+    bar = trace(
+        "bar",
         y=df_summary.index,
         x=df_summary.values,
         orientation="h",
@@ -161,29 +153,25 @@ def plot_bar_chart_waiting_by_vessel_type(df_summary, value_column="waiting_time
             line=dict(color="black", width=0)
         ),
         hovertemplate='%{y}<br>%{x:.2f} hours<extra></extra>'
-    ))
-
-    fig.update_layout(
-        height=300,
-        dragmode=False,
+    )
 
+    return figure([bar], layout=dict(
         xaxis=dict(
             showgrid=True, gridcolor="lightgray", gridwidth=0,
             zeroline=False,
             range=[-0.5, df_summary.max()]
         ),
         yaxis=dict(
+            tickfont=dict(size=12, color=theme.DARK_GRAY),
             showgrid=False,
             automargin=True,
             categoryorder="total ascending",
-            tickfont=dict(size=12, color=theme.DARK_GRAY),
         ),
-
         margin=dict(l=0, r=0, t=0, b=0),
+        height=300,
+        dragmode=False,
         plot_bgcolor="white"
-    )
-
-    return fig
+    ))
 
 
 def plot_line_chart_waiting_by_type_week(
@@ -205,15 +193,13 @@ def plot_line_chart_waiting_by_type_week(
     plotly.graph_objects.Figure
         Line chart figure.
     """
-    fig = go.Figure()
-
     if df.empty or "StandardVesselType" not in df.columns:
-        return fig  # Return empty figure if no data
+        return figure()  # Return empty figure if no data
     
     df["year_month_int"] = df["year_month"].astype(int)
 
     # Top 3 vessel types by average waiting time
-    avg_waiting = df.groupby("StandardVesselType")[value_column].mean()
+    avg_waiting = df.groupby("StandardVesselType", observed=True)[value_column].mean()
     top_3_types = avg_waiting.sort_values(ascending=False).head(3).index.tolist()
 
     # Assign highlight color for top types
@@ -231,6 +217,7 @@ def plot_line_chart_waiting_by_type_week(
     y_max = df[value_column].max()
     y_min = df[value_column].min()
 
+    traces = []
     for vessel_type in df["StandardVesselType"].unique():
         vessel_data = df[df["StandardVesselType"] == vessel_type]
         if vessel_data.empty:
@@ -241,7 +228,8 @@ def plot_line_chart_waiting_by_type_week(
         # Format the year_month values for hover display
         formatted_dates = [format_year_month(ym) for ym in vessel_data["year_month"]]
 
-        fig.add_trace(go.Scatter(
+        traces.append(trace(
+            "scatter",
             x=vessel_data["year_month"],
             y=vessel_data[value_column],
             mode="lines",
@@ -276,9 +264,7 @@ def plot_line_chart_waiting_by_type_week(
         selected_year_months = unique_year_months
         selected_labels = formatted_labels
 
-    fig.update_layout(
-        height=300,
-        dragmode="zoom",
+    return figure(traces, layout=dict(
         xaxis=dict(
             type="category",
             categoryorder="array",
@@ -289,6 +275,7 @@ def plot_line_chart_waiting_by_type_week(
             showgrid=False
         ),
         yaxis=dict(
+            tickfont=dict(color=theme.DARK_GRAY),
             range=[y_min * (1 - bottom_padding_pct), y_max * (1 + top_padding_pct)],
             showgrid=True,
             gridcolor="#D4D4D4",
@@ -298,7 +285,6 @@ def plot_line_chart_waiting_by_type_week(
             zerolinewidth=1.5,
             side="left",
             anchor="free",
-            tickfont_color=theme.DARK_GRAY,
             shift=-10
         ),
         legend=dict(
@@ -309,7 +295,7 @@ def plot_line_chart_waiting_by_type_week(
             orientation="h"
         ),
         margin=dict(l=0, r=0, t=0, b=0),
+        height=300,
+        dragmode="zoom",
         plot_bgcolor="white"
-    )
-
-    return fig
+    ))
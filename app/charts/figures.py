@@ -0,0 +1,198 @@
+"""Figures built as plain dicts for the callbacks.
+
+Building ``go.Figure`` objects validates every property each time a chart
+is drawn, which costs more than the data work behind most charts. The chart
+functions instead write their figures in the form plotly serialises them
+to: :func:`trace` orders trace properties as plotly's generated classes do,
+and :func:`figure` adds the default template, validated once, and plotly's
+typed-array encoding of the data. The JSON sent to the browser is the same
+as for the equivalent ``go.Figure``.
+
+Once a graph shows a figure, :func:`patch_figure_updates` sends later
+figures with the same traces as :class:`dash.Patch` updates: the data
+arrays of traces whose other properties are unchanged, any trace that
+changed otherwise, and the layout properties that changed. The template and
+the styling the browser already has stay in place.
+"""
+
+import functools
+import hashlib
+
+import plotly.graph_objects as go
+from _plotly_utils.utils import convert_to_base64
+from dash import Patch, no_update
+from plotly.io.json import to_json_plotly
+
+# Trace properties holding the data, patched on their own while the rest of
+# the trace is unchanged
+DATA_PROPS = frozenset(
+    ["x", "y", "z", "lat", "lon", "locations", "text", "hovertext", "customdata", "ids"]
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _template():
+    """Return the default template as plotly serialises it."""
+    return go.Figure().to_plotly_json()["layout"]["template"]
+
+
+def _sorted(props):
+    return {
+        key: _sorted(value) if isinstance(value, dict) else value
+        for key, value in sorted(props.items())
+    }
+
+
+def trace(trace_type, **props):
+    """Return a trace with its properties in plotly's order.
+
+    Parameters
+    ----------
+    trace_type : str
+        plotly.js trace type, e.g. ``"scatter"``.
+    **props
+        Trace properties, with nested objects as dicts rather than
+        ``marker_color``-style names.
+
+    Returns
+    -------
+    dict
+        Properties and those of nested objects sorted by name, followed by
+        ``type``.
+    """
+    return {**_sorted(props), "type": trace_type}
+
+
+def figure(data=(), layout=None):
+    """Return a figure dict that callbacks can return as-is.
+
+    Parameters
+    ----------
+    data : list of dict, optional
+        Traces from :func:`trace`.
+    layout : dict, optional
+        Layout properties as plotly serialises them after
+        ``update_layout``: nested objects first, in the order given, then
+        plain values; ``xaxis_title``-style names expanded into nested
+        objects where they appear.
+
+    Returns
+    -------
+    dict
+        ``data`` and ``layout`` with the default template. Arrays are
+        encoded in place, so the traces must not be reused afterwards.
+    """
+    data = list(data)
+    layout = dict(layout or {})
+    convert_to_base64(data)
+    convert_to_base64(layout)
+    return {"data": data, "layout": {"template": _template(), **layout}}
+
+
+def _digest(value):
+    return hashlib.blake2b(to_json_plotly(value).encode(), digest_size=8).hexdigest()
+
+
+def _trace_digest(trace_spec):
+    """Return the digest of a trace but the values of its data arrays."""
+    return _digest({
+        key: key if key in DATA_PROPS else value for key, value in trace_spec.items()
+    })
+
+
+def figure_structure(fig):
+    """Return what a patch of ``fig`` keeps from the figure shown.
+
+    Parameters
+    ----------
+    fig : dict
+        Figure from :func:`figure`.
+
+    Returns
+    -------
+    dict | None
+        Digests of each trace but its data values, in order, and of each
+        layout property but the template, as stored in a ``dcc.Store``.
+        None for anything else, such as a ``go.Figure``.
+    """
+    if not isinstance(fig, dict) or "data" not in fig:
+        return None
+    return {
+        "traces": [_trace_digest(trace_spec) for trace_spec in fig["data"]],
+        "layout": {
+            key: _digest(value) for key, value in fig["layout"].items() if key != "template"
+        },
+    }
+
+
+def figure_update(fig, shown_structure):
+    """Return ``fig``, or a patch turning the figure shown into it.
+
+    Parameters
+    ----------
+    fig : dict
+        New figure from :func:`figure`.
+    shown_structure : dict | None
+        :func:`figure_structure` of the figure the graph shows.
+
+    Returns
+    -------
+    tuple
+        The complete figure when the number of traces or the layout
+        properties set differ, else a :class:`dash.Patch` setting the data
+        arrays of traces otherwise unchanged, replacing the other traces and
+        setting the layout properties that changed; and the structure of
+        ``fig``.
+    """
+    structure = figure_structure(fig)
+    if (
+        structure is None
+        or not shown_structure
+        or len(structure["traces"]) != len(shown_structure["traces"])
+        or list(structure["layout"]) != list(shown_structure["layout"])
+    ):
+        return fig, structure
+    patch = Patch()
+    for index, (trace_spec, digest, shown_digest) in enumerate(
+        zip(fig["data"], structure["traces"], shown_structure["traces"])
+    ):
+        if digest != shown_digest:
+            patch["data"][index] = trace_spec
+            continue
+        for key, value in trace_spec.items():
+            if key in DATA_PROPS:
+                patch["data"][index][key] = value
+    for key, digest in structure["layout"].items():
+        if digest != shown_structure["layout"][key]:
+            patch["layout"][key] = fig["layout"][key]
+    return patch, structure
+
+
+def patch_figure_updates(callback):
+    """Send the figures of a chart callback as patches where possible.
+
+    The decorated callback returns the figure of a graph and of its
+    fullscreen copy first. Its wrapper takes one more last argument, the
+    structure stored for the graph, and returns the new structure as one
+    more last output::
+
+        @app.callback(
+            Output("chart", "figure"),
+            Output("chart-fullscreen", "figure"),
+            Output("chart-structure", "data"),
+            Input(...),
+            State("chart-structure", "data"),
+        )
+        @patch_figure_updates
+        def update_chart(...):
+            return fig, fig
+    """
+    @functools.wraps(callback)
+    def wrapper(*args):
+        *args, shown_structure = args
+        outputs = tuple(callback(*args))
+        if outputs[0] is no_update:
+            return (*outputs, no_update)
+        update, structure = figure_update(outputs[0], shown_structure)
+        return (update, update, *outputs[2:], structure)
+    return wrapper
@@ -0,0 +1,82 @@
+"""Country dimension table for the ISO-2 codes in the energy data.
+
+``pycountry`` is queried once per distinct code while the data is prepared;
+rows are then matched to the table through their categorical codes, and the
+charts read ISO-3 codes from it instead of looking countries up per render.
+"""
+
+import numpy as np
+import pandas as pd
+import pycountry
+
+
+def _lookup(code2):
+    """Return the name and ISO-3 code of an ISO-2 code.
+
+    Unknown codes keep the code as their name and have no ISO-3 code, as
+    ``charts_energy.get_country_name`` and ``get_iso3`` return.
+    """
+    try:
+        country = pycountry.countries.get(alpha_2=code2)
+    except (KeyError, LookupError, TypeError):
+        country = None
+    if country is None:
+        return code2, None
+    return country.name, country.alpha_3
+
+
+def country_table(*codes):
+    """Build the dimension table for the codes in one or more columns.
+
+    Parameters
+    ----------
+    *codes : pandas.Series
+        ISO-2 country codes; missing values are skipped.
+
+    Returns
+    -------
+    pandas.DataFrame
+        ``name`` and ``iso3`` per code, indexed and sorted by ISO-2 code.
+    """
+    unique = pd.Index(
+        pd.unique(np.concatenate([pd.Series(column).dropna().unique() for column in codes]))
+    ).sort_values()
+    rows = [_lookup(code) for code in unique]
+    return pd.DataFrame(rows, index=unique, columns=["name", "iso3"], dtype=object)
+
+
+def extend_country_table(table, *codes):
+    """Return ``table`` with rows for the codes it does not hold yet."""
+    new = country_table(*codes)
+    new = new[~new.index.isin(table.index)]
+    if new.empty:
+        return table
+    return pd.concat([table, new]).sort_index()
+
+
+def lookup(codes, table, column):
+    """Map each code of ``codes`` to ``column`` of the table.
+
+    The table is aligned with the categories of ``codes`` and indexed by
+    their integer codes, so the work scales with the number of distinct
+    countries rather than rows.
+
+    Parameters
+    ----------
+    codes : pandas.Series
+        ISO-2 codes, categorical or not.
+    table : pandas.DataFrame
+        Result of :func:`country_table` covering every code.
+    column : str
+        ``"name"`` or ``"iso3"``.
+
+    Returns
+    -------
+    pandas.Series
+        Looked-up values, missing where the code is missing.
+    """
+    categorical = codes.astype("category")
+    values = table[column].reindex(categorical.cat.categories).to_numpy(dtype=object)
+    # Code -1 (missing) picks the trailing NaN
+    values = np.append(values, np.nan)
+    return pd.Series(values[categorical.cat.codes.to_numpy()], index=codes.index, dtype=object)
@@ -0,0 +1,641 @@
+"""Pre-aggregated data cubes answering dashboard queries without row scans.
+
+Cubes are built once at startup. Their size depends on the number of
+categories (months, vessel types, H3 cells), not on the number of rows, so
+callback latency stays flat as the underlying datasets grow. When new
+periods arrive, ``extended`` aggregates only the new rows and appends them
+along the time axis.
+"""
+
+import copy
+
+import numpy as np
+import pandas as pd
+
+from data_utils.frames import concat_frames
+from data_utils.indexes import CategoryIndex, SortedRangeIndex
+
+
+def _check_appended(periods, appended):
+    """Raise ``ValueError`` unless ``appended`` periods all follow ``periods``."""
+    if len(periods) and len(appended) and appended[0] <= periods[-1]:
+        raise ValueError("Appended periods must come after the existing ones.")
+
+
+def _align(values, labels, union, axis):
+    """Spread ``values`` labelled by ``labels`` along ``axis`` onto ``union``.
+
+    Positions of labels missing from ``labels`` are filled with zeros, which
+    is what a cube built over ``union`` holds for them.
+    """
+    if len(labels) == len(union):
+        return values
+    shape = list(values.shape)
+    shape[axis] = len(union)
+    aligned = np.zeros(shape, dtype=values.dtype)
+    target = [slice(None)] * values.ndim
+    target[axis] = np.searchsorted(union, labels)
+    aligned[tuple(target)] = values
+    return aligned
+
+
+class EmissionsCube:
+    """Emissions totals by ``year_month`` and ``StandardVesselType``.
+
+    Besides the dense (year_month x vessel type) totals, a sparse
+    (year_month x vessel type x resolution_id) cube is kept as a DataFrame
+    sorted by ``year_month`` for the H3 map.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Row-level emissions data with ``year``, ``month``, ``year_month``,
+        ``StandardVesselType``, ``resolution_id`` and ``co2_equivalent_t``.
+    """
+
+    def __init__(self, df):
+        self.year_months, ym_codes = np.unique(df["year_month"].to_numpy(), return_inverse=True)
+        vessel_index = CategoryIndex(df["StandardVesselType"])
+        self.vessel_types = vessel_index.categories.to_numpy(dtype=object)
+        vt_codes = vessel_index.codes.astype("int64")
+        self.dtypes = df[["year", "month", "co2_equivalent_t"]].dtypes
+
+        # Rows without a vessel type (code -1) never match a selection
+        keep = vt_codes >= 0
+        shape = (len(self.year_months), len(self.vessel_types))
+        flat = (ym_codes * shape[1] + vt_codes)[keep]
+        size = shape[0] * shape[1]
+        values = np.nan_to_num(df["co2_equivalent_t"].to_numpy(dtype="float64")[keep])
+        self.totals = np.bincount(flat, weights=values, minlength=size).reshape(shape)
+        self.counts = np.bincount(flat, minlength=size).reshape(shape)
+
+        self.cells = (
+            df.groupby(["year_month", "StandardVesselType", "resolution_id"],
+                       as_index=False, sort=True, observed=True)["co2_equivalent_t"]
+            .sum()
+        )
+        self.cells_index = SortedRangeIndex(self.cells["year_month"])
+        self.cells_vessel_index = CategoryIndex(self.cells["StandardVesselType"])
+
+    def select(self, start_ym, end_ym, vessel_types):
+        """Restrict the cube to a date range and a set of vessel types.
+
+        Parameters
+        ----------
+        start_ym, end_ym : int
+            Inclusive ``YYYYMM`` bounds.
+        vessel_types : iterable
+            Selected vessel types.
+
+        Returns
+        -------
+        EmissionsSelection
+            View over the matching part of the cube.
+        """
+        lo = np.searchsorted(self.year_months, start_ym, side="left")
+        hi = np.searchsorted(self.year_months, end_ym, side="right")
+        vessel_mask = np.isin(self.vessel_types, list(vessel_types))
+        return EmissionsSelection(self, lo, hi, vessel_mask)
+
+    def extended(self, df):
+        """Return a new cube that also covers the rows of ``df``.
+
+        Only ``df`` is aggregated; the existing cube is reused as is.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            Rows whose ``year_month`` values all follow the ones in the cube.
+
+        Returns
+        -------
+        EmissionsCube
+            Cube over the existing and the appended rows.
+
+        Raises
+        ------
+        ValueError
+            If ``df`` contains months already in the cube.
+        """
+        part = EmissionsCube(df)
+        _check_appended(self.year_months, part.year_months)
+        merged = copy.copy(self)
+        merged.year_months = np.concatenate([self.year_months, part.year_months])
+        merged.vessel_types = np.union1d(self.vessel_types, part.vessel_types)
+        for name in ("totals", "counts"):
+            setattr(merged, name, np.concatenate([
+                _align(getattr(self, name), self.vessel_types, merged.vessel_types, axis=1),
+                _align(getattr(part, name), part.vessel_types, merged.vessel_types, axis=1),
+            ]))
+        merged.cells = concat_frames(self.cells, part.cells)
+        merged.cells_index = self.cells_index.extended(part.cells["year_month"])
+        merged.cells_vessel_index = CategoryIndex(merged.cells["StandardVesselType"])
+        return merged
+
+
+class EmissionsSelection:
+    """Slice of an :class:`EmissionsCube` for one filter state."""
+
+    def __init__(self, cube, lo, hi, vessel_mask):
+        self.cube = cube
+        self.year_months = cube.year_months[lo:hi]
+        self.vessel_types = cube.vessel_types[vessel_mask]
+        self.totals = cube.totals[lo:hi][:, vessel_mask]
+        self.counts = cube.counts[lo:hi][:, vessel_mask]
+
+    @property
+    def empty(self):
+        """Whether no raw rows match the selection."""
+        return not self.counts.any()
+
+    def total(self):
+        """Total emissions of the selection."""
+        return float(self.totals.sum())
+
+    def by_year_month(self):
+        """Totals per ``year`` and ``month``, as ``groupby(['year', 'month'])``."""
+        present = self.counts.sum(axis=1) > 0
+        year_months = self.year_months[present]
+        return pd.DataFrame({
+            "year": (year_months // 100).astype(self.cube.dtypes["year"]),
+            "month": (year_months % 100).astype(self.cube.dtypes["month"]),
+            "co2_equivalent_t": self.totals.sum(axis=1)[present].astype(
+                self.cube.dtypes["co2_equivalent_t"]
+            ),
+        })
+
+    def by_vessel_type(self):
+        """Totals per vessel type, as ``groupby('StandardVesselType')``."""
+        present = self.counts.sum(axis=0) > 0
+        return pd.Series(
+            self.totals.sum(axis=0)[present].astype(self.cube.dtypes["co2_equivalent_t"]),
+            index=pd.Index(self.vessel_types[present], name="StandardVesselType"),
+            name="co2_equivalent_t",
+        )
+
+    def by_vessel_type_year_month(self):
+        """Totals per vessel type and ``year_month``, sorted by vessel type."""
+        vt_idx, ym_idx = np.nonzero(self.counts.T > 0)
+        return pd.DataFrame({
+            "StandardVesselType": self.vessel_types[vt_idx],
+            "year_month": self.year_months[ym_idx],
+            "co2_equivalent_t": self.totals.T[vt_idx, ym_idx].astype(
+                self.cube.dtypes["co2_equivalent_t"]
+            ),
+        })
+
+    def cells(self):
+        """Rows of the sparse H3 cube matching the selection."""
+        if self.empty:
+            return self.cube.cells.iloc[0:0]
+        lo, hi = self.cube.cells_index.bounds(self.year_months[0], self.year_months[-1])
+        mask = self.cube.cells_vessel_index.mask(self.vessel_types, lo, hi)
+        return self.cube.cells.iloc[lo:hi][mask]
+
+
+def _mean(sums, counts):
+    """Element-wise ``sums / counts`` yielding NaN where ``counts`` is zero."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts
+
+
+class WaitingTimeCube:
+    """Mergeable sums and counts of waiting and service times.
+
+    Sums and counts are kept per (year_month x vessel type x stop area) for
+    both ``waiting_time`` and ``service_time``, so the mean of any filter
+    combination is the ratio of two sums over small arrays. Waiting and
+    service tabs share the same cube.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Row-level data with ``year``, ``month``, ``year_month``,
+        ``StandardVesselType``, ``stop_area`` and the time columns.
+    weight_column : str, optional
+        Column used to weight each row (e.g. ``"sample_size"``). By default
+        every row counts once, matching an unweighted ``mean()``.
+    """
+
+    VALUE_COLUMNS = ("waiting_time", "service_time")
+
+    def __init__(self, df, weight_column=None):
+        self.year_months, ym_codes = np.unique(df["year_month"].to_numpy(), return_inverse=True)
+        vessel_index = CategoryIndex(df["StandardVesselType"])
+        area_index = CategoryIndex(df["stop_area"])
+        self.vessel_types = vessel_index.categories.to_numpy(dtype=object)
+        self.stop_areas = area_index.categories.to_numpy(dtype=object)
+        self.dtypes = df[["year", "month"]].dtypes
+        self.weight_column = weight_column
+
+        vt_codes = vessel_index.codes.astype("int64")
+        area_codes = area_index.codes.astype("int64")
+        keep = (vt_codes >= 0) & (area_codes >= 0)
+        shape = (len(self.year_months), len(self.vessel_types), len(self.stop_areas))
+        flat = ((ym_codes * shape[1] + vt_codes) * shape[2] + area_codes)[keep]
+        size = int(np.prod(shape))
+        self.rows = np.bincount(flat, minlength=size).reshape(shape)
+
+        if weight_column is None:
+            weights = np.ones(len(flat))
+        else:
+            weights = df[weight_column].to_numpy(dtype="float64")[keep]
+
+        self.sums = {}
+        self.counts = {}
+        for column in self.VALUE_COLUMNS:
+            values = df[column].to_numpy(dtype="float64")[keep]
+            valid = ~(np.isnan(values) | np.isnan(weights))
+            self.sums[column] = np.bincount(
+                flat[valid], weights=(values * weights)[valid], minlength=size
+            ).reshape(shape)
+            self.counts[column] = np.bincount(
+                flat[valid], weights=weights[valid], minlength=size
+            ).reshape(shape)
+
+    def select(self, start_ym, end_ym, vessel_types, stop_areas):
+        """Restrict the cube to a date range, vessel types and stop areas.
+
+        Parameters
+        ----------
+        start_ym, end_ym : int
+            Inclusive ``YYYYMM`` bounds.
+        vessel_types, stop_areas : iterable
+            Selected vessel types and stop areas.
+
+        Returns
+        -------
+        WaitingTimeSelection
+            View over the matching part of the cube.
+        """
+        lo = np.searchsorted(self.year_months, start_ym, side="left")
+        hi = np.searchsorted(self.year_months, end_ym, side="right")
+        vessel_mask = np.isin(self.vessel_types, list(vessel_types))
+        area_mask = np.isin(self.stop_areas, list(stop_areas))
+        return WaitingTimeSelection(self, lo, hi, vessel_mask, area_mask)
+
+    def extended(self, df):
+        """Return a new cube that also covers the rows of ``df``.
+
+        Only ``df`` is aggregated; the existing sums and counts are reused.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            Rows whose ``year_month`` values all follow the ones in the cube.
+
+        Returns
+        -------
+        WaitingTimeCube
+            Cube over the existing and the appended rows.
+
+        Raises
+        ------
+        ValueError
+            If ``df`` contains months already in the cube.
+        """
+        part = WaitingTimeCube(df, weight_column=self.weight_column)
+        _check_appended(self.year_months, part.year_months)
+        merged = copy.copy(self)
+        merged.year_months = np.concatenate([self.year_months, part.year_months])
+        merged.vessel_types = np.union1d(self.vessel_types, part.vessel_types)
+        merged.stop_areas = np.union1d(self.stop_areas, part.stop_areas)
+
+        def stack(old, new):
+            return np.concatenate([
+                _align(_align(cube_values, cube.vessel_types, merged.vessel_types, axis=1),
+                       cube.stop_areas, merged.stop_areas, axis=2)
+                for cube, cube_values in ((self, old), (part, new))
+            ])
+
+        merged.rows = stack(self.rows, part.rows)
+        merged.sums = {column: stack(self.sums[column], part.sums[column]) for column in self.sums}
+        merged.counts = {
+            column: stack(self.counts[column], part.counts[column]) for column in self.counts
+        }
+        return merged
+
+
+class WaitingTimeSelection:
+    """Slice of a :class:`WaitingTimeCube` for one filter state."""
+
+    def __init__(self, cube, lo, hi, vessel_mask, area_mask):
+        self.cube = cube
+        self.year_months = cube.year_months[lo:hi]
+        self.vessel_types = cube.vessel_types[vessel_mask]
+        self.stop_areas = cube.stop_areas[area_mask]
+        take = np.ix_(np.arange(lo, hi), vessel_mask.nonzero()[0], area_mask.nonzero()[0])
+        self.rows = cube.rows[take]
+        self.sums = {column: sums[take] for column, sums in cube.sums.items()}
+        self.counts = {column: counts[take] for column, counts in cube.counts.items()}
+
+    @property
+    def empty(self):
+        """Whether no raw rows match the selection."""
+        return not self.rows.any()
+
+    def _reduce(self, column, axis):
+        """Return row counts and means of ``column`` after summing ``axis``."""
+        rows = self.rows.sum(axis=axis)
+        means = _mean(self.sums[column].sum(axis=axis), self.counts[column].sum(axis=axis))
+        return rows, means
+
+    def by_year_month(self, column):
+        """Mean per ``year`` and ``month``, as ``groupby(['year', 'month']).mean()``."""
+        rows, means = self._reduce(column, axis=(1, 2))
+        present = rows > 0
+        year_months = self.year_months[present]
+        return pd.DataFrame({
+            "year": (year_months // 100).astype(self.cube.dtypes["year"]),
+            "month": (year_months % 100).astype(self.cube.dtypes["month"]),
+            column: means[present],
+        })
+
+    def by_stop_area(self, column):
+        """Mean per stop area, as ``groupby('stop_area').mean().reset_index()``."""
+        rows, means = self._reduce(column, axis=(0, 1))
+        present = rows > 0
+        return pd.DataFrame({
+            "stop_area": self.stop_areas[present],
+            column: means[present],
+        })
+
+    def by_vessel_type(self, column):
+        """Mean per vessel type, as ``groupby('StandardVesselType').mean()``."""
+        rows, means = self._reduce(column, axis=(0, 2))
+        present = rows > 0
+        return pd.Series(
+            means[present],
+            index=pd.Index(self.vessel_types[present], name="StandardVesselType"),
+            name=column,
+        )
+
+    def by_vessel_type_year_month(self, column):
+        """Mean per vessel type and ``year_month``, sorted by vessel type."""
+        rows, means = self._reduce(column, axis=2)
+        vt_idx, ym_idx = np.nonzero(rows.T > 0)
+        return pd.DataFrame({
+            "StandardVesselType": self.vessel_types[vt_idx],
+            "year_month": self.year_months[ym_idx],
+            column: means.T[vt_idx, ym_idx],
+        })
+
+
+def _names_by_code(df, code_column, codes):
+    """Return the ``<code_column>_name`` value for each code in ``codes``."""
+    name_column = f"{code_column}_name"
+    mapping = dict(df[[code_column, name_column]].drop_duplicates().to_numpy())
+    return np.array([mapping.get(code, code) for code in codes], dtype=object)
+
+
+class EnergyFlowTensor:
+    """Sparse (week x origin x destination) tensor of ``sum_energy``.
+
+    Only non-empty cells are stored, as parallel arrays sorted by week, so
+    a week range is a contiguous slice. Country selections resolve to
+    boolean lookups over the origin/destination axes.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Energy data with ``year``, ``week``, ``year_week``, ``country_before``,
+        ``country_after``, their ``*_name`` columns and ``sum_energy``.
+    """
+
+    def __init__(self, df):
+        self.year_weeks, week_codes = np.unique(df["year_week"].to_numpy(), return_inverse=True)
+        self.dtypes = df[["year", "week"]].dtypes
+        origin_index = CategoryIndex(df["country_before"])
+        dest_index = CategoryIndex(df["country_after"])
+        self.origins = origin_index.categories.to_numpy(dtype=object)
+        self.destinations = dest_index.categories.to_numpy(dtype=object)
+        self.origin_names = _names_by_code(df, "country_before", self.origins)
+        self.destination_names = _names_by_code(df, "country_after", self.destinations)
+
+        origin_codes = origin_index.codes.astype("int64")
+        dest_codes = dest_index.codes.astype("int64")
+        keep = (origin_codes >= 0) & (dest_codes >= 0)
+        n_origins, n_destinations = len(self.origins), len(self.destinations)
+        flat = ((week_codes * n_origins + origin_codes) * n_destinations + dest_codes)[keep]
+        cells, inverse = np.unique(flat, return_inverse=True)
+        values = np.nan_to_num(df["sum_energy"].to_numpy(dtype="float64")[keep])
+
+        self.energy = np.bincount(inverse, weights=values, minlength=len(cells))
+        self.rows = np.bincount(inverse, minlength=len(cells))
+        self.week, rest = np.divmod(cells, n_origins * n_destinations)
+        self.origin, self.destination = np.divmod(rest, n_destinations)
+        self.week_index = SortedRangeIndex(self.year_weeks[self.week])
+
+    def select(self, start_yw, end_yw, origin_names, destination_names):
+        """Restrict the tensor to a week range and origin/destination countries.
+
+        Parameters
+        ----------
+        start_yw, end_yw : int
+            Inclusive ``YYYYWW`` bounds.
+        origin_names, destination_names : iterable
+            Selected country names, as shown in the checklists.
+
+        Returns
+        -------
+        EnergyFlowSelection
+            Non-empty cells matching the selection.
+        """
+        lo, hi = self.week_index.bounds(start_yw, end_yw)
+        origin_lookup = np.isin(self.origin_names, list(origin_names))
+        destination_lookup = np.isin(self.destination_names, list(destination_names))
+        mask = origin_lookup[self.origin[lo:hi]] & destination_lookup[self.destination[lo:hi]]
+        return EnergyFlowSelection(self, lo, hi, mask)
+
+    def extended(self, df):
+        """Return a new tensor that also covers the rows of ``df``.
+
+        Only ``df`` is aggregated; existing cells are re-coded onto the
+        merged country axes.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            Rows whose ``year_week`` values all follow the ones in the tensor.
+
+        Returns
+        -------
+        EnergyFlowTensor
+            Tensor over the existing and the appended rows.
+
+        Raises
+        ------
+        ValueError
+            If ``df`` contains weeks already in the tensor.
+        """
+        part = EnergyFlowTensor(df)
+        _check_appended(self.year_weeks, part.year_weeks)
+        merged = copy.copy(self)
+        merged.year_weeks = np.concatenate([self.year_weeks, part.year_weeks])
+        merged.origins = np.union1d(self.origins, part.origins)
+        merged.destinations = np.union1d(self.destinations, part.destinations)
+
+        origin_names = dict(zip(self.origins, self.origin_names))
+        origin_names.update(zip(part.origins, part.origin_names))
+        destination_names = dict(zip(self.destinations, self.destination_names))
+        destination_names.update(zip(part.destinations, part.destination_names))
+        merged.origin_names = np.array([origin_names[code] for code in merged.origins], dtype=object)
+        merged.destination_names = np.array(
+            [destination_names[code] for code in merged.destinations], dtype=object
+        )
+
+        merged.week = np.concatenate([self.week, part.week + len(self.year_weeks)])
+        merged.origin = np.concatenate([
+            np.searchsorted(merged.origins, self.origins)[self.origin],
+            np.searchsorted(merged.origins, part.origins)[part.origin],
+        ])
+        merged.destination = np.concatenate([
+            np.searchsorted(merged.destinations, self.destinations)[self.destination],
+            np.searchsorted(merged.destinations, part.destinations)[part.destination],
+        ])
+        merged.energy = np.concatenate([self.energy, part.energy])
+        merged.rows = np.concatenate([self.rows, part.rows])
+        merged.week_index = self.week_index.extended(part.year_weeks[part.week])
+        return merged
+
+
+class EnergyFlowSelection:
+    """Cells of an :class:`EnergyFlowTensor` matching one filter state."""
+
+    def __init__(self, tensor, lo, hi, mask):
+        self.tensor = tensor
+        self.week = tensor.week[lo:hi][mask]
+        self.origin = tensor.origin[lo:hi][mask]
+        self.destination = tensor.destination[lo:hi][mask]
+        self.energy = tensor.energy[lo:hi][mask]
+
+    @property
+    def empty(self):
+        """Whether no raw rows match the selection."""
+        return len(self.energy) == 0
+
+    def by_year_week(self):
+        """Energy per ``year`` and ``week``, as ``groupby(['year', 'week']).sum()``."""
+        weeks, inverse = np.unique(self.week, return_inverse=True)
+        year_weeks = self.tensor.year_weeks[weeks]
+        return pd.DataFrame({
+            "year": (year_weeks // 100).astype(self.tensor.dtypes["year"]),
+            "week": (year_weeks % 100).astype(self.tensor.dtypes["week"]),
+            "sum_energy": np.bincount(inverse, weights=self.energy),
+        })
+
+    def by_country(self, country_role):
+        """Energy per ISO-2 code of ``country_before`` or ``country_after``."""
+        if country_role == "country_before":
+            codes, labels = self.origin, self.tensor.origins
+        else:
+            codes, labels = self.destination, self.tensor.destinations
+        present, inverse = np.unique(codes, return_inverse=True)
+        return pd.DataFrame({
+            country_role: labels[present],
+            "sum_energy": np.bincount(inverse, weights=self.energy),
+        })
+
+    def by_country_name(self, country_role):
+        """Energy per country name, as ``groupby('<role>_name').sum()``."""
+        if country_role == "country_before":
+            names = self.tensor.origin_names[self.origin]
+        else:
+            names = self.tensor.destination_names[self.destination]
+        name_column = f"{country_role}_name"
+        return (
+            pd.DataFrame({name_column: names, "sum_energy": self.energy})
+            .groupby(name_column, as_index=False)["sum_energy"]
+            .sum()
+        )
+
+    def flows(self):
+        """Energy per origin/destination pair with country names."""
+        n_destinations = len(self.tensor.destinations)
+        pairs, inverse = np.unique(
+            self.origin * n_destinations + self.destination, return_inverse=True
+        )
+        origin, destination = np.divmod(pairs, n_destinations)
+        return pd.DataFrame({
+            "country_before_name": self.tensor.origin_names[origin],
+            "country_after_name": self.tensor.destination_names[destination],
+            "sum_energy": np.bincount(inverse, weights=self.energy),
+        })
+
+
+class PrefixSumSeries:
+    """Cumulative totals of a value column per period.
+
+    Per-period totals and range totals both come from differences of the
+    prefix sums, so dragging a range slider never rescans the rows.
+
+    Parameters
+    ----------
+    periods : pandas.Series
+        Period of each row, e.g. ``year_month`` or ``year_week``.
+    values : pandas.Series
+        Values summed per period; missing values count as zero.
+    """
+
+    def __init__(self, periods, values):
+        self.periods, inverse = np.unique(periods.to_numpy(), return_inverse=True)
+        self.dtype = values.dtype
+        totals = np.bincount(
+            inverse, weights=np.nan_to_num(values.to_numpy(dtype="float64")),
+            minlength=len(self.periods),
+        )
+        self.cumulative = np.concatenate([[0.0], np.cumsum(totals)])
+
+    def extended(self, periods, values):
+        """Return a new series that also covers the appended rows.
+
+        Parameters
+        ----------
+        periods, values : pandas.Series
+            Appended rows; their periods all follow the existing ones.
+
+        Returns
+        -------
+        PrefixSumSeries
+            Series over the existing and the appended rows.
+
+        Raises
+        ------
+        ValueError
+            If ``periods`` contains periods already in the series.
+        """
+        part = PrefixSumSeries(periods, values)
+        _check_appended(self.periods, part.periods)
+        merged = copy.copy(self)
+        merged.periods = np.concatenate([self.periods, part.periods])
+        merged.cumulative = np.concatenate([
+            self.cumulative, part.cumulative[1:] + self.cumulative[-1]
+        ])
+        return merged
+
+    def _bounds(self, start, end):
+        lo = np.searchsorted(self.periods, start, side="left")
+        hi = np.searchsorted(self.periods, end, side="right")
+        return lo, max(lo, hi)
+
+    def series(self, start, end):
+        """Return the periods within ``[start, end]`` and their totals.
+
+        Parameters
+        ----------
+        start, end : int
+            Inclusive period bounds.
+
+        Returns
+        -------
+        tuple[numpy.ndarray, numpy.ndarray]
+            Periods and the total of each period.
+        """
+        lo, hi = self._bounds(start, end)
+        totals = np.diff(self.cumulative[lo:hi + 1]).astype(self.dtype)
+        return self.periods[lo:hi], totals
+
+    def total(self, start, end):
+        """Return the total over all periods within ``[start, end]``."""
+        lo, hi = self._bounds(start, end)
+        return float(self.cumulative[hi] - self.cumulative[lo])
@@ -0,0 +1,101 @@
+"""Memoisation of filter results shared by sibling callbacks.
+
+A single click on a refresh button fires several callbacks with identical
+filter state. Wrapping the filtering step with :func:`memoize_filter` lets the
+first callback compute the result while the others reuse it.
+"""
+
+import threading
+
+from cachetools import LRUCache
+from cachetools.keys import hashkey
+
+FILTER_CACHE_SIZE = 32
+
+
+def normalize_selection(values):
+    """Return a hashable, order-independent version of a checklist selection.
+
+    Parameters
+    ----------
+    values : iterable | None
+        Selected values as sent by a checklist component.
+
+    Returns
+    -------
+    tuple
+        Sorted tuple of unique values.
+    """
+    if not values:
+        return ()
+    return tuple(sorted(set(values)))
+
+
+def filter_key(*args):
+    """Build a cache key from filter arguments.
+
+    Lists, tuples and sets are normalised with :func:`normalize_selection`
+    so that the same selection in a different order hits the same entry.
+    """
+    return hashkey(*(
+        normalize_selection(arg) if isinstance(arg, (list, tuple, set)) else arg
+        for arg in args
+    ))
+
+
+class FilterMemo:
+    """Bounded LRU memo where concurrent callers for one key compute once.
+
+    Parameters
+    ----------
+    func : callable
+        Function computing the filter result. Its return value is shared
+        between callers and must be treated as read-only.
+    maxsize : int, optional
+        Maximum number of filter states kept before evicting the least
+        recently used one.
+    """
+
+    def __init__(self, func, maxsize=FILTER_CACHE_SIZE):
+        self._func = func
+        self._cache = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def __call__(self, *args):
+        key = filter_key(*args)
+        with self._lock:
+            try:
+                return self._cache[key]
+            except KeyError:
+                key_lock = self._pending.setdefault(key, threading.Lock())
+
+        # Callers with the same key wait here while the first one computes
+        with key_lock:
+            with self._lock:
+                if key in self._cache:
+                    return self._cache[key]
+            try:
+                value = self._func(*args)
+                with self._lock:
+                    self._cache[key] = value
+            finally:
+                with self._lock:
+                    self._pending.pop(key, None)
+        return value
+
+    def clear(self):
+        """Drop every memoised result."""
+        with self._lock:
+            self._cache.clear()
+
+
+def memoize_filter(func=None, maxsize=FILTER_CACHE_SIZE):
+    """Decorate a filtering function with a :class:`FilterMemo`.
+
+    Can be used bare (``@memoize_filter``) or with arguments
+    (``@memoize_filter(maxsize=8)``).
+    """
+    if func is None:
+        return lambda f: FilterMemo(f, maxsize=maxsize)
+    return FilterMemo(func, maxsize=maxsize)
@@ -0,0 +1,36 @@
+"""Helpers for combining DataFrames loaded in separate pieces."""
+
+import pandas as pd
+
+
+def concat_frames(head, tail):
+    """Append ``tail`` to ``head`` keeping categorical columns categorical.
+
+    ``pd.concat`` falls back to ``object`` when two categorical columns have
+    different categories. Both sides are first given the sorted union of
+    categories, which is what ``astype("category")`` would produce on the
+    combined column.
+
+    Parameters
+    ----------
+    head, tail : pandas.DataFrame
+        Frames with the same columns.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Rows of ``head`` followed by rows of ``tail``, with a fresh
+        ``RangeIndex``.
+    """
+    head_cast, tail_cast = {}, {}
+    for column in head.columns:
+        if isinstance(head[column].dtype, pd.CategoricalDtype):
+            categories = head[column].cat.categories.union(
+                pd.Index(tail[column].astype("category").cat.categories)
+            )
+            head_cast[column] = head[column].cat.set_categories(categories)
+            tail_cast[column] = tail[column].astype(pd.CategoricalDtype(categories))
+    if head_cast:
+        head = head.assign(**head_cast)
+        tail = tail.assign(**tail_cast)
+    return pd.concat([head, tail], ignore_index=True)
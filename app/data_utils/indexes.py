@@ -0,0 +1,151 @@
+"""Lightweight indexes used to filter datasets without full column scans."""
+
+import numpy as np
+
+
+class SortedRangeIndex:
+    """Row offsets for each value of a sorted period column.
+
+    Stores the unique values of a column such as ``year_month`` or
+    ``year_week`` together with the row where each value starts. Range
+    filters then resolve to two binary searches and a positional slice
+    instead of a boolean mask over the whole column.
+
+    Parameters
+    ----------
+    values : array-like
+        Column values, sorted in ascending order.
+
+    Raises
+    ------
+    ValueError
+        If ``values`` is not sorted.
+    """
+
+    def __init__(self, values):
+        values = np.asarray(values)
+        if len(values) > 1 and (values[1:] < values[:-1]).any():
+            raise ValueError("SortedRangeIndex requires values sorted in ascending order.")
+        self.keys, starts = np.unique(values, return_index=True)
+        self.offsets = np.append(starts, len(values))
+
+    def extended(self, values):
+        """Return a new index covering the rows of ``values`` appended after ours.
+
+        Parameters
+        ----------
+        values : array-like
+            Sorted period values of the appended rows, all later than the
+            last key of this index.
+
+        Returns
+        -------
+        SortedRangeIndex
+            Index over the concatenated rows.
+
+        Raises
+        ------
+        ValueError
+            If ``values`` is unsorted or overlaps the existing keys.
+        """
+        appended = SortedRangeIndex(values)
+        if len(appended.keys) and len(self.keys) and appended.keys[0] <= self.keys[-1]:
+            raise ValueError("Appended values must come after the existing keys.")
+        merged = SortedRangeIndex.__new__(SortedRangeIndex)
+        merged.keys = np.concatenate([self.keys, appended.keys])
+        merged.offsets = np.concatenate([self.offsets[:-1], appended.offsets + self.offsets[-1]])
+        return merged
+
+    def bounds(self, start, end):
+        """Return the ``[lo, hi)`` row positions for an inclusive value range.
+
+        Parameters
+        ----------
+        start, end : int
+            Inclusive bounds, e.g. ``YYYYMM`` or ``YYYYWW`` integers.
+
+        Returns
+        -------
+        tuple[int, int]
+            Positions to slice with ``iloc[lo:hi]``.
+        """
+        lo = np.searchsorted(self.keys, start, side="left")
+        hi = np.searchsorted(self.keys, end, side="right")
+        if lo >= hi:
+            return 0, 0
+        return int(self.offsets[lo]), int(self.offsets[hi])
+
+    def slice(self, df, start, end):
+        """Slice the rows of ``df`` whose period lies in ``[start, end]``.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            Frame the index was built from.
+        start, end : int
+            Inclusive period bounds.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Positional slice of ``df``; treat it as read-only.
+        """
+        lo, hi = self.bounds(start, end)
+        return df.iloc[lo:hi]
+
+
+class CategoryIndex:
+    """Integer codes of a categorical column for fast membership filters.
+
+    Selections are resolved once against the (small) list of categories into
+    a boolean lookup table. Row masks then come from indexing that table with
+    the precomputed codes, which avoids string comparisons over every row.
+
+    Parameters
+    ----------
+    values : pandas.Series
+        Column to index; converted to ``category`` dtype if needed.
+    """
+
+    def __init__(self, values):
+        values = values.astype("category")
+        self.categories = values.cat.categories
+        self.codes = values.cat.codes.to_numpy()
+
+    def lookup(self, selected):
+        """Return a boolean table indexed by category code.
+
+        The table has one extra trailing slot, always ``False``, so that
+        missing values (code ``-1``) never match a selection.
+
+        Parameters
+        ----------
+        selected : iterable | None
+            Selected category values.
+
+        Returns
+        -------
+        numpy.ndarray
+            Boolean array of length ``len(categories) + 1``.
+        """
+        table = np.zeros(len(self.categories) + 1, dtype=bool)
+        positions = self.categories.get_indexer(list(selected if selected is not None else []))
+        table[positions[positions >= 0]] = True
+        return table
+
+    def mask(self, selected, lo=0, hi=None):
+        """Return the row mask for ``selected`` over rows ``lo:hi``.
+
+        Parameters
+        ----------
+        selected : iterable | None
+            Selected category values.
+        lo, hi : int, optional
+            Row positions, typically from :meth:`SortedRangeIndex.bounds`.
+
+        Returns
+        -------
+        numpy.ndarray
+            Boolean mask aligned with ``df.iloc[lo:hi]``.
+        """
+        return self.lookup(selected)[self.codes[lo:hi]]
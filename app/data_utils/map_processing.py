@@ -1,119 +1,455 @@
-"""Functions to process and visualize H3 map data."""
+"""Functions to process and visualize H3 map data.
 
+Cell boundaries are kept by :class:`CellGeometryCache` as flat coordinate
+arrays keyed by H3 cell id and persisted to disk, so a restart only computes
+boundaries for cells it has never seen. GeoJSON features are written
+straight from those arrays once, with coordinates rounded to about a metre,
+and served to the browser as a cacheable file, so map responses only carry
+the per-cell values.
+
+:class:`MapPyramid` adds coarser levels of parent cells, so wide views draw
+a few hundred aggregated hexagons and zooming in refines them.
+"""
+
+import copy
+import hashlib
+import itertools
 import json
-from copy import deepcopy
+import logging
+import math
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from h3.api.basic_int import (
+    average_hexagon_edge_length,
+    cell_to_boundary,
+    cell_to_parent,
+    get_resolution,
+)
+
+logger = logging.getLogger(__name__)
+
+# Route the map polygons are served from, see ``routes.register_routes``
+GEOMETRY_URL_PREFIX = "/map/"
+
+# Coarser resolutions precomputed below the one the emissions are stored at
+PYRAMID_LEVELS = 3
+
+# Narrowest hexagon, in screen pixels, drawn before switching to its parents
+MIN_HEXAGON_PIXELS = 6
+
+# Decimal places kept in served coordinates; 5 is about a metre
+COORDINATE_PRECISION = 5
+
+# Web Mercator metres per pixel at the equator at zoom 0
+_METRES_PER_PIXEL = 156543.03
 
-import geopandas as gpd
-from shapely.geometry import Polygon
-from h3.api.basic_int import cell_to_boundary
 
+def _gather(offsets, coords, positions):
+    """Select the rings at ``positions`` from ragged ``offsets``/``coords``."""
+    starts = offsets[:-1][positions]
+    lengths = offsets[1:][positions] - starts
+    new_offsets = np.concatenate([[0], np.cumsum(lengths)]).astype("int64")
+    index = np.repeat(starts - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+    return new_offsets, coords[index]
 
-def h3_to_polygon(h3_index):
-    """Convert an H3 index to a Shapely ``Polygon``.
+
+class CellGeometryCache:
+    """Boundaries of H3 cells, computed once and kept on disk.
+
+    Rings are stored back to back in ``coords`` as ``(lng, lat)`` rows, with
+    ``offsets`` marking where each cell's ring starts; ``cells`` is sorted.
 
     Parameters
     ----------
-    h3_index : int | str
-        H3 index as integer or hexadecimal string.
-
-    Returns
-    -------
-    Polygon
-        Polygon representing the H3 cell.
+    path : str | pathlib.Path, optional
+        ``.npz`` file the boundaries are loaded from and saved to. Without
+        one, they are only kept in memory.
     """
-    if isinstance(h3_index, str):
-        h3_index = int(h3_index, 16)
-    boundary = cell_to_boundary(h3_index)
-    return Polygon([(lng, lat) for lat, lng in boundary])
 
-def generate_unique_polygons(df_with_resolution_id):
-    """Create a GeoDataFrame of unique ``resolution_id`` polygons.
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self.cells = np.empty(0, dtype="int64")
+        self.offsets = np.zeros(1, dtype="int64")
+        self.coords = np.empty((0, 2), dtype="float64")
+        self._lock = threading.Lock()
+        if self.path is not None and self.path.exists():
+            self._load()
+
+    def _load(self):
+        try:
+            with np.load(self.path) as stored:
+                cells, offsets, coords = stored["cells"], stored["offsets"], stored["coords"]
+        except (OSError, ValueError, KeyError) as error:
+            logger.warning("Ignoring H3 geometry cache %s: %s", self.path, error)
+            return
+        self.cells, self.offsets, self.coords = cells, offsets, coords
+
+    def _save(self):
+        """Write the cache under a temporary name and move it into place."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=".tmp-", suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, cells=self.cells, offsets=self.offsets, coords=self.coords)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _add(self, cells):
+        """Compute the boundaries of ``cells`` and merge them in."""
+        # h3 has no bulk boundary function, so only the call itself is per
+        # cell; the rings are flattened straight into one array
+        rings = list(map(cell_to_boundary, cells.tolist()))
+        lengths = np.fromiter(map(len, rings), dtype="int64", count=len(rings))
+        coords = np.fromiter(
+            itertools.chain.from_iterable(itertools.chain.from_iterable(rings)),
+            dtype="float64",
+            count=2 * int(lengths.sum()),
+        )
+        # h3 returns (lat, lng) pairs; GeoJSON wants (lng, lat)
+        coords = coords.reshape(-1, 2)[:, ::-1]
+        all_cells = np.concatenate([self.cells, cells])
+        all_offsets = np.concatenate([self.offsets, self.offsets[-1] + np.cumsum(lengths)])
+        order = np.argsort(all_cells, kind="stable")
+        self.offsets, self.coords = _gather(
+            all_offsets, np.concatenate([self.coords, coords]), order
+        )
+        self.cells = all_cells[order]
+
+    def boundaries(self, cells):
+        """Return the rings of ``cells``, in order.
+
+        Boundaries missing from the cache are computed together and the
+        cache file is updated.
+
+        Parameters
+        ----------
+        cells : array-like
+            H3 cell ids as integers.
+
+        Returns
+        -------
+        tuple[numpy.ndarray, numpy.ndarray]
+            Ring offsets (one more than there are cells) and ``(lng, lat)``
+            coordinates.
+        """
+        cells = np.asarray(cells, dtype="int64")
+        with self._lock:
+            missing = np.setdiff1d(cells, self.cells)
+            if len(missing):
+                self._add(missing)
+                if self.path is not None:
+                    try:
+                        self._save()
+                    except OSError as error:
+                        logger.warning("Could not save H3 geometry cache %s: %s", self.path, error)
+            cached_cells, offsets, coords = self.cells, self.offsets, self.coords
+        return _gather(offsets, coords, np.searchsorted(cached_cells, cells))
+
+
+def _ring_neighbours(offsets):
+    """Return the previous and next vertex of every vertex of closed rings."""
+    index = np.arange(offsets[-1])
+    starts = np.repeat(offsets[:-1], np.diff(offsets))
+    ends = np.repeat(offsets[1:], np.diff(offsets))
+    previous = np.where(index == starts, ends - 1, index - 1)
+    following = np.where(index == ends - 1, starts, index + 1)
+    return previous, following
+
+
+def _drop_vertices(offsets, coords, drop):
+    """Remove flagged vertices, keeping rings that would fall below a triangle."""
+    ring = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    kept = np.diff(offsets) - np.bincount(ring[drop], minlength=len(offsets) - 1)
+    keep = ~drop | (kept < 3)[ring]
+    lengths = np.bincount(ring[keep], minlength=len(offsets) - 1)
+    return np.concatenate([[0], np.cumsum(lengths)]).astype("int64"), coords[keep]
+
+
+def quantize_rings(offsets, coords, precision=COORDINATE_PRECISION):
+    """Round ring coordinates and remove the vertices that become redundant.
+
+    Vertices repeating the previous one after rounding are dropped, then
+    those within one rounding step of the straight line between their
+    neighbours, such as the distortion vertices of cells crossing an
+    icosahedron edge at coarse resolutions.
 
     Parameters
     ----------
-    df_with_resolution_id : pandas.DataFrame
-        DataFrame containing a ``resolution_id`` column.
+    offsets, coords : numpy.ndarray
+        Rings as returned by :meth:`CellGeometryCache.boundaries`.
+    precision : int, optional
+        Decimal places to keep.
 
     Returns
     -------
-    geopandas.GeoDataFrame
-        GeoDataFrame with one row per unique ``resolution_id`` and geometry.
+    tuple[numpy.ndarray, numpy.ndarray]
+        Ring offsets and rounded ``(lng, lat)`` coordinates.
     """
-    unique_ids = df_with_resolution_id[["resolution_id"]].drop_duplicates().copy()
-    unique_ids["geometry"] = unique_ids["resolution_id"].apply(h3_to_polygon)
-    return gpd.GeoDataFrame(unique_ids, geometry="geometry", crs="EPSG:4326")
+    scale = 10 ** precision
+    units = np.rint(coords * scale).astype("int64")
+    previous, _ = _ring_neighbours(offsets)
+    offsets, units = _drop_vertices(offsets, units, (units == units[previous]).all(axis=1))
+    previous, following = _ring_neighbours(offsets)
+    before = (units - units[previous]).astype("float64")
+    chord = (units[following] - units[previous]).astype("float64")
+    # Twice the triangle area is the distance to the chord times its length
+    area = before[:, 0] * chord[:, 1] - before[:, 1] * chord[:, 0]
+    flat = area ** 2 <= (chord ** 2).sum(axis=1)
+    # Neighbours are tested against each other, so never drop two in a row
+    offsets, units = _drop_vertices(offsets, units, flat & ~flat[previous])
+    return offsets, units / scale
 
-def create_geojson_template(geo_df):
-    """Convert a GeoDataFrame to a GeoJSON dictionary.
+
+def create_geojson_template(cells, geometry=None, precision=COORDINATE_PRECISION):
+    """Build a GeoJSON feature collection with one polygon per H3 cell.
 
     Parameters
     ----------
-    geo_df : geopandas.GeoDataFrame
-        GeoDataFrame to convert.
+    cells : array-like
+        H3 cell ids as integers, in feature order.
+    geometry : CellGeometryCache, optional
+        Source of the cell boundaries; computed on the fly by default.
+    precision : int, optional
+        Decimal places kept in the coordinates, see :func:`quantize_rings`.
 
     Returns
     -------
     dict
-        GeoJSON representation of the input GeoDataFrame.
+        GeoJSON whose features carry the cell id as ``resolution_id``.
     """
-    return json.loads(geo_df.to_json())
+    cells = np.asarray(cells, dtype="int64")
+    offsets, coords = quantize_rings(
+        *(geometry or CellGeometryCache()).boundaries(cells), precision
+    )
+    features = []
+    for cell, ring in zip(cells.tolist(), np.split(coords, offsets[1:-1])):
+        ring = ring.tolist()
+        # GeoJSON rings are closed
+        ring.append(ring[0])
+        features.append({
+            "type": "Feature",
+            "properties": {"resolution_id": cell},
+            "geometry": {"type": "Polygon", "coordinates": [ring]},
+        })
+    return {"type": "FeatureCollection", "features": features}
 
-def inject_values_into_geojson(template, values_by_id):
-    """Inject values into a GeoJSON template.
+
+class GeoJSONResource:
+    """GeoJSON serialised once and served under a content fingerprint.
+
+    The browser downloads the map polygons from :attr:`url` a single time
+    and caches them; map responses only reference the URL.
 
     Parameters
     ----------
-    template : dict
-        Base GeoJSON template containing features with ``resolution_id``.
-    values_by_id : dict
-        Mapping of ``resolution_id`` to numeric values.
+    geojson : dict
+        Feature collection, e.g. from :func:`create_geojson_template`.
+    """
 
-    Returns
-    -------
-    dict
-        GeoJSON with only features that have a positive value.
+    def __init__(self, geojson):
+        self._serve(json.dumps(geojson, separators=(",", ":")).encode())
+
+    def _serve(self, body):
+        self.body = body
+        self.fingerprint = hashlib.sha256(self.body).hexdigest()[:16]
+        self.filename = f"cells-{self.fingerprint}.geojson"
+        self.url = GEOMETRY_URL_PREFIX + self.filename
+
+    def extended(self, geojson):
+        """Return a resource with the features of ``geojson`` appended.
+
+        The body is the one serialising all the features at once would
+        give, so only the new features are serialised.
+        """
+        features = json.dumps(geojson["features"], separators=(",", ":")).encode()[1:-1]
+        if not features:
+            return self
+        # The body ends with the closing of the features list and collection
+        head = self.body[:-len(b"]}")]
+        resource = copy.copy(self)
+        resource._serve(head + (b"," if not head.endswith(b"[") else b"") + features + b"]}")
+        return resource
+
+
+class MapPyramid:
+    """H3 cells of the map at their own resolution and at coarser parents.
+
+    Each level maps every base cell to its parent with ``cell_to_parent``
+    and holds the polygons of the distinct parents, served like the base
+    ones. Values are aggregated to a level per request, which only touches
+    the cells of the selection.
+
+    Parameters
+    ----------
+    cells : array-like
+        Distinct H3 cell ids of the emissions, as integers.
+    geometry : CellGeometryCache, optional
+        Source of the cell boundaries; computed on the fly by default.
+    levels : int, optional
+        Number of coarser resolutions to build.
     """
-    updated_geojson = {"type": "FeatureCollection", "features": []}
-    for feature in template["features"]:
-        res_id = feature["properties"]["resolution_id"]
-        value = values_by_id.get(res_id, 0)
-        if value > 0:
-            new_feature = deepcopy(feature)
-            new_feature["properties"]["value"] = value
-            updated_geojson["features"].append(new_feature)
-    return updated_geojson
-
-def generate_h3_map_data(df_to_map, gdf_polygons, precomputed_geojson_template):
+
+    def __init__(self, cells, geometry=None, levels=PYRAMID_LEVELS):
+        self.cells = np.asarray(cells, dtype="int64")
+        self.levels = levels
+        self._order = np.argsort(self.cells, kind="stable")
+        self._sorted = self.cells[self._order]
+        # Parents must exist for every cell, so levels start below the coarsest
+        self.base_resolution = min(map(get_resolution, self.cells.tolist()), default=0)
+        self._parents = self._level_parents(self.cells)
+        self.resources = {
+            resolution: GeoJSONResource(create_geojson_template(pd.unique(parents), geometry))
+            for resolution, parents in self._parents.items()
+        }
+
+    def _level_parents(self, cells):
+        """Return the parent of each of ``cells`` at every level.
+
+        Each level is computed from the distinct parents of the level below,
+        so every parent is looked up once.
+        """
+        parents = {self.base_resolution: cells}
+        base = self.base_resolution
+        for resolution in range(base - 1, max(base - self.levels, 0) - 1, -1):
+            children, inverse = np.unique(parents[resolution + 1], return_inverse=True)
+            distinct = np.fromiter(
+                (cell_to_parent(cell, resolution) for cell in children.tolist()),
+                dtype="int64",
+                count=len(children),
+            )
+            parents[resolution] = distinct[inverse]
+        return parents
+
+    @property
+    def resolutions(self):
+        """Available resolutions, finest first."""
+        return sorted(self._parents, reverse=True)
+
+    def extended(self, cells, geometry=None):
+        """Return a pyramid that also holds ``cells``, skipping known ones.
+
+        Only the new cells get parents and polygons; levels they add no
+        parent cell to keep their resource, and so their URL.
+        """
+        cells = np.asarray(cells, dtype="int64")
+        unseen = pd.unique(cells[~np.isin(cells, self.cells)])
+        if not len(unseen):
+            return self
+        all_cells = np.concatenate([self.cells, unseen])
+        if min(map(get_resolution, unseen.tolist())) < self.base_resolution:
+            # Coarser cells move the levels themselves
+            return MapPyramid(all_cells, geometry, self.levels)
+        pyramid = copy.copy(self)
+        pyramid.cells = all_cells
+        pyramid._order = np.argsort(all_cells, kind="stable")
+        pyramid._sorted = all_cells[pyramid._order]
+        pyramid._parents = {}
+        pyramid.resources = {}
+        for resolution, parents in self._level_parents(unseen).items():
+            known = self._parents[resolution]
+            pyramid._parents[resolution] = np.concatenate([known, parents])
+            added = pd.unique(parents[~np.isin(parents, known)])
+            pyramid.resources[resolution] = (
+                self.resources[resolution].extended(create_geojson_template(added, geometry))
+                if len(added) else self.resources[resolution]
+            )
+        return pyramid
+
+    def find(self, filename):
+        """Return the level resource served as ``filename``, or None."""
+        for resource in self.resources.values():
+            if resource.filename == filename:
+                return resource
+        return None
+
+    def zoom_levels(self):
+        """Return the lowest zoom each level is drawn from, at the equator.
+
+        Hexagons, two edges wide across corners, must span at least
+        :data:`MIN_HEXAGON_PIXELS`. Away from the equator a map at ``zoom``
+        shows them as at ``zoom - log2(cos(latitude))`` on the equator.
+
+        Returns
+        -------
+        list of [int, float]
+            ``[resolution, zoom]`` pairs, finest first.
+        """
+        return [
+            [resolution, math.log2(
+                MIN_HEXAGON_PIXELS * _METRES_PER_PIXEL
+                / (2 * average_hexagon_edge_length(resolution, unit="m"))
+            )]
+            for resolution in self.resolutions
+        ]
+
+    def resolution_for_zoom(self, zoom, latitude=0.0):
+        """Pick the finest level whose hexagons are wide enough to see.
+
+        Parameters
+        ----------
+        zoom : float
+            Map zoom level.
+        latitude : float, optional
+            Latitude of the view centre, in degrees.
+
+        Returns
+        -------
+        int
+            One of :attr:`resolutions`; the coarsest if none is wide enough.
+        """
+        equator_zoom = zoom - math.log2(math.cos(math.radians(latitude)))
+        for resolution, min_zoom in self.zoom_levels():
+            if equator_zoom >= min_zoom:
+                return resolution
+        return self.resolutions[-1]
+
+    def aggregate(self, df_to_map, resolution):
+        """Sum emissions per cell of a pyramid level.
+
+        Parameters
+        ----------
+        df_to_map : pandas.DataFrame
+            Rows with ``resolution_id`` cells of the pyramid and
+            ``co2_equivalent_t`` values.
+        resolution : int
+            Level to aggregate to, one of :attr:`resolutions`.
+
+        Returns
+        -------
+        pandas.DataFrame
+            As :func:`generate_h3_map_data`, keyed by the level's cells.
+        """
+        if resolution != self.base_resolution:
+            positions = self._order[
+                np.searchsorted(self._sorted, df_to_map["resolution_id"].to_numpy(dtype="int64"))
+            ]
+            df_to_map = pd.DataFrame({
+                "resolution_id": self._parents[resolution][positions],
+                "co2_equivalent_t": df_to_map["co2_equivalent_t"].to_numpy(),
+            })
+        return generate_h3_map_data(df_to_map)
+
+
+def generate_h3_map_data(df_to_map):
     """Prepare map data for H3-based emissions visualisation.
 
     Parameters
     ----------
     df_to_map : pandas.DataFrame
         DataFrame with ``resolution_id`` and ``co2_equivalent_t`` columns.
-    gdf_polygons : geopandas.GeoDataFrame
-        GeoDataFrame containing polygon geometries for each ``resolution_id``.
-    precomputed_geojson_template : dict
-        GeoJSON template produced by :func:`create_geojson_template`.
 
     Returns
     -------
-    tuple[dict, geopandas.GeoDataFrame]
-        GeoJSON ready for plotting and grouped GeoDataFrame with geometry.
+    pandas.DataFrame
+        Emissions per ``resolution_id``, matched to the served polygons by
+        their ``resolution_id`` property.
     """
-    # OPTIMIZATION: More efficient groupby and merge
     # Use as_index=False to avoid reset_index() call
-    df_grouped = df_to_map.groupby("resolution_id", as_index=False)["co2_equivalent_t"].sum()
-    
-    # OPTIMIZATION: Use merge with only necessary columns
-    df_grouped = df_grouped.merge(
-        gdf_polygons[["resolution_id", "geometry"]], 
-        on="resolution_id", 
-        how="left"
-    )
-
-    # OPTIMIZATION: More efficient dictionary creation
-    values_by_id = dict(zip(df_grouped["resolution_id"], df_grouped["co2_equivalent_t"]))
-    gdf_json = inject_values_into_geojson(precomputed_geojson_template, values_by_id)
-
-    return gdf_json, df_grouped
-
+    return df_to_map.groupby("resolution_id", as_index=False)["co2_equivalent_t"].sum()
@@ -0,0 +1,82 @@
+"""Vectorised conversions between calendar periods.
+
+The datasets identify periods as ``YYYYMM`` (emissions, waiting times) and
+``YYYYWW`` ISO weeks (energy) integers. These helpers build and convert
+them for whole columns with integer and ``datetime64`` arithmetic instead of
+formatting strings or calling :mod:`datetime` once per row.
+"""
+
+import numpy as np
+
+
+def year_month(year, month):
+    """Return ``YYYYMM`` integers for arrays of years and months."""
+    return np.asarray(year, dtype="int64") * 100 + np.asarray(month, dtype="int64")
+
+
+def year_week(year, week):
+    """Return ``YYYYWW`` integers for arrays of ISO years and weeks."""
+    return np.asarray(year, dtype="int64") * 100 + np.asarray(week, dtype="int64")
+
+
+def _iso_week_one(year):
+    """Return the Monday of ISO week 1 of each year as ``datetime64[D]``."""
+    # Week 1 is the week holding January 4th
+    january_4 = (year - 1970).astype("datetime64[Y]").astype("datetime64[D]") + 3
+    # 1970-01-01 was a Thursday, so day 0 has weekday 3 counting from Monday
+    weekday = (january_4.astype("int64") + 3) % 7
+    return january_4 - weekday
+
+
+def iso_week_monday(year, week):
+    """Return the Monday of ISO ``week`` of ``year``.
+
+    Vectorised equivalent of ``datetime.date.fromisocalendar(year, week, 1)``.
+
+    Parameters
+    ----------
+    year, week : array-like
+        ISO years and week numbers.
+
+    Returns
+    -------
+    numpy.ndarray
+        ``datetime64[D]`` dates.
+
+    Raises
+    ------
+    ValueError
+        If a week does not exist in its year.
+    """
+    year = np.asarray(year, dtype="int64")
+    week = np.asarray(week, dtype="int64")
+    week_one = _iso_week_one(year)
+    weeks_in_year = (_iso_week_one(year + 1) - week_one).astype("int64") // 7
+    invalid = (week < 1) | (week > weeks_in_year)
+    if invalid.any():
+        first = np.flatnonzero(invalid)[0]
+        raise ValueError(f"Invalid week: {week.flat[first]} in {year.flat[first]}")
+    return week_one + (week - 1) * 7
+
+
+def iso_week_month(year, week):
+    """Return the ``YYYYMM`` of the Monday of each ISO week.
+
+    Parameters
+    ----------
+    year, week : array-like
+        ISO years and week numbers.
+
+    Returns
+    -------
+    numpy.ndarray
+        ``int64`` year-month integers.
+    """
+    months = iso_week_monday(year, week).astype("datetime64[M]").astype("int64")
+    return (months // 12 + 1970) * 100 + months % 12 + 1
+
+
+def year_week_to_month(year_weeks):
+    """Return the ``YYYYMM`` of the Monday of each ``YYYYWW`` week."""
+    year_weeks = np.asarray(year_weeks, dtype="int64")
+    return iso_week_month(year_weeks // 100, year_weeks % 100)
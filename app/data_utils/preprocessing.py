@@ -0,0 +1,565 @@
+"""Preprocessing steps that turn the raw datasets into serving structures.
+
+The steps are plain functions wired together by :func:`startup_tasks` as a
+dependency graph for :func:`data_utils.task_graph.run_task_graph`. They are
+shared by ``app.py`` and the offline snapshot build in
+:mod:`data_utils.snapshot`. :func:`extend_state` applies the same steps to
+newly arrived partitions only.
+"""
+
+import pandas as pd
+
+from data_utils.countries import country_table, extend_country_table, lookup
+from data_utils.cubes import EmissionsCube, EnergyFlowTensor, PrefixSumSeries, WaitingTimeCube
+from data_utils.frames import concat_frames
+from data_utils.indexes import SortedRangeIndex
+from data_utils.map_processing import MapPyramid
+from data_utils.periods import iso_week_month, year_month, year_week, year_week_to_month
+
+PRIORITY_VESSEL_TYPES = [
+    "Bulk Carrier",
+    "Container",
+    "Oil tanker",
+    "Chemical tanker",
+    "Liquified gas tanker",
+]
+
+PRIORITY_STOP_AREAS = [
+    "PPC Balboa",
+    "MIT",
+    "Panama Canal South Transit",
+    "Panama Canal North Transit",
+]
+
+# Task results the app serves from; everything else is intermediate
+SERVING_KEYS = (
+    "emissions",
+    "waiting_times",
+    "energy",
+    "controls_emissions",
+    "controls_waiting_times",
+    "controls_energy",
+    "controls_explorer",
+    "emissions_cube",
+    "waiting_cube",
+    "energy_tensor",
+    "countries",
+    "indexes",
+    "explorer_series",
+    "map_pyramid",
+)
+
+
+def reorder_with_priority(options, priority):
+    """Reorder options placing priority items first.
+
+    Parameters
+    ----------
+    options : iterable
+        Original option values.
+    priority : list
+        Values that should appear first if present in ``options``.
+
+    Returns
+    -------
+    list
+        Reordered list with priority values leading.
+    """
+    options = list(options)
+    priority_items = [p for p in priority if p in options]
+    remaining = [o for o in options if o not in priority_items]
+    return priority_items + remaining
+
+
+def _year_month_range(year_months):
+    """Build the month slider values, defaulting the start to 2023-01."""
+    unique_year_months = sorted(set(year_months))
+    year_month_map = {ym: i for i, ym in enumerate(unique_year_months)}
+    index_to_year_month = {i: ym for ym, i in year_month_map.items()}
+    min_index = min(year_month_map.values())
+    max_index = max(year_month_map.values())
+    # Set default start date to 2022-01 instead of minimum value
+    default_start_ym = 202301  # 2022-01
+    if default_start_ym in year_month_map:
+        default_start_index = year_month_map[default_start_ym]
+    else:
+        # If 2022-01 doesn't exist, find the closest date after it
+        available_dates = [ym for ym in unique_year_months if ym >= default_start_ym]
+        if available_dates:
+            default_start_index = year_month_map[min(available_dates)]
+        else:
+            # Fallback to minimum if no dates after 2022-01
+            default_start_index = min_index
+
+    return {
+        "min_index": min_index,
+        "max_index": max_index,
+        "default_start_index": default_start_index,  # New field for default start
+        "unique_year_months": unique_year_months,
+        "index_to_year_month": index_to_year_month,
+    }
+
+
+def _appended(existing, new):
+    """Return ``existing`` followed by the values of ``new`` not in it yet."""
+    return list(dict.fromkeys([*existing, *new]))
+
+
+def prepare_emissions_controls(df):
+    """Build control options for the emissions tab.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Emissions data including ``StandardVesselType`` and ``year_month``.
+
+    Returns
+    -------
+    dict
+        Dictionary of control values such as vessel types and date range info.
+    """
+
+    # Vessel types
+    vessel_types = reorder_with_priority(
+        df['StandardVesselType'].unique(), PRIORITY_VESSEL_TYPES
+    )
+
+    return {
+        "vessel_types": vessel_types,
+        "date_range": _year_month_range(df["year_month"].unique()),
+    }
+
+
+def extend_emissions_controls(controls, df):
+    """Add the vessel types and months of appended rows ``df`` to ``controls``.
+
+    Equivalent to :func:`prepare_emissions_controls` on the combined data
+    when ``df`` follows the rows ``controls`` was built from.
+    """
+    return {
+        "vessel_types": reorder_with_priority(
+            _appended(controls["vessel_types"], df['StandardVesselType'].unique()),
+            PRIORITY_VESSEL_TYPES,
+        ),
+        "date_range": _year_month_range(
+            [*controls["date_range"]["unique_year_months"], *df["year_month"].unique()]
+        ),
+    }
+
+
+def prepare_waiting_time_controls(df):
+    """Build control options for waiting time and service time tabs.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Waiting/service time data with ``StandardVesselType``, ``stop_area`` and ``year_month``.
+
+    Returns
+    -------
+    dict
+        Dictionary of control values including vessel types, stop areas and date range info.
+    """
+
+    # Vessel types
+    vessel_types = reorder_with_priority(
+        df['StandardVesselType'].unique(), PRIORITY_VESSEL_TYPES
+    )
+    stop_area = reorder_with_priority(
+        df['stop_area'].unique(), PRIORITY_STOP_AREAS
+    )
+
+    return {
+        "vessel_types": vessel_types,
+        "stop_area": stop_area,
+        "date_range": _year_month_range(df["year_month"].unique()),
+    }
+
+
+def extend_waiting_time_controls(controls, df):
+    """Add the vessel types, stop areas and months of appended rows ``df``.
+
+    Equivalent to :func:`prepare_waiting_time_controls` on the combined data
+    when ``df`` follows the rows ``controls`` was built from.
+    """
+    return {
+        "vessel_types": reorder_with_priority(
+            _appended(controls["vessel_types"], df['StandardVesselType'].unique()),
+            PRIORITY_VESSEL_TYPES,
+        ),
+        "stop_area": reorder_with_priority(
+            _appended(controls["stop_area"], df['stop_area'].unique()),
+            PRIORITY_STOP_AREAS,
+        ),
+        "date_range": _year_month_range(
+            [*controls["date_range"]["unique_year_months"], *df["year_month"].unique()]
+        ),
+    }
+
+
+def _energy_controls(country_before_map, country_after_map, year_weeks):
+    """Build energy controls from name-to-code maps and the weeks present."""
+    # Date slider values for year_week
+    unique_year_weeks = sorted(set(year_weeks))
+    year_week_map = {yw: i for i, yw in enumerate(unique_year_weeks)}
+    index_to_year_week = {i: yw for yw, i in year_week_map.items()}
+    min_index = min(year_week_map.values())
+    max_index = max(year_week_map.values())
+
+    return {
+        "country_before": sorted(country_before_map),
+        "country_after": sorted(country_after_map),
+        "country_before_map": country_before_map,
+        "country_after_map": country_after_map,
+        "date_range": {
+            "min_index": min_index,
+            "max_index": max_index,
+            "unique_year_week": unique_year_weeks,
+            "index_to_year_week": index_to_year_week,
+        }
+    }
+
+
+def prepare_energy_controls(df):
+    """Build control options for the energy tab.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Energy demand data with country codes and ``year_week``.
+
+    Returns
+    -------
+    dict
+        Control values for origin/destination countries and date ranges.
+    """
+    # Maps from country name to ISO-2 code for filtering; their keys are
+    # the unique origin and destination names shown in the controls
+    country_before_map = dict(
+        df[['country_before_name', 'country_before']].drop_duplicates().values
+    )
+    country_after_map = dict(
+        df[['country_after_name', 'country_after']].drop_duplicates().values
+    )
+    return _energy_controls(country_before_map, country_after_map, df["year_week"].unique())
+
+
+def extend_energy_controls(controls, df):
+    """Add the countries and weeks of appended rows ``df`` to ``controls``.
+
+    Equivalent to :func:`prepare_energy_controls` on the combined data when
+    ``df`` follows the rows ``controls`` was built from.
+    """
+    country_before_map = {
+        **controls["country_before_map"],
+        **dict(df[['country_before_name', 'country_before']].drop_duplicates().values),
+    }
+    country_after_map = {
+        **controls["country_after_map"],
+        **dict(df[['country_after_name', 'country_after']].drop_duplicates().values),
+    }
+    return _energy_controls(
+        country_before_map,
+        country_after_map,
+        [*controls["date_range"]["unique_year_week"], *df["year_week"].unique()],
+    )
+
+
+def _explorer_controls(year_months, year_weeks):
+    """Build explorer controls from the months and weeks of all sources."""
+    unique_year_weeks = sorted(set(year_weeks))
+    all_months = sorted(set(year_months).union(year_week_to_month(unique_year_weeks).tolist()))
+    year_month_map = {ym: i for i, ym in enumerate(all_months)}
+    index_to_year_month = {i: ym for ym, i in year_month_map.items()}
+
+    year_week_map = {yw: i for i, yw in enumerate(unique_year_weeks)}
+    index_to_year_week = {i: yw for yw, i in year_week_map.items()}
+
+    return {
+        "sources": ["emissions", "waiting_time", "service_time", "energy"],
+        "date_range": {
+            "min_index": min(year_month_map.values()),
+            "max_index": max(year_month_map.values()),
+            "unique_year_months": all_months,
+            "index_to_year_month": index_to_year_month,
+        },
+        "week_range": {
+            "min_index": min(year_week_map.values()) if year_week_map else 0,
+            "max_index": max(year_week_map.values()) if year_week_map else 0,
+            "unique_year_week": unique_year_weeks,
+            "index_to_year_week": index_to_year_week,
+        },
+    }
+
+
+def prepare_explorer_controls(df_emissions, df_waiting, df_energy):
+    """Assemble control options for the explorer tab.
+
+    Parameters
+    ----------
+    df_emissions, df_waiting, df_energy : pandas.DataFrame
+        Datasets used for emissions, waiting/service times and energy.
+
+    Returns
+    -------
+    dict
+        Control metadata including sources and date/week ranges.
+    """
+    return _explorer_controls(
+        [*df_emissions["year_month"].unique(), *df_waiting["year_month"].unique()],
+        df_energy["year_week"].unique(),
+    )
+
+
+def extend_explorer_controls(controls, df_emissions, df_waiting, df_energy):
+    """Add the months and weeks of appended rows to explorer ``controls``."""
+    return _explorer_controls(
+        [
+            *controls["date_range"]["unique_year_months"],
+            *df_emissions["year_month"].unique(),
+            *df_waiting["year_month"].unique(),
+        ],
+        [*controls["week_range"]["unique_year_week"], *df_energy["year_week"].unique()],
+    )
+
+
+def preprocess_emissions(df):
+    """Derive ``year_month``, sort by it and optimise dtypes."""
+    df["year_month"] = year_month(df["year"], df["month"])
+
+    # Pre-sort the DataFrame by year_month for better performance in callbacks
+    df = df.sort_values("year_month").reset_index(drop=True)
+
+    # Optimize data types for better memory usage and performance
+    return df.astype({
+        "year": "int16",
+        "month": "int8",
+        "year_month": "int32",
+        "co2_equivalent_t": "float32",
+        "StandardVesselType": "category",
+    })
+
+
+def preprocess_waiting_times(df):
+    """Derive ``year_month``, sort by it and encode the filter columns."""
+    df["year_month"] = year_month(df["year"], df["month"])
+    df = df.sort_values("year_month", kind="stable").reset_index(drop=True)
+    return df.astype({
+        "StandardVesselType": "category",
+        "stop_area": "category",
+    })
+
+
+def preprocess_energy(df):
+    """Derive ``year_week`` and sort by it."""
+    df["year_week"] = year_week(df["year"], df["week"])
+    return df.sort_values("year_week", kind="stable").reset_index(drop=True)
+
+
+def energy_year_month(df):
+    """Return the ``YYYYMM`` of the Monday of each row's ISO week."""
+    return pd.Series(iso_week_month(df["year"], df["week"]), index=df.index)
+
+
+def energy_countries(df):
+    """Build the country dimension table for the origins and destinations."""
+    return country_table(df["country_before"], df["country_after"])
+
+
+def energy_country_names(df, countries):
+    """Return the full origin and destination country names."""
+    return (
+        lookup(df["country_before"], countries, "name"),
+        lookup(df["country_after"], countries, "name"),
+    )
+
+
+def finalize_energy(df, year_month, country_names):
+    """Attach the derived columns to the energy frame and encode countries."""
+    df = df.assign(
+        year_month=year_month,
+        country_before_name=country_names[0],
+        country_after_name=country_names[1],
+    )
+    return df.astype({
+        "country_before": "category",
+        "country_after": "category",
+    })
+
+
+def build_indexes(df_emissions, df_waiting, df_energy):
+    """Row offsets per period so callbacks slice date ranges instead of masking."""
+    return {
+        "emissions": {
+            "year_month": SortedRangeIndex(df_emissions["year_month"]),
+        },
+        "waiting_times": {
+            "year_month": SortedRangeIndex(df_waiting["year_month"]),
+        },
+        "energy": {
+            "year_week": SortedRangeIndex(df_energy["year_week"]),
+        },
+    }
+
+
+def build_explorer_series(df_emissions, df_waiting, df_energy):
+    """Cumulative totals per period for the explorer summary line."""
+    return {
+        "emissions": PrefixSumSeries(df_emissions["year_month"], df_emissions["co2_equivalent_t"]),
+        "waiting_time": PrefixSumSeries(df_waiting["year_month"], df_waiting["waiting_time"]),
+        "service_time": PrefixSumSeries(df_waiting["year_month"], df_waiting["service_time"]),
+        "energy": PrefixSumSeries(df_energy["year_week"], df_energy["sum_energy"]),
+    }
+
+
+def map_cells(df_emissions):
+    """Return the distinct H3 cells of the emissions, in order of first use."""
+    return pd.unique(df_emissions["resolution_id"].to_numpy(dtype="int64"))
+
+
+def startup_tasks(read_emissions, read_waiting_times, read_energy, weight_waiting_column=None,
+                  geometry=None):
+    """Build the task graph that loads and prepares every dataset.
+
+    Parameters
+    ----------
+    read_emissions, read_waiting_times, read_energy : callable
+        Zero-argument functions returning the raw DataFrames.
+    weight_waiting_column : str, optional
+        Column weighting the waiting/service time means, if any.
+    geometry : data_utils.map_processing.CellGeometryCache, optional
+        Source of the H3 cell boundaries for the map.
+
+    Returns
+    -------
+    dict
+        Tasks for :func:`data_utils.task_graph.run_task_graph`. The results
+        listed in :data:`SERVING_KEYS` are what the app needs to serve.
+    """
+    return {
+        "read_emissions": (read_emissions, ()),
+        "read_waiting_times": (read_waiting_times, ()),
+        "read_energy": (read_energy, ()),
+        "emissions": (preprocess_emissions, ("read_emissions",)),
+        "waiting_times": (preprocess_waiting_times, ("read_waiting_times",)),
+        "energy_weeks": (preprocess_energy, ("read_energy",)),
+        "energy_year_month": (energy_year_month, ("energy_weeks",)),
+        "countries": (energy_countries, ("energy_weeks",)),
+        "energy_country_names": (energy_country_names, ("energy_weeks", "countries")),
+        "energy": (finalize_energy, ("energy_weeks", "energy_year_month", "energy_country_names")),
+        "controls_emissions": (prepare_emissions_controls, ("emissions",)),
+        "emissions_cube": (EmissionsCube, ("emissions",)),
+        "controls_waiting_times": (prepare_waiting_time_controls, ("waiting_times",)),
+        "waiting_cube": (
+            lambda df: WaitingTimeCube(df, weight_column=weight_waiting_column),
+            ("waiting_times",),
+        ),
+        "controls_energy": (prepare_energy_controls, ("energy",)),
+        "energy_tensor": (EnergyFlowTensor, ("energy",)),
+        "controls_explorer": (prepare_explorer_controls, ("emissions", "waiting_times", "energy")),
+        "indexes": (build_indexes, ("emissions", "waiting_times", "energy")),
+        "explorer_series": (build_explorer_series, ("emissions", "waiting_times", "energy")),
+        "map_cells": (map_cells, ("emissions",)),
+        "map_pyramid": (lambda cells: MapPyramid(cells, geometry), ("map_cells",)),
+    }
+
+
+def extend_state(state, emissions=None, waiting_times=None, energy=None, geometry=None):
+    """Append newly arrived raw rows to existing serving structures.
+
+    Only the new rows are preprocessed and aggregated: frames are
+    concatenated, and cubes, range indexes, prefix sums, controls and H3
+    polygons are extended with the aggregates of the new rows. The result
+    matches a full rebuild over the combined data.
+
+    Parameters
+    ----------
+    state : dict
+        Serving structures keyed by the names in :data:`SERVING_KEYS`. It is
+        not modified.
+    emissions, waiting_times, energy : pandas.DataFrame, optional
+        Raw rows to append, as read from the source. Their periods must all
+        follow the ones already loaded.
+    geometry : data_utils.map_processing.CellGeometryCache, optional
+        Source of the boundaries of newly seen H3 cells.
+
+    Returns
+    -------
+    dict
+        New serving structures.
+
+    Raises
+    ------
+    ValueError
+        If new rows fall in periods that are already loaded; a full rebuild
+        is needed then.
+    """
+    state = dict(state)
+    state["indexes"] = {name: dict(columns) for name, columns in state["indexes"].items()}
+    state["explorer_series"] = dict(state["explorer_series"])
+    deltas = {}
+
+    if emissions is not None and len(emissions):
+        delta = preprocess_emissions(emissions)
+        offset = len(state["emissions"])
+        state["emissions_cube"] = state["emissions_cube"].extended(delta)
+        state["emissions"] = concat_frames(state["emissions"], delta)
+        state["indexes"]["emissions"]["year_month"] = (
+            state["indexes"]["emissions"]["year_month"].extended(delta["year_month"])
+        )
+        state["explorer_series"]["emissions"] = state["explorer_series"]["emissions"].extended(
+            delta["year_month"], delta["co2_equivalent_t"]
+        )
+        state["controls_emissions"] = extend_emissions_controls(state["controls_emissions"], delta)
+
+        # New polygons only when H3 cells appear for the first time; known
+        # boundaries come from the geometry cache
+        state["map_pyramid"] = state["map_pyramid"].extended(
+            map_cells(state["emissions"].iloc[offset:]), geometry
+        )
+        deltas["emissions"] = delta
+
+    if waiting_times is not None and len(waiting_times):
+        delta = preprocess_waiting_times(waiting_times)
+        state["waiting_cube"] = state["waiting_cube"].extended(delta)
+        state["waiting_times"] = concat_frames(state["waiting_times"], delta)
+        state["indexes"]["waiting_times"]["year_month"] = (
+            state["indexes"]["waiting_times"]["year_month"].extended(delta["year_month"])
+        )
+        for column in ("waiting_time", "service_time"):
+            state["explorer_series"][column] = state["explorer_series"][column].extended(
+                delta["year_month"], delta[column]
+            )
+        state["controls_waiting_times"] = extend_waiting_time_controls(
+            state["controls_waiting_times"], delta
+        )
+        deltas["waiting_times"] = delta
+
+    if energy is not None and len(energy):
+        delta = preprocess_energy(energy)
+        state["countries"] = extend_country_table(
+            state["countries"], delta["country_before"], delta["country_after"]
+        )
+        delta = finalize_energy(
+            delta, energy_year_month(delta), energy_country_names(delta, state["countries"])
+        )
+        state["energy_tensor"] = state["energy_tensor"].extended(delta)
+        state["energy"] = concat_frames(state["energy"], delta)
+        state["indexes"]["energy"]["year_week"] = (
+            state["indexes"]["energy"]["year_week"].extended(delta["year_week"])
+        )
+        state["explorer_series"]["energy"] = state["explorer_series"]["energy"].extended(
+            delta["year_week"], delta["sum_energy"]
+        )
+        state["controls_energy"] = extend_energy_controls(state["controls_energy"], delta)
+        deltas["energy"] = delta
+
+    if deltas:
+        state["controls_explorer"] = extend_explorer_controls(
+            state["controls_explorer"],
+            *(
+                deltas.get(name, state[name].iloc[0:0])
+                for name in ("emissions", "waiting_times", "energy")
+            ),
+        )
+    return state
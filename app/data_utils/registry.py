@@ -0,0 +1,265 @@
+"""Versioned holder of the serving structures with background reloads.
+
+Callbacks read :attr:`DataRegistry.current` once per call and use that
+:class:`DatasetVersion` throughout, so a reload swapping in new data never
+mixes versions within a request: in-flight callbacks finish on the version
+they started with, the next ones see the new one.
+
+The registry can also start empty and load the first version in the
+background, so a worker answers health checks and static pages at once;
+reading :attr:`DataRegistry.current` then waits for that first load.
+
+Threads do not survive ``fork``. When a server such as ``gunicorn
+--preload`` forks its workers from a process that already started a
+registry, each child starts its own thread on its next
+:meth:`DataRegistry.start`, keeping the version loaded before the fork. The
+parent keeps polling until told to :meth:`DataRegistry.stop`, e.g. from a
+server hook.
+"""
+
+import datetime
+import logging
+import os
+import reprlib
+import threading
+import time
+import weakref
+
+logger = logging.getLogger(__name__)
+
+# Registries whose threads and locks are reset around ``fork``
+_registries = weakref.WeakSet()
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+class DataNotReady(RuntimeError):
+    """Raised when the first dataset version is still loading."""
+
+
+class DatasetVersion:
+    """One generation of frames, controls, cubes and indexes.
+
+    Parameters
+    ----------
+    state : dict
+        Serving structures keyed by the names in
+        ``data_utils.preprocessing.SERVING_KEYS``.
+    version : hashable
+        Token identifying the source data, e.g. the S3 ETags.
+    """
+
+    def __init__(self, state, version):
+        self.state = state
+        self.version = version
+        self.loaded_at = _now()
+
+    def __getitem__(self, key):
+        return self.state[key]
+
+
+class DataRegistry:
+    """Hold the current :class:`DatasetVersion` and swap in new ones.
+
+    Parameters
+    ----------
+    state : dict, optional
+        Initial serving structures. Without them, :meth:`start` loads the
+        first version in the background with ``loader``.
+    version : hashable, optional
+        Token of the initial data.
+    probe : callable, optional
+        Returns the token of the data currently available at the source.
+    loader : callable, optional
+        Called as ``loader(previous, version)`` with the current
+        :class:`DatasetVersion` and the new token; returns the serving
+        structures for the data at the source, possibly by extending
+        ``previous``.
+    poll_interval : float, optional
+        Seconds between background checks; ``0`` disables polling.
+    wait_timeout : float, optional
+        Seconds :attr:`current` waits for the first version before raising
+        :class:`DataNotReady`; ``None`` waits indefinitely.
+    retry_interval : float, optional
+        Seconds between attempts when the first load fails.
+    """
+
+    def __init__(self, state=None, version=None, probe=None, loader=None, poll_interval=0,
+                 wait_timeout=None, retry_interval=30):
+        self._current = None if state is None else DatasetVersion(state, version)
+        self._probe = probe
+        self._loader = loader
+        self.poll_interval = poll_interval
+        self.wait_timeout = wait_timeout
+        self.retry_interval = retry_interval
+        self._ready = threading.Event()
+        if self._current is not None:
+            self._ready.set()
+        self._reload_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._listeners = []
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_checked_at = None
+        self.last_error = None
+        _registries.add(self)
+
+    @property
+    def current(self):
+        """The :class:`DatasetVersion` new requests should use.
+
+        Raises
+        ------
+        DataNotReady
+            If the first version is not loaded within ``wait_timeout``.
+        """
+        if not self._ready.wait(self.wait_timeout):
+            raise DataNotReady("Datasets are still loading.")
+        return self._current
+
+    @property
+    def ready(self):
+        """Whether a version has been loaded."""
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout=None):
+        """Block until the first version is loaded; return whether it is."""
+        return self._ready.wait(timeout)
+
+    def add_listener(self, listener):
+        """Call ``listener(version)`` after every swap, e.g. to clear caches."""
+        self._listeners.append(listener)
+
+    def swap(self, state, version):
+        """Make ``state`` the current version.
+
+        Rebinding the reference is atomic, so readers see either the old or
+        the new version, never a mix.
+        """
+        new = DatasetVersion(state, version)
+        self._current = new
+        self._ready.set()
+        for listener in self._listeners:
+            listener(new)
+        logger.info("Swapped in dataset version %s", reprlib.repr(version))
+        return new
+
+    def reload(self, force=False):
+        """Load and swap in the source data if its version changed.
+
+        Parameters
+        ----------
+        force : bool, optional
+            Rebuild from scratch even if the version token is unchanged.
+
+        Returns
+        -------
+        bool
+            ``True`` if a new version was swapped in.
+        """
+        with self._reload_lock:
+            version = self._probe()
+            self.last_checked_at = _now()
+            if self._current is not None and version == self._current.version and not force:
+                return False
+            logger.info("Dataset version changed to %s, reloading", reprlib.repr(version))
+            previous = None if force else self._current
+            self.swap(self._loader(previous, version), version)
+            return True
+
+    def _load_first(self, stop):
+        """Load the first version, retrying until it succeeds or ``stop`` is set."""
+        while self._current is None:
+            start = time.time()
+            try:
+                with self._reload_lock:
+                    if self._current is not None:
+                        return
+                    try:
+                        version = self._probe()
+                    except Exception as error:  # pylint: disable=broad-except
+                        # The loader may still serve cached data; the next
+                        # poll picks up the real version
+                        logger.warning("Could not read the dataset version: %s", error)
+                        version = None
+                    self.swap(self._loader(None, version), version)
+                self.last_error = None
+                logger.info("Loaded the first dataset version in %.2fs", time.time() - start)
+            except Exception as error:  # pylint: disable=broad-except
+                self.last_error = repr(error)
+                logger.exception("Initial dataset load failed")
+                if stop.wait(self.retry_interval):
+                    return
+
+    def _run(self, stop):
+        self._load_first(stop)
+        if not self.poll_interval:
+            return
+        while not stop.wait(self.poll_interval):
+            try:
+                self.reload()
+                self.last_error = None
+            except Exception as error:  # pylint: disable=broad-except
+                # Keep serving the current version and try again next time
+                self.last_error = repr(error)
+                logger.exception("Dataset reload failed")
+
+    def start(self):
+        """Load the first version and poll for new ones in a daemon thread.
+
+        Cheap once the thread runs, so it can be called on every request.
+        Does nothing if a version is already loaded and polling is disabled.
+        """
+        if self._probe is None or self._thread is not None:
+            return
+        if self._current is not None and not self.poll_interval:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                # Each thread gets its own event, so a stopped one never
+                # sees the event of the thread started after it
+                self._stop = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._stop,), name="data-registry", daemon=True
+                )
+                self._thread.start()
+
+    def _after_fork_in_child(self):
+        # Only the forking thread survives; locks it did not hold may be held
+        self._thread = None
+        self._stop = threading.Event()
+        self._reload_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._ready = threading.Event()
+        if self._current is not None:
+            self._ready.set()
+
+    def stop(self):
+        """Stop the polling thread; a later :meth:`start` starts a new one."""
+        with self._start_lock:
+            self._stop.set()
+            self._thread = None
+
+    def status(self):
+        """Summary of the current version for health checks."""
+        current = self._current
+        return {
+            "ready": current is not None,
+            "version": current.version if current is not None else None,
+            "loaded_at": current.loaded_at if current is not None else None,
+            "last_checked_at": self.last_checked_at,
+            "last_error": self.last_error,
+            "poll_interval": self.poll_interval,
+        }
+
+
+def _after_fork(method):
+    def hook():
+        for registry in list(_registries):
+            getattr(registry, method)()
+    return hook
+
+
+os.register_at_fork(after_in_child=_after_fork("_after_fork_in_child"))
@@ -0,0 +1,362 @@
+"""Local disk cache for objects downloaded from S3.
+
+Each object is stored under ``<cache_dir>/<bucket>/<key>`` next to a small
+JSON sidecar holding its ETag, size and SHA-256. On the next read the ETag
+of an intact copy is sent as ``IfNoneMatch``: S3 answers ``304 Not
+Modified`` without a body when the object is unchanged, so worker restarts
+read from local disk instead of downloading every dataset again. If S3
+cannot be reached, the last intact copy is used.
+
+A dataset is either one object or a prefix ending in ``/`` with one object
+per ``year_month``/``year_week``. Partitions are cached individually, so new
+periods only cost the download of their own objects.
+
+Without a cache directory objects are read in place through
+:class:`S3RangeReader`: pyarrow seeks to the footer and the column chunks it
+needs, so the raw object is never held in memory as a whole.
+"""
+
+import contextlib
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from data_utils.schemas import read_parquet_files
+
+logger = logging.getLogger(__name__)
+
+_NOT_MODIFIED = ("304", "NotModified", "Not Modified")
+
+# Bytes copied at a time when storing a download
+_CHUNK_SIZE = 1024 * 1024
+
+
+def _is_not_modified(error):
+    """Return ``True`` if ``error`` is S3's answer to a matching ``IfNoneMatch``."""
+    code = str(error.response.get("Error", {}).get("Code", ""))
+    status = str(error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", ""))
+    return code in _NOT_MODIFIED or status == "304"
+
+
+class S3RangeReader(io.RawIOBase):
+    """Seekable read-only file over an S3 object, fetched with ranged GETs.
+
+    Every range is requested with ``IfMatch`` on the ETag seen when the
+    reader was opened, so an object replaced mid-read raises instead of
+    mixing two versions. Wrap it in :class:`io.BufferedReader` to batch
+    small reads.
+
+    Parameters
+    ----------
+    s3_client : botocore.client.S3
+        Client used for ``head_object`` and ``get_object`` calls.
+    bucket : str
+        S3 bucket name.
+    key : str
+        Object key within the bucket.
+    """
+
+    def __init__(self, s3_client, bucket, key):
+        super().__init__()
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        head = s3_client.head_object(Bucket=bucket, Key=key)
+        self.size = head["ContentLength"]
+        self.etag = head.get("ETag")
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence {whence}.")
+        if position < 0:
+            raise ValueError(f"Negative seek position {position}.")
+        self._position = position
+        return position
+
+    def readinto(self, buffer):
+        end = min(self._position + len(buffer), self.size)
+        if end <= self._position:
+            return 0
+        request = {
+            "Bucket": self.bucket,
+            "Key": self.key,
+            "Range": f"bytes={self._position}-{end - 1}",
+        }
+        if self.etag:
+            request["IfMatch"] = self.etag
+        body = self.s3_client.get_object(**request)["Body"]
+        view = memoryview(buffer)
+        read = 0
+        try:
+            while read < end - self._position:
+                chunk = body.read(end - self._position - read)
+                if not chunk:
+                    break
+                view[read:read + len(chunk)] = chunk
+                read += len(chunk)
+        finally:
+            body.close()
+        self._position += read
+        return read
+
+
+class S3ObjectCache:
+    """Download S3 objects to a local directory and revalidate them by ETag.
+
+    Parameters
+    ----------
+    s3_client : botocore.client.S3
+        Client used for ``get_object`` calls.
+    cache_dir : str | pathlib.Path, optional
+        Directory where objects and their metadata are stored. Created on
+        first use. Without one, datasets are read from S3 with ranged
+        requests on every load.
+    """
+
+    # Bytes buffered per ranged request when reading without a cache
+    range_buffer_size = 8 * 1024 * 1024
+
+    def __init__(self, s3_client, cache_dir=None):
+        self.s3_client = s3_client
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+
+    def paths(self, bucket, key):
+        """Return the data and metadata paths for ``bucket``/``key``."""
+        data_path = self.cache_dir / bucket / key
+        return data_path, data_path.with_name(data_path.name + ".meta.json")
+
+    def _read_etag(self, bucket, key):
+        """Return the ETag of the cached copy, or None if there is no intact one."""
+        data_path, meta_path = self.paths(bucket, key)
+        if not data_path.exists():
+            return None
+        try:
+            meta = json.loads(meta_path.read_text())
+            with open(data_path, "rb") as f:
+                intact = (
+                    os.fstat(f.fileno()).st_size == meta["Size"]
+                    and hashlib.file_digest(f, "sha256").hexdigest() == meta["SHA256"]
+                )
+        except (OSError, ValueError, KeyError, TypeError):
+            intact = False
+        if not intact:
+            logger.warning("Ignoring damaged S3 cache entry for s3://%s/%s", bucket, key)
+            return None
+        return meta.get("ETag")
+
+    def _store(self, bucket, key, obj):
+        """Stream the body of ``obj`` to disk and record its ETag.
+
+        The size and SHA-256 of the body are recorded with the ETag, so a
+        damaged copy is downloaded again instead of being revalidated. Files
+        are written to a temporary name and moved into place so that
+        concurrent workers never read a partial download.
+        """
+        data_path, meta_path = self.paths(bucket, key)
+        data_path.parent.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+
+        def write_body(f):
+            nonlocal size
+            for chunk in iter(lambda: obj["Body"].read(_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                size += len(chunk)
+                f.write(chunk)
+
+        def write_meta(f):
+            meta = {"ETag": obj.get("ETag"), "Size": size, "SHA256": digest.hexdigest()}
+            f.write(json.dumps(meta).encode())
+
+        for path, write in ((data_path, write_body), (meta_path, write_meta)):
+            fd, tmp_path = tempfile.mkstemp(dir=data_path.parent, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    write(f)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+    def fetch(self, bucket, key):
+        """Return a local path holding the current version of an object.
+
+        Parameters
+        ----------
+        bucket : str
+            S3 bucket name.
+        key : str
+            Object key within the bucket.
+
+        Returns
+        -------
+        pathlib.Path
+            Path of the cached file.
+
+        Raises
+        ------
+        botocore.exceptions.ClientError, botocore.exceptions.BotoCoreError
+            If S3 fails and no cached copy exists.
+        """
+        data_path, _ = self.paths(bucket, key)
+        etag = self._read_etag(bucket, key)
+        request = {"Bucket": bucket, "Key": key}
+        if etag:
+            request["IfNoneMatch"] = etag
+        try:
+            obj = self.s3_client.get_object(**request)
+        except ClientError as error:
+            if etag and _is_not_modified(error):
+                logger.info("S3 cache hit for s3://%s/%s", bucket, key)
+                return data_path
+            if etag:
+                logger.warning("S3 error for s3://%s/%s, using cached copy: %s", bucket, key, error)
+                return data_path
+            raise
+        except BotoCoreError as error:
+            if etag:
+                logger.warning("S3 unreachable for s3://%s/%s, using cached copy: %s", bucket, key, error)
+                return data_path
+            raise
+        self._store(bucket, key, obj)
+        logger.info("S3 cache refreshed for s3://%s/%s", bucket, key)
+        return data_path
+
+    def open(self, bucket, key):
+        """Return a buffered, seekable file reading the object in place."""
+        return io.BufferedReader(
+            S3RangeReader(self.s3_client, bucket, key), buffer_size=self.range_buffer_size
+        )
+
+    def etag(self, bucket, key):
+        """Return the current ETag of an object without downloading it."""
+        return self.s3_client.head_object(Bucket=bucket, Key=key).get("ETag")
+
+    def list_partitions(self, bucket, prefix):
+        """Return the ETag of every Parquet object under ``prefix``.
+
+        Parameters
+        ----------
+        bucket : str
+            S3 bucket name.
+        prefix : str
+            Key prefix of a partitioned dataset, e.g. ``"emissions/"``.
+
+        Returns
+        -------
+        dict
+            Maps each object key to its ETag.
+        """
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        return {
+            item["Key"]: item["ETag"]
+            for page in paginator.paginate(Bucket=bucket, Prefix=prefix)
+            for item in page.get("Contents", [])
+            if item["Key"].endswith(".parquet")
+        }
+
+    def dataset_version(self, bucket, name):
+        """Return a token that changes whenever dataset ``name`` changes.
+
+        Parameters
+        ----------
+        bucket : str
+            S3 bucket name.
+        name : str
+            Object key, or a prefix ending in ``/`` for a dataset stored as
+            one object per period (see :func:`is_partitioned`).
+
+        Returns
+        -------
+        str | tuple
+            The ETag of a single object, or sorted ``(key, ETag)`` pairs of
+            the partitions.
+        """
+        if is_partitioned(name):
+            return tuple(sorted(self.list_partitions(bucket, name).items()))
+        return self.etag(bucket, name)
+
+    def read_dataset(self, bucket, name, keys=None, schema=None, filters=None):
+        """Read dataset ``name``, or only its partitions ``keys``.
+
+        Parameters
+        ----------
+        bucket : str
+            S3 bucket name.
+        name : str
+            Object key or partition prefix, as for :meth:`dataset_version`.
+        keys : list, optional
+            Partitions to read; all of them by default.
+        schema : dict, optional
+            Columns to read and their types, see
+            :data:`data_utils.schemas.DATASET_SCHEMAS`.
+        filters : list, optional
+            Row filter applied while decoding.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Rows of the object or of the selected partitions.
+        """
+        if not is_partitioned(name):
+            keys = [name]
+        elif keys is None:
+            keys = sorted(self.list_partitions(bucket, name))
+        if self.cache_dir is not None:
+            return read_parquet_files(
+                [self.fetch(bucket, key) for key in keys], schema=schema, filters=filters
+            )
+        with contextlib.ExitStack() as stack:
+            sources = [stack.enter_context(self.open(bucket, key)) for key in keys]
+            return read_parquet_files(sources, schema=schema, filters=filters)
+
+
+def is_partitioned(name):
+    """Whether ``name`` is a prefix holding one Parquet object per period."""
+    return name.endswith("/")
+
+
+def added_partitions(old_version, new_version):
+    """Return the partitions added between two dataset versions.
+
+    Parameters
+    ----------
+    old_version, new_version : str | tuple
+        Tokens from :meth:`S3ObjectCache.dataset_version`.
+
+    Returns
+    -------
+    list | None
+        Keys of the new partitions, or ``None`` if anything else changed
+        (an object was rewritten or removed) and a full reload is needed.
+    """
+    if old_version == new_version:
+        return []
+    if not (isinstance(old_version, tuple) and isinstance(new_version, tuple)):
+        return None
+    old, new = dict(old_version), dict(new_version)
+    if any(new.get(key) != etag for key, etag in old.items()):
+        return None
+    return sorted(key for key in new if key not in old)
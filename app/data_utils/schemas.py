@@ -0,0 +1,123 @@
+"""Columns and types read from each source dataset.
+
+Datasets are decoded with pyarrow rather than loaded whole into pandas and
+cast afterwards: only the columns listed here are read, numeric columns are
+cast to their compact types before conversion, and filter columns such as
+vessel types are decoded straight into categoricals from Parquet's
+dictionary pages. Rows outside the configured history window are dropped
+while reading, using the row group statistics where possible.
+"""
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Decode as a pandas categorical
+CATEGORY = "category"
+
+# Column -> pyarrow type to cast to, CATEGORY, or None to keep the stored type
+DATASET_SCHEMAS = {
+    "emissions": {
+        "year": pa.int16(),
+        "month": pa.int8(),
+        "resolution_id": None,
+        "StandardVesselType": CATEGORY,
+        "co2_equivalent_t": pa.float32(),
+    },
+    "waiting_times": {
+        "year": pa.int16(),
+        "month": pa.int8(),
+        "StandardVesselType": CATEGORY,
+        "stop_area": CATEGORY,
+        "waiting_time": None,
+        "service_time": None,
+        # Not aggregated, but listed in the explorer table and its download
+        "sample_size": None,
+        "neo_transit": None,
+    },
+    # Countries stay strings: their names are looked up before encoding
+    "energy": {
+        "year": pa.int16(),
+        "week": pa.int8(),
+        "country_before": None,
+        "country_after": None,
+        "sum_energy": None,
+    },
+}
+
+
+def dataset_schemas(weight_waiting_column=None):
+    """Return the emissions, waiting time and energy schemas, in that order.
+
+    Parameters
+    ----------
+    weight_waiting_column : str, optional
+        Waiting time column weighting the means, read even if not listed.
+    """
+    waiting = DATASET_SCHEMAS["waiting_times"]
+    if weight_waiting_column is not None:
+        waiting = {**waiting, weight_waiting_column: None}
+    return DATASET_SCHEMAS["emissions"], waiting, DATASET_SCHEMAS["energy"]
+
+
+def history_filter(start_year=None):
+    """Return the row filter keeping years from ``start_year`` on, if any."""
+    if start_year is None:
+        return None
+    return [("year", ">=", int(start_year))]
+
+
+def _cast(table, schema):
+    fields = [
+        field.with_type(schema[field.name])
+        if isinstance(schema.get(field.name), pa.DataType) else field
+        for field in table.schema
+    ]
+    return table.cast(pa.schema(fields, metadata=table.schema.metadata))
+
+
+def read_parquet_files(paths, schema=None, filters=None):
+    """Read Parquet files into one DataFrame.
+
+    Parameters
+    ----------
+    paths : list
+        Local files, or seekable binary file objects, holding the rows in
+        order.
+    schema : dict, optional
+        Columns to read, as in :data:`DATASET_SCHEMAS`. All columns with
+        their stored types by default.
+    filters : list, optional
+        Row filter in :func:`pyarrow.parquet.read_table` form, e.g. from
+        :func:`history_filter`.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Rows of every file. Categorical columns hold only the values
+        present, sorted, as ``astype("category")`` would produce.
+    """
+    schema = schema or {}
+    categories = [column for column, kind in schema.items() if kind == CATEGORY]
+    tables = []
+    for path in paths:
+        columns = None
+        if schema:
+            # Keep the stored column order
+            stored = pq.read_schema(path).names
+            missing = [column for column in schema if column not in stored]
+            if missing:
+                raise ValueError(f"{path} has no columns {missing}.")
+            columns = [column for column in stored if column in schema]
+        table = pq.read_table(
+            path, columns=columns, filters=filters, read_dictionary=categories or None
+        )
+        tables.append(_cast(table, schema))
+    table = pa.concat_tables(tables)
+    del tables
+    # Release the Arrow buffers column by column while converting
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    del table
+    for column in categories:
+        values = df[column].cat.remove_unused_categories()
+        df[column] = values.cat.reorder_categories(sorted(values.cat.categories))
+    return df
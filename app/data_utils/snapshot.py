@@ -0,0 +1,271 @@
+"""Offline build of the structures the app serves from.
+
+Running the preprocessing graph once, outside the web workers, and storing
+its results in a single file lets every worker start by loading that file
+instead of downloading and deriving everything again::
+
+    cd app && python -m data_utils.snapshot --output snapshots/serving.pkl
+
+The app loads it when ``SERVING_SNAPSHOT`` points to the file. Array data is
+memory-mapped, so gunicorn workers share a single copy of the datasets
+instead of holding one each. Snapshots are pickles: only load files produced
+by this command.
+"""
+
+import argparse
+import datetime
+import logging
+import mmap
+import os
+import pickle
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from data_utils.preprocessing import SERVING_KEYS, startup_tasks
+from data_utils.task_graph import run_task_graph
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of the serving structures changes
+SNAPSHOT_FORMAT = 7
+
+# Out-of-band buffers start on cache-line boundaries so mapped arrays are aligned
+_BUFFER_ALIGNMENT = 64
+
+
+def build_snapshot(read_emissions, read_waiting_times, read_energy,
+                   weight_waiting_column=None, max_workers=None, log=None, geometry=None):
+    """Run the preprocessing graph and keep the structures the app serves.
+
+    Parameters
+    ----------
+    read_emissions, read_waiting_times, read_energy : callable
+        Zero-argument functions returning the raw DataFrames.
+    weight_waiting_column : str, optional
+        Column weighting the waiting/service time means, if any.
+    max_workers : int, optional
+        Size of the thread pool.
+    log : callable, optional
+        Called as ``log(name, start_time)`` after each step.
+    geometry : data_utils.map_processing.CellGeometryCache, optional
+        Source of the H3 cell boundaries for the map.
+
+    Returns
+    -------
+    dict
+        Serving structures keyed by the names in ``SERVING_KEYS``.
+    """
+    results = run_task_graph(
+        startup_tasks(
+            read_emissions, read_waiting_times, read_energy, weight_waiting_column, geometry
+        ),
+        max_workers=max_workers,
+        log=log,
+    )
+    return {key: results[key] for key in SERVING_KEYS}
+
+
+def _atomic_write(path, write):
+    """Write a file under a temporary name and move it into place."""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_snapshot(state, path, options=None):
+    """Write serving structures to ``path``.
+
+    Array data (DataFrame blocks, cube arrays, index offsets) is written
+    out-of-band with pickle protocol 5 to a ``.buffers`` file next to
+    ``path``, aligned so it can be memory-mapped by :func:`load_snapshot`.
+    Both files are written under temporary names and moved into place, so
+    workers starting during a rebuild never see a partial snapshot.
+
+    Parameters
+    ----------
+    state : dict
+        Result of :func:`build_snapshot`.
+    path : str | pathlib.Path
+        Destination file.
+    options : dict, optional
+        Build options recorded in the snapshot and checked on load.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    buffers = []
+    body = pickle.dumps(state, protocol=5, buffer_callback=buffers.append)
+    spans = []
+    offset = 0
+    for buffer in buffers:
+        offset += -offset % _BUFFER_ALIGNMENT
+        spans.append((offset, buffer.raw().nbytes))
+        offset += buffer.raw().nbytes
+
+    def write_buffers(f):
+        for (start, _), buffer in zip(spans, buffers):
+            f.write(b"\0" * (start - f.tell()))
+            f.write(buffer.raw())
+
+    # A fresh name per build, so the files of earlier builds stay intact
+    buffers_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.buffers")
+    _atomic_write(buffers_path, write_buffers)
+
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "options": options or {},
+        "buffers_file": buffers_path.name,
+        "buffers": spans,
+    }
+
+    def write_pickle(f):
+        pickle.dump(header, f, protocol=5)
+        f.write(body)
+
+    replaced = _buffers_file(path)
+    _atomic_write(path, write_pickle)
+    # Workers may have read the header just replaced without opening its
+    # buffers yet, so that generation stays; older ones are only still
+    # open in workers that already mapped them, which keeps them alive
+    for stale in path.parent.glob(f"{path.name}.*.buffers"):
+        if stale.name not in (buffers_path.name, replaced):
+            stale.unlink(missing_ok=True)
+
+
+def _buffers_file(path):
+    """Return the name of the buffers file of the snapshot at ``path``, if any."""
+    try:
+        with open(path, "rb") as f:
+            header = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+    return header.get("buffers_file") if isinstance(header, dict) else None
+
+
+def load_snapshot(path, options=None):
+    """Load serving structures written by :func:`write_snapshot`.
+
+    The array data is memory-mapped read-only rather than copied, so every
+    worker loading the same snapshot shares one copy of it in the page
+    cache. Arrays come back read-only; the callbacks never modify them.
+
+    Parameters
+    ----------
+    path : str | pathlib.Path
+        Snapshot file.
+    options : dict, optional
+        Build options the caller expects; compared with the recorded ones.
+
+    Returns
+    -------
+    dict
+        Serving structures keyed by the names in ``SERVING_KEYS``.
+
+    Raises
+    ------
+    ValueError
+        If the snapshot format, build options or contents do not match.
+    """
+    path = Path(path)
+    with open(path, "rb") as f:
+        header = pickle.load(f)
+        if not isinstance(header, dict) or header.get("format") != SNAPSHOT_FORMAT:
+            found = header.get("format") if isinstance(header, dict) else None
+            raise ValueError(f"Snapshot format {found} does not match {SNAPSHOT_FORMAT}.")
+        if options is not None and header.get("options") != options:
+            raise ValueError(
+                f"Snapshot was built with {header.get('options')}, expected {options}."
+            )
+        buffers = []
+        if header["buffers"]:
+            with open(path.with_name(header["buffers_file"]), "rb") as buffers_file:
+                mapped = memoryview(mmap.mmap(buffers_file.fileno(), 0, access=mmap.ACCESS_READ))
+            buffers = [mapped[start:start + size] for start, size in header["buffers"]]
+        state = pickle.load(f, buffers=buffers)
+    missing = [key for key in SERVING_KEYS if key not in state]
+    if missing:
+        raise ValueError(f"Snapshot is missing {missing}.")
+    logger.info("Loaded serving snapshot %s built at %s", path, header.get("created_at"))
+    return state
+
+
+def main(argv=None):
+    """Build a snapshot from the datasets configured in the environment."""
+    import boto3
+    from dotenv import load_dotenv
+
+    from data_utils.map_processing import CellGeometryCache
+    from data_utils.s3_cache import S3ObjectCache
+    from data_utils.schemas import dataset_schemas, history_filter
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", required=True, help="Snapshot file to write.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    load_dotenv()
+
+    s3_client = boto3.client(
+        "s3",
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        endpoint_url=os.getenv("S3_ENDPOINT_URL") or None,
+    )
+    cache = S3ObjectCache(
+        s3_client,
+        os.getenv("S3_CACHE_DIR", str(Path(__file__).resolve().parent.parent / ".cache" / "s3"))
+        or None,
+    )
+    bucket = os.getenv("bucket_name")
+    weight_waiting_column = (
+        "sample_size"
+        if os.getenv("WEIGHT_WAITING_BY_SAMPLE_SIZE", "false").lower() == "true"
+        else None
+    )
+    start_year = int(os.getenv("DATA_START_YEAR")) if os.getenv("DATA_START_YEAR") else None
+    names = (
+        os.getenv("file_name_emissions"),
+        os.getenv("file_name_waiting"),
+        os.getenv("file_name_energy"),
+    )
+    schemas = dataset_schemas(weight_waiting_column)
+
+    def log(name, start_time):
+        logger.info("Step: %s | Time: %.2fs", name, time.time() - start_time)
+
+    start = time.time()
+    state = build_snapshot(
+        *(
+            lambda name=name, schema=schema: cache.read_dataset(
+                bucket, name, schema=schema, filters=history_filter(start_year)
+            )
+            for name, schema in zip(names, schemas)
+        ),
+        weight_waiting_column=weight_waiting_column,
+        max_workers=int(os.getenv("STARTUP_WORKERS", "4")),
+        log=log,
+        geometry=CellGeometryCache(
+            os.getenv(
+                "H3_GEOMETRY_CACHE",
+                str(Path(__file__).resolve().parent.parent / ".cache" / "h3_boundaries.npz"),
+            )
+            or None
+        ),
+    )
+    write_snapshot(state, args.output, options={
+        "weight_waiting_column": weight_waiting_column,
+        "start_year": start_year,
+    })
+    logger.info("Wrote %s in %.2fs", args.output, time.time() - start)
+
+
+if __name__ == "__main__":
+    main()
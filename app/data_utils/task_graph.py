@@ -0,0 +1,74 @@
+"""Run startup stages concurrently while respecting their dependencies."""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def run_task_graph(tasks, max_workers=None, log=None):
+    """Run a dependency graph of tasks in a thread pool.
+
+    A task is submitted as soon as every task it depends on has finished, so
+    independent branches (e.g. reading and preparing separate datasets)
+    overlap. Work dominated by I/O, Parquet decoding or numpy releases the
+    GIL and runs in parallel.
+
+    Parameters
+    ----------
+    tasks : dict
+        Maps a task name to ``(func, dependencies)``. ``func`` is called with
+        the results of ``dependencies`` as positional arguments, in order.
+    max_workers : int, optional
+        Size of the thread pool.
+    log : callable, optional
+        Called as ``log(name, start_time)`` when a task finishes, e.g.
+        ``log_step`` from ``app.py``.
+
+    Returns
+    -------
+    dict
+        Result of every task keyed by name.
+
+    Raises
+    ------
+    ValueError
+        If a dependency is unknown or the graph contains a cycle.
+    """
+    for name, (_, deps) in tasks.items():
+        unknown = [dep for dep in deps if dep not in tasks]
+        if unknown:
+            raise ValueError(f"Task {name!r} depends on unknown tasks {unknown}.")
+
+    results = {}
+    waiting = dict(tasks)
+    running = {}
+
+    def _timed(name, func, args):
+        start = time.time()
+        value = func(*args)
+        if log is not None:
+            log(name, start)
+        return value
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while waiting or running:
+            ready = [
+                name for name, (_, deps) in waiting.items()
+                if all(dep in results for dep in deps)
+            ]
+            for name in ready:
+                func, deps = waiting.pop(name)
+                args = [results[dep] for dep in deps]
+                running[executor.submit(_timed, name, func, args)] = name
+            if not running:
+                raise ValueError(f"Tasks {sorted(waiting)} form a dependency cycle.")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except BaseException:
+                    for pending in running:
+                        pending.cancel()
+                    raise
+    return results
@@ -486,6 +486,8 @@ def create_standard_chart_container(chart):
             type="circle",
             children=dcc.Graph(id=chart["id"], style={"height": "300px"})
         ),
+        # Structure of the figure shown, so refreshes can send patches
+        dcc.Store(id=f"{chart['id']}-structure"),
 
         dbc.Modal(
             [
@@ -682,6 +684,11 @@ def build_main_container_emissions():
     - Chart grid
     """
     return dbc.Col([
+        # View the emissions map last moved to a new H3 resolution, and the
+        # resolution it is drawn at with the zoom levels of the others. Kept
+        # in the tab so they start over with the map each time it is shown
+        dcc.Store(id="emissions--map-view", data=None),
+        dcc.Store(id="emissions--map-drawn", data=None),
         build_kpi_grid([
             {
                 "id": "emissions--kpi--1",
@@ -1033,6 +1040,8 @@ def build_main_layout_content():
         dcc.Store(id="energy--role-chart3", data="country_before"),
         dcc.Interval(id='footer-delay', interval=3000, n_intervals=0),
         dcc.Interval(id="initial-delay", interval=3000, n_intervals=0, max_intervals=1),
+        # Re-renders the tab while the datasets are still loading
+        dcc.Interval(id="data-loading-retry", interval=3000, n_intervals=0, disabled=True),
         build_tutorial_components(),
         # Navigation bar - always available
         html.Div(id="navigation-bar", children=build_navigation_bar()),
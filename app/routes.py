@@ -1,10 +1,36 @@
 """Additional routes for the Panama Canal Analytics app."""
 
-from flask import Response
+from flask import Response, abort, jsonify
 
+from data_utils.map_processing import GEOMETRY_URL_PREFIX
 
-def register_routes(app):
+
+def register_routes(app, data_registry):
     """Register additional routes with the Flask app."""
+
+    @app.server.route("/health")
+    def health():
+        """Report liveness and the dataset version being served."""
+        status = data_registry.status()
+        return jsonify(status="ok" if status["ready"] else "loading", data=status)
+
+    @app.server.route(GEOMETRY_URL_PREFIX + "<filename>")
+    def map_geometry(filename):
+        """Serve the H3 polygons of one level of the emissions map.
+
+        The file name carries a fingerprint of the contents, so browsers
+        can cache it for good and only fetch it again after new cells appear.
+        """
+        if not data_registry.ready:
+            abort(503)
+        resource = data_registry.current["map_pyramid"].find(filename)
+        if resource is None:
+            abort(404)
+        return Response(
+            resource.body,
+            mimetype="application/geo+json",
+            headers={"Cache-Control": "public, max-age=31536000, immutable"},
+        )
     
     @app.server.route("/privacy")
     def privacy():
@@ -0,0 +1,70 @@
+"""Shared fixtures: the app modules and small synthetic datasets.
+
+The app imports its modules relative to ``app/`` (``from data_utils import
+...``), as when it is started from that directory, so it is put on the path
+here.
+"""
+
+import os
+import sys
+
+import h3.api.basic_int as h3
+import numpy as np
+import pandas as pd
+import pytest
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+VESSEL_TYPES = ["Bulk Carrier", "Container", "Oil tanker", "Chemical tanker", "Yacht", "Ro-Ro"]
+STOP_AREAS = ["PPC Balboa", "MIT", "Panama Canal South Transit", "CCT", "Telfer"]
+COUNTRIES = ["US", "CN", "JP", "PA", "CL", "MX", "DE", "XK"]
+# Resolution 6 cells around the canal
+CELLS = sorted(h3.grid_disk(h3.latlng_to_cell(9.1, -79.7, 6), 2))
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+@pytest.fixture
+def raw_emissions(rng):
+    n = 2000
+    return pd.DataFrame({
+        "year": rng.integers(2022, 2025, n),
+        "month": rng.integers(1, 13, n),
+        "resolution_id": rng.choice(CELLS, n).astype("int64"),
+        "StandardVesselType": rng.choice(VESSEL_TYPES, n),
+        "co2_equivalent_t": rng.gamma(2.0, 50.0, n),
+    })
+
+
+@pytest.fixture
+def raw_waiting_times(rng):
+    n = 1500
+    waiting_time = rng.gamma(2.0, 20.0, n)
+    waiting_time[rng.random(n) < 0.05] = np.nan
+    return pd.DataFrame({
+        "year": rng.integers(2022, 2025, n),
+        "month": rng.integers(1, 13, n),
+        "StandardVesselType": rng.choice(VESSEL_TYPES, n),
+        "stop_area": rng.choice(STOP_AREAS, n),
+        "waiting_time": waiting_time,
+        "service_time": rng.gamma(2.0, 10.0, n),
+        "sample_size": rng.integers(1, 30, n),
+        "neo_transit": rng.integers(0, 2, n),
+    })
+
+
+@pytest.fixture
+def raw_energy(rng):
+    n = 2000
+    return pd.DataFrame({
+        "year": rng.integers(2022, 2025, n),
+        "week": rng.integers(1, 53, n),
+        "country_before": rng.choice(COUNTRIES, n),
+        "country_after": rng.choice(COUNTRIES, n),
+        "sum_energy": rng.gamma(2.0, 1e5, n),
+    })
@@ -0,0 +1,150 @@
+"""Chart figures against the ``go.Figure`` objects they stand in for.
+
+The chart functions write their figures as plain dicts (see
+``charts.figures``). Each one must be a valid ``go.Figure`` with the
+default template, and serialise byte for byte as the ``go.Figure``-based
+charts did, as recorded in ``expected_figures``. Run with
+``UPDATE_SNAPSHOTS=1`` to record a deliberate change of a chart.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+import pytest
+
+from charts import charts_emissions, charts_energy, charts_explorer, charts_waiting_times
+
+# The default template still styles the deprecated mapbox traces
+pytestmark = pytest.mark.filterwarnings("ignore:.*scattermapbox.*:DeprecationWarning")
+
+SNAPSHOTS = Path(__file__).parent / "expected_figures"
+
+MONTHS = pd.DataFrame(
+    [(year, month) for year in (2023, 2024) for month in range(1, 13)],
+    columns=["year", "month"],
+)
+YEAR_MONTHS = [202401 + month for month in range(12)]
+TYPES = ["Container", "Tanker", "Bulk carrier", "LNG", "Passenger"]
+COUNTRIES = ["US", "CN", "PA", "JP", "XK"]
+
+
+def by_year_month(column):
+    return MONTHS.assign(**{column: np.linspace(1.5e4, 4.2e4, len(MONTHS)) ** 1.1})
+
+
+def by_type(column, year_month_type=int):
+    rows = [(vessel_type, ym) for vessel_type in TYPES for ym in YEAR_MONTHS]
+    df = pd.DataFrame(rows, columns=["StandardVesselType", "year_month"])
+    df["year_month"] = df["year_month"].astype(year_month_type)
+    df[column] = (np.arange(len(df)) % 7 + 1) * (df.index // len(YEAR_MONTHS) + 1) * 10.5
+    return df
+
+
+def energy_flows():
+    rows = [(before, after) for before in COUNTRIES for after in COUNTRIES if before != after]
+    df = pd.DataFrame(rows, columns=["country_before", "country_after"])
+    df["sum_energy"] = np.arange(1, len(df) + 1) * 3.1e6
+    return df
+
+
+def energy_weeks():
+    weeks = pd.DataFrame(
+        [(year, week) for year in (2023, 2024) for week in range(1, 53)], columns=["year", "week"]
+    )
+    return weeks.assign(sum_energy=np.sin(np.arange(len(weeks))) * 1e7 + 5e7)
+
+
+CASES = {
+    "emissions_by_year_month": lambda: charts_emissions.plot_line_chart_emissions_by_year_month(
+        by_year_month("co2_equivalent_t")
+    ),
+    "emissions_by_year_month_empty": lambda: charts_emissions.plot_line_chart_emissions_by_year_month(
+        pd.DataFrame()
+    ),
+    "emissions_by_type": lambda: charts_emissions.plot_bar_chart_emissions_by_type(
+        pd.Series([4.2e5, 1.3e6, 8.8e4, 2.0e5], index=TYPES[:4])
+    ),
+    "emissions_by_type_year_month": lambda: charts_emissions.plot_line_chart_emissions_by_type_year_month(
+        by_type("co2_equivalent_t")
+    ),
+    "emissions_map": lambda: charts_emissions.plot_emissions_map(
+        "/assets/map.geojson",
+        pd.DataFrame({
+            "resolution_id": ["86...", "86..1", "86..2"],
+            "co2_equivalent_t": [12.5, 300.25, 4.0e4],
+        }),
+    ),
+    "energy_by_year_week": lambda: charts_energy.plot_line_chart_energy_demand_by_year_week(
+        energy_weeks()
+    ),
+    "energy_by_country": lambda: charts_energy.plot_bar_chart_energy_by_country(
+        energy_flows().groupby("country_before", as_index=False)["sum_energy"].sum()
+    ),
+    "energy_sankey": lambda: charts_energy.plot_sankey_before_after(energy_flows(), top_n=6),
+    "energy_bubble_map": lambda: charts_energy.generate_energy_bubble_map(energy_flows()),
+    "explorer_line": lambda: charts_explorer.plot_line_chart(
+        pd.DataFrame({
+            "date": pd.date_range("2024-01-01", periods=30, freq="D"),
+            "waiting_time": np.linspace(10, 40, 30),
+        }),
+        "waiting_time",
+    ),
+    "explorer_line_empty": lambda: charts_explorer.plot_line_chart(pd.DataFrame(), "waiting_time"),
+    "waiting_by_year_month": lambda: charts_waiting_times.plot_line_chart_waiting_time_by_year_month(
+        by_year_month("waiting_time")
+    ),
+    "waiting_by_stop_area": lambda: charts_waiting_times.plot_bar_chart_waiting_by_stop_area(
+        pd.DataFrame({"stop_area": ["Atlantic", "Pacific", "Gatun"], "waiting_time": [31.5, 22.0, 8.25]})
+    ),
+    "waiting_by_vessel_type": lambda: charts_waiting_times.plot_bar_chart_waiting_by_vessel_type(
+        pd.Series([31.5, 22.0, 8.25, 12.0], index=TYPES[:4])
+    ),
+    "waiting_by_type_week": lambda: charts_waiting_times.plot_line_chart_waiting_by_type_week(
+        by_type("waiting_time", str)
+    ),
+}
+
+
+def without_empty_objects(value):
+    """Return ``value`` without the empty objects plotly drops when validating."""
+    if isinstance(value, dict):
+        value = {key: without_empty_objects(item) for key, item in value.items()}
+        return {key: item for key, item in value.items() if item != {}}
+    if isinstance(value, list):
+        return [without_empty_objects(item) for item in value]
+    return value
+
+
+def serialise(fig):
+    """Return ``fig`` as plotly sends it, without the template."""
+    fig = fig.to_plotly_json() if isinstance(fig, go.Figure) else fig
+    return pio.to_json({**fig, "layout": {
+        key: value for key, value in fig["layout"].items() if key != "template"
+    }}, validate=False)
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_figure_is_a_valid_go_figure(name):
+    fig = CASES[name]()
+
+    assert isinstance(fig, dict)
+    assert fig["layout"]["template"] == go.Figure().to_plotly_json()["layout"]["template"]
+    # Validates every property on the way
+    expected = json.loads(pio.to_json(go.Figure(fig)))
+    assert without_empty_objects(json.loads(pio.to_json(fig, validate=False))) == expected
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_figure_matches_snapshot(name):
+    path = SNAPSHOTS / f"{name}.json"
+    if os.getenv("UPDATE_SNAPSHOTS"):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(serialise(CASES[name]()) + "\n")
+
+    # Byte for byte, so property order and array encoding match as well
+    assert serialise(CASES[name]()) + "\n" == path.read_text()
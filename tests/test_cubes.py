@@ -0,0 +1,235 @@
+"""Cube answers against groupbys over the raw rows they were built from."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_utils.cubes import EmissionsCube, EnergyFlowTensor, PrefixSumSeries, WaitingTimeCube
+from data_utils.preprocessing import (
+    energy_countries,
+    energy_country_names,
+    energy_year_month,
+    finalize_energy,
+    preprocess_emissions,
+    preprocess_energy,
+    preprocess_waiting_times,
+)
+
+SELECTED_VESSELS = ["Bulk Carrier", "Container", "Yacht"]
+SELECTED_AREAS = ["PPC Balboa", "CCT"]
+# Codes without a country name, such as XK, are listed by their code
+SELECTED_COUNTRIES = ["United States", "China", "Panama", "XK"]
+
+
+def prepare_energy(raw):
+    df = preprocess_energy(raw)
+    countries = energy_countries(df)
+    return finalize_energy(df, energy_year_month(df), energy_country_names(df, countries))
+
+
+def split(df, period, start):
+    """Split ``df`` into rows before and from ``start``."""
+    later = df[period] >= start
+    return df[~later].reset_index(drop=True), df[later].reset_index(drop=True)
+
+
+@pytest.fixture
+def emissions(raw_emissions):
+    return preprocess_emissions(raw_emissions)
+
+
+@pytest.fixture
+def waiting_times(raw_waiting_times):
+    return preprocess_waiting_times(raw_waiting_times)
+
+
+@pytest.fixture
+def energy(raw_energy):
+    return prepare_energy(raw_energy)
+
+
+def assert_emissions(cube, df):
+    rows = df[df["year_month"].between(202206, 202403)
+              & df["StandardVesselType"].isin(SELECTED_VESSELS)]
+    selection = cube.select(202206, 202403, SELECTED_VESSELS)
+    assert not selection.empty
+
+    assert selection.total() == pytest.approx(rows["co2_equivalent_t"].astype("float64").sum())
+
+    expected = rows.groupby(["year", "month"], as_index=False)["co2_equivalent_t"].sum()
+    actual = selection.by_year_month()
+    np.testing.assert_array_equal(actual["year"], expected["year"])
+    np.testing.assert_array_equal(actual["month"], expected["month"])
+    np.testing.assert_allclose(actual["co2_equivalent_t"], expected["co2_equivalent_t"], rtol=1e-5)
+
+    expected = rows.groupby("StandardVesselType", observed=True)["co2_equivalent_t"].sum()
+    actual = selection.by_vessel_type()
+    assert list(actual.index) == list(expected.index)
+    np.testing.assert_allclose(actual, expected, rtol=1e-5)
+
+    expected = (
+        rows.groupby(["StandardVesselType", "year_month"], as_index=False, observed=True)
+        ["co2_equivalent_t"].sum()
+    )
+    actual = selection.by_vessel_type_year_month()
+    assert list(actual["StandardVesselType"]) == list(expected["StandardVesselType"])
+    np.testing.assert_array_equal(actual["year_month"], expected["year_month"])
+    np.testing.assert_allclose(actual["co2_equivalent_t"], expected["co2_equivalent_t"], rtol=1e-5)
+
+    expected = rows.groupby("resolution_id")["co2_equivalent_t"].sum()
+    actual = selection.cells().groupby("resolution_id")["co2_equivalent_t"].sum()
+    np.testing.assert_array_equal(actual.index, expected.index)
+    np.testing.assert_allclose(actual, expected, rtol=1e-5)
+
+
+def test_emissions_cube(emissions):
+    assert_emissions(EmissionsCube(emissions), emissions)
+
+
+def test_emissions_cube_extended(emissions):
+    # The appended months bring a vessel type the cube has not seen
+    head, tail = split(emissions, "year_month", 202401)
+    head = head[head["StandardVesselType"] != "Yacht"]
+    cube = EmissionsCube(head).extended(tail)
+    assert_emissions(cube, pd.concat([head, tail], ignore_index=True))
+
+
+def test_emissions_cube_empty_selection(emissions):
+    selection = EmissionsCube(emissions).select(202206, 202403, [])
+    assert selection.empty
+    assert selection.total() == 0
+    assert selection.cells().empty
+
+
+def test_extended_rejects_overlapping_periods(emissions):
+    head, tail = split(emissions, "year_month", 202401)
+    with pytest.raises(ValueError):
+        EmissionsCube(tail).extended(head)
+
+
+def assert_waiting_times(cube, df, weight_column=None):
+    rows = df[df["year_month"].between(202206, 202403)
+              & df["StandardVesselType"].isin(SELECTED_VESSELS)
+              & df["stop_area"].isin(SELECTED_AREAS)]
+    selection = cube.select(202206, 202403, SELECTED_VESSELS, SELECTED_AREAS)
+    assert not selection.empty
+
+    def mean(group):
+        values = group[column]
+        weights = group[weight_column] if weight_column else pd.Series(1.0, index=group.index)
+        valid = values.notna()
+        with np.errstate(invalid="ignore"):
+            return (values[valid] * weights[valid]).sum() / weights[valid].sum()
+
+    for column in WaitingTimeCube.VALUE_COLUMNS:
+        if weight_column is None:
+            expected = rows.groupby(["year", "month"], as_index=False)[column].mean()
+        else:
+            expected = (
+                rows.groupby(["year", "month"]).apply(mean).rename(column).reset_index()
+            )
+        actual = selection.by_year_month(column)
+        np.testing.assert_array_equal(actual["year"], expected["year"])
+        np.testing.assert_array_equal(actual["month"], expected["month"])
+        np.testing.assert_allclose(actual[column], expected[column])
+
+        groups = rows.groupby("stop_area", observed=True)
+        expected = groups[column].mean() if weight_column is None else groups.apply(mean)
+        actual = selection.by_stop_area(column)
+        assert list(actual["stop_area"]) == list(expected.index)
+        np.testing.assert_allclose(actual[column], expected)
+
+        groups = rows.groupby("StandardVesselType", observed=True)
+        expected = groups[column].mean() if weight_column is None else groups.apply(mean)
+        actual = selection.by_vessel_type(column)
+        assert list(actual.index) == list(expected.index)
+        np.testing.assert_allclose(actual, expected)
+
+        groups = rows.groupby(["StandardVesselType", "year_month"], observed=True)
+        expected = groups[column].mean() if weight_column is None else groups.apply(mean)
+        actual = selection.by_vessel_type_year_month(column)
+        assert list(zip(actual["StandardVesselType"], actual["year_month"])) == list(expected.index)
+        np.testing.assert_allclose(actual[column], expected)
+
+
+@pytest.mark.parametrize("weight_column", [None, "sample_size"])
+def test_waiting_time_cube(waiting_times, weight_column):
+    cube = WaitingTimeCube(waiting_times, weight_column=weight_column)
+    assert_waiting_times(cube, waiting_times, weight_column)
+
+
+@pytest.mark.parametrize("weight_column", [None, "sample_size"])
+def test_waiting_time_cube_extended(waiting_times, weight_column):
+    head, tail = split(waiting_times, "year_month", 202401)
+    head = head[head["stop_area"] != "CCT"]
+    cube = WaitingTimeCube(head, weight_column=weight_column).extended(tail)
+    assert_waiting_times(cube, pd.concat([head, tail], ignore_index=True), weight_column)
+
+
+def assert_energy(tensor, df):
+    rows = df[df["year_week"].between(202210, 202430)
+              & df["country_before_name"].isin(SELECTED_COUNTRIES)
+              & df["country_after_name"].isin(SELECTED_COUNTRIES)]
+    selection = tensor.select(202210, 202430, SELECTED_COUNTRIES, SELECTED_COUNTRIES)
+    assert set(rows["country_before"]) == {"US", "CN", "PA", "XK"}
+
+    expected = rows.groupby(["year", "week"], as_index=False)["sum_energy"].sum()
+    actual = selection.by_year_week()
+    np.testing.assert_array_equal(actual["year"], expected["year"])
+    np.testing.assert_array_equal(actual["week"], expected["week"])
+    np.testing.assert_allclose(actual["sum_energy"], expected["sum_energy"])
+
+    for role in ("country_before", "country_after"):
+        expected = rows.groupby(role, observed=True)["sum_energy"].sum()
+        actual = selection.by_country(role)
+        assert list(actual[role]) == list(expected.index)
+        np.testing.assert_allclose(actual["sum_energy"], expected)
+
+        expected = rows.groupby(f"{role}_name", as_index=False)["sum_energy"].sum()
+        actual = selection.by_country_name(role)
+        assert list(actual[f"{role}_name"]) == list(expected[f"{role}_name"])
+        np.testing.assert_allclose(actual["sum_energy"], expected["sum_energy"])
+
+    expected = (
+        rows.groupby(["country_before_name", "country_after_name"])["sum_energy"].sum()
+        .sort_index()
+    )
+    actual = (
+        selection.flows()
+        .set_index(["country_before_name", "country_after_name"])["sum_energy"]
+        .sort_index()
+    )
+    assert list(actual.index) == list(expected.index)
+    np.testing.assert_allclose(actual, expected)
+
+
+def test_energy_flow_tensor(energy):
+    assert_energy(EnergyFlowTensor(energy), energy)
+
+
+def test_energy_flow_tensor_extended(raw_energy):
+    # XK only appears as an origin in the appended weeks
+    head, tail = split(raw_energy, "year", 2024)
+    head = head[head["country_before"] != "XK"]
+    head, tail = prepare_energy(head), prepare_energy(tail)
+    tensor = EnergyFlowTensor(head).extended(tail)
+    assert_energy(tensor, pd.concat([head, tail], ignore_index=True))
+
+
+@pytest.mark.parametrize("start, end", [(202201, 202412), (202206, 202403), (202501, 202512)])
+def test_prefix_sum_series(emissions, start, end):
+    head, tail = split(emissions, "year_month", 202401)
+    for series in (
+        PrefixSumSeries(emissions["year_month"], emissions["co2_equivalent_t"]),
+        PrefixSumSeries(head["year_month"], head["co2_equivalent_t"]).extended(
+            tail["year_month"], tail["co2_equivalent_t"]
+        ),
+    ):
+        rows = emissions[emissions["year_month"].between(start, end)]
+        expected = rows.groupby("year_month")["co2_equivalent_t"].sum()
+        periods, totals = series.series(start, end)
+        np.testing.assert_array_equal(periods, expected.index)
+        np.testing.assert_allclose(totals, expected, rtol=1e-5)
+        assert series.total(start, end) == pytest.approx(
+            rows["co2_equivalent_t"].astype("float64").sum()
+        )
@@ -0,0 +1,78 @@
+"""Figure updates sent as patches of the figure shown."""
+
+import copy
+
+import numpy as np
+from dash import Patch
+
+from charts.figures import figure, figure_structure, figure_update, trace
+
+
+def line_chart(years=(2023, 2024), scale=1.0, height=300, text=True):
+    traces = []
+    for year in years:
+        props = dict(x=np.arange(1, 13), y=np.arange(12.0) * scale, name=str(year),
+                     line=dict(color="blue"))
+        if text:
+            props["text"] = [f"{year}-{month:02d}" for month in range(1, 13)]
+        traces.append(trace("scatter", **props))
+    return figure(traces, layout=dict(margin=dict(l=0, r=0, t=0, b=0), height=height))
+
+
+def operations(patch):
+    return patch.to_plotly_json()["operations"]
+
+
+def apply(fig, patch):
+    """Return ``fig`` with the assignments of ``patch`` made."""
+    fig = copy.deepcopy(fig)
+    for operation in operations(patch):
+        assert operation["operation"] == "Assign"
+        *path, last = operation["location"]
+        target = fig
+        for key in path:
+            target = target[key]
+        target[last] = operation["params"]["value"]
+    return fig
+
+
+def test_unchanged_traces_patch_their_data_only():
+    shown = line_chart()
+    new = line_chart(scale=2.0, height=400)
+
+    patch, structure = figure_update(new, figure_structure(shown))
+
+    assert isinstance(patch, Patch)
+    assert [operation["location"] for operation in operations(patch)] == [
+        ["data", 0, "text"], ["data", 0, "x"], ["data", 0, "y"],
+        ["data", 1, "text"], ["data", 1, "x"], ["data", 1, "y"],
+        ["layout", "height"],
+    ]
+    assert apply(shown, patch) == new
+    assert structure == figure_structure(new)
+
+
+def test_changed_traces_are_replaced():
+    shown = line_chart()
+
+    patch, _ = figure_update(line_chart(years=(2023, 2025)), figure_structure(shown))
+    assert [operation["location"] for operation in operations(patch)] == [
+        ["data", 0, "text"], ["data", 0, "x"], ["data", 0, "y"], ["data", 1],
+    ]
+    assert apply(shown, patch) == line_chart(years=(2023, 2025))
+
+    # Dropping a data array changes the trace as well
+    patch, _ = figure_update(line_chart(text=False), figure_structure(shown))
+    assert [operation["location"] for operation in operations(patch)] == [["data", 0], ["data", 1]]
+    assert apply(shown, patch) == line_chart(text=False)
+
+
+def test_other_figures_are_sent_whole():
+    shown = figure_structure(line_chart())
+    for new in (
+        line_chart(years=(2024,)),
+        figure(line_chart()["data"], layout=dict(height=300)),
+        figure(),
+    ):
+        assert figure_update(new, shown) == (new, figure_structure(new))
+    assert figure_update(line_chart(), None)[0] == line_chart()
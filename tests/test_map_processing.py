@@ -0,0 +1,118 @@
+"""H3 cell geometry, its disk cache and the map pyramid."""
+
+import h3.api.basic_int as h3
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import CELLS
+from data_utils.map_processing import MIN_HEXAGON_PIXELS, CellGeometryCache, MapPyramid
+
+
+def rings(offsets, coords):
+    return [coords[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def test_boundaries_match_h3():
+    # A pentagon and a cell crossing an icosahedron edge have more vertices
+    cells = [*CELLS, h3.get_pentagons(3)[0], 0x81017ffffffffff]
+    offsets, coords = CellGeometryCache().boundaries(cells)
+
+    assert len(offsets) == len(cells) + 1
+    for cell, ring in zip(cells, rings(offsets, coords)):
+        np.testing.assert_array_equal(ring[:, ::-1], np.array(h3.cell_to_boundary(cell)))
+
+
+def test_boundaries_are_kept_on_disk(tmp_path, monkeypatch):
+    path = tmp_path / "boundaries.npz"
+    expected = CellGeometryCache(path).boundaries(CELLS[:10])
+
+    # A new cache computes only the cells the file does not hold
+    computed = []
+    monkeypatch.setattr(
+        "data_utils.map_processing.cell_to_boundary",
+        lambda cell: computed.append(cell) or h3.cell_to_boundary(cell),
+    )
+    cache = CellGeometryCache(path)
+    offsets, coords = cache.boundaries(CELLS[:10][::-1])
+    assert computed == []
+    for ring, expected_ring in zip(rings(offsets, coords), rings(*expected)[::-1]):
+        np.testing.assert_array_equal(ring, expected_ring)
+
+    cache.boundaries(CELLS)
+    assert sorted(computed) == sorted(CELLS[10:])
+    np.testing.assert_array_equal(CellGeometryCache(path).cells, np.sort(CELLS))
+
+
+def test_pyramid_aggregates_to_parents():
+    pyramid = MapPyramid(CELLS)
+    df = pd.DataFrame({"resolution_id": CELLS * 2, "co2_equivalent_t": np.arange(2.0 * len(CELLS))})
+
+    assert pyramid.resolutions == [6, 5, 4, 3]
+    for resolution in pyramid.resolutions:
+        parents = [h3.cell_to_parent(cell, resolution) for cell in df["resolution_id"]]
+        expected = df.groupby(pd.Series(parents, name="resolution_id"))["co2_equivalent_t"].sum()
+        actual = pyramid.aggregate(df, resolution).set_index("resolution_id")["co2_equivalent_t"]
+        pd.testing.assert_series_equal(actual, expected)
+
+
+def test_resolution_for_zoom():
+    pyramid = MapPyramid(CELLS)
+    assert pyramid.resolution_for_zoom(0) == 3
+    assert pyramid.resolution_for_zoom(12, latitude=9) == 6
+    zooms = np.linspace(0, 14, 57)
+    resolutions = [pyramid.resolution_for_zoom(zoom, latitude=9) for zoom in zooms]
+    assert resolutions == sorted(resolutions)
+
+
+def test_zoom_levels_follow_hexagon_width():
+    pyramid = MapPyramid(CELLS)
+    levels = pyramid.zoom_levels()
+    assert [resolution for resolution, _ in levels] == pyramid.resolutions
+    for resolution, zoom in levels:
+        # Metres per pixel of Web Mercator at the equator
+        width = 2 * h3.average_hexagon_edge_length(resolution, unit="m") * 2 ** zoom / 156543.03
+        assert width == pytest.approx(MIN_HEXAGON_PIXELS)
+        assert pyramid.resolution_for_zoom(zoom + 0.01) == resolution
+
+
+def test_parents_are_looked_up_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        "data_utils.map_processing.cell_to_parent",
+        lambda cell, resolution: calls.append((cell, resolution)) or h3.cell_to_parent(cell, resolution),
+    )
+    MapPyramid(CELLS)
+    assert len(calls) == len(set(calls))
+
+
+def test_extended_pyramid_matches_a_full_build(monkeypatch):
+    # Cells around the canal, then more to the east sharing the coarsest parent
+    east = sorted(set(h3.grid_disk(h3.latlng_to_cell(9.1, -79.4, 6), 3)) - set(CELLS))
+    pyramid = MapPyramid(CELLS)
+    full = MapPyramid(CELLS + east)
+    computed = []
+    monkeypatch.setattr(
+        "data_utils.map_processing.cell_to_boundary",
+        lambda cell: computed.append(cell) or h3.cell_to_boundary(cell),
+    )
+
+    extended = pyramid.extended(CELLS[:5] + east)
+
+    assert pyramid.extended(CELLS) is pyramid
+    np.testing.assert_array_equal(extended.cells, full.cells)
+    assert extended.resources[3] is pyramid.resources[3]
+    for resolution in full.resolutions:
+        np.testing.assert_array_equal(extended._parents[resolution], full._parents[resolution])
+        assert extended.resources[resolution].body == full.resources[resolution].body
+        # Only levels that gained cells get a new URL
+        gained = not set(full._parents[resolution]) <= set(pyramid._parents[resolution])
+        assert (extended.resources[resolution] is not pyramid.resources[resolution]) == gained
+    # Polygons are only computed for the new parents
+    new_parents = [
+        set(full._parents[resolution]) - set(pyramid._parents[resolution])
+        for resolution in full.resolutions
+    ]
+    assert sorted(computed) == sorted(set().union(*new_parents))
+    df = pd.DataFrame({"resolution_id": east, "co2_equivalent_t": 1.0})
+    pd.testing.assert_frame_equal(extended.aggregate(df, 4), full.aggregate(df, 4))
@@ -0,0 +1,56 @@
+"""Vectorised period conversions against the per-row ``datetime`` ones."""
+
+import datetime
+
+import numpy as np
+import pytest
+
+from data_utils.periods import (
+    iso_week_monday,
+    iso_week_month,
+    year_month,
+    year_week,
+    year_week_to_month,
+)
+
+YEARS = range(1990, 2041)
+
+
+def iso_weeks():
+    """Every ISO ``(year, week)`` of :data:`YEARS`."""
+    return [
+        (year, week)
+        for year in YEARS
+        for week in range(1, datetime.date(year, 12, 28).isocalendar()[1] + 1)
+    ]
+
+
+def test_iso_week_monday_matches_fromisocalendar():
+    years, weeks = np.array(iso_weeks()).T
+    expected = [datetime.date.fromisocalendar(year, week, 1) for year, week in iso_weeks()]
+    np.testing.assert_array_equal(
+        iso_week_monday(years, weeks), np.array(expected, dtype="datetime64[D]")
+    )
+
+
+def test_iso_week_month_matches_per_row_conversion():
+    years, weeks = np.array(iso_weeks()).T
+    expected = [
+        int(datetime.date.fromisocalendar(year, week, 1).strftime("%Y%m"))
+        for year, week in iso_weeks()
+    ]
+    np.testing.assert_array_equal(iso_week_month(years, weeks), expected)
+    np.testing.assert_array_equal(year_week_to_month(year_week(years, weeks)), expected)
+
+
+@pytest.mark.parametrize("year, week", [(2021, 53), (2020, 54), (2024, 0)])
+def test_iso_week_monday_rejects_missing_weeks(year, week):
+    with pytest.raises(ValueError):
+        datetime.date.fromisocalendar(year, week, 1)
+    with pytest.raises(ValueError):
+        iso_week_monday([2020, year], [1, week])
+
+
+def test_year_month_and_year_week():
+    np.testing.assert_array_equal(year_month([2023, 2024], [1, 12]), [202301, 202412])
+    np.testing.assert_array_equal(year_week([2020, 2024], [53, 1]), [202053, 202401])
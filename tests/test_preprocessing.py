@@ -0,0 +1,121 @@
+"""Incremental ``extend_state`` against a full rebuild over the combined rows."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_utils.preprocessing import extend_state
+from data_utils.snapshot import build_snapshot
+
+
+def split(df, later):
+    return df[~later].reset_index(drop=True), df[later].reset_index(drop=True)
+
+
+@pytest.fixture
+def states(raw_emissions, raw_waiting_times, raw_energy):
+    """Full rebuild and history extended with the appended rows."""
+    emissions = split(raw_emissions, (raw_emissions["year"] == 2024) & (raw_emissions["month"] >= 6))
+    waiting = split(
+        raw_waiting_times, (raw_waiting_times["year"] == 2024) & (raw_waiting_times["month"] >= 6)
+    )
+    energy = split(raw_energy, (raw_energy["year"] == 2024) & (raw_energy["week"] >= 30))
+    # The appended rows bring a new vessel type, stop area, origin and H3 cells
+    history = (
+        emissions[0][~emissions[0]["StandardVesselType"].eq("Yacht")
+                     & emissions[0]["resolution_id"].ne(emissions[1]["resolution_id"].iloc[0])],
+        waiting[0][waiting[0]["stop_area"] != "CCT"],
+        energy[0][energy[0]["country_before"] != "XK"],
+    )
+    full = build_snapshot(
+        *(lambda old=old, new=new: pd.concat([old, new], ignore_index=True)
+          for old, (_, new) in zip(history, (emissions, waiting, energy))),
+        weight_waiting_column="sample_size",
+    )
+    base = build_snapshot(
+        *(lambda old=old: old.copy() for old in history),
+        weight_waiting_column="sample_size",
+    )
+    extended = extend_state(base, emissions[1].copy(), waiting[1].copy(), energy[1].copy())
+    return full, extended
+
+
+def test_extend_state_frames(states):
+    full, extended = states
+    columns = list(full["emissions"].columns)
+    # Emissions are not sorted stably, so rows within a month may move
+    pd.testing.assert_frame_equal(
+        full["emissions"].sort_values(columns).reset_index(drop=True),
+        extended["emissions"].sort_values(columns).reset_index(drop=True),
+    )
+    for name in ("waiting_times", "energy"):
+        pd.testing.assert_frame_equal(full[name], extended[name])
+
+
+def test_extend_state_controls(states):
+    full, extended = states
+    for name in ("controls_emissions", "controls_waiting_times", "controls_energy",
+                 "controls_explorer"):
+        assert extended[name] == full[name], name
+
+
+def test_extend_state_cubes(states):
+    full, extended = states
+    vessel_types = full["controls_emissions"]["vessel_types"]
+    for start, end in ((202201, 202412), (202403, 202409)):
+        expected = full["emissions_cube"].select(start, end, vessel_types)
+        actual = extended["emissions_cube"].select(start, end, vessel_types)
+        pd.testing.assert_frame_equal(actual.by_year_month(), expected.by_year_month())
+        pd.testing.assert_series_equal(actual.by_vessel_type(), expected.by_vessel_type())
+        pd.testing.assert_frame_equal(
+            actual.by_vessel_type_year_month(), expected.by_vessel_type_year_month()
+        )
+
+        controls = full["controls_waiting_times"]
+        expected = full["waiting_cube"].select(
+            start, end, controls["vessel_types"], controls["stop_area"]
+        )
+        actual = extended["waiting_cube"].select(
+            start, end, controls["vessel_types"], controls["stop_area"]
+        )
+        for column in ("waiting_time", "service_time"):
+            pd.testing.assert_frame_equal(
+                actual.by_year_month(column), expected.by_year_month(column)
+            )
+            pd.testing.assert_frame_equal(actual.by_stop_area(column), expected.by_stop_area(column))
+
+    controls = full["controls_energy"]
+    for start, end in ((202201, 202452), (202420, 202440)):
+        expected = full["energy_tensor"].select(
+            start, end, controls["country_before"], controls["country_after"]
+        )
+        actual = extended["energy_tensor"].select(
+            start, end, controls["country_before"], controls["country_after"]
+        )
+        pd.testing.assert_frame_equal(actual.by_year_week(), expected.by_year_week())
+        pd.testing.assert_frame_equal(actual.flows(), expected.flows())
+
+
+def test_extend_state_series_and_indexes(states):
+    full, extended = states
+    for name, series in full["explorer_series"].items():
+        np.testing.assert_array_equal(extended["explorer_series"][name].periods, series.periods)
+        np.testing.assert_allclose(extended["explorer_series"][name].cumulative, series.cumulative)
+    for dataset, columns in full["indexes"].items():
+        for column, index in columns.items():
+            np.testing.assert_array_equal(extended["indexes"][dataset][column].keys, index.keys)
+            np.testing.assert_array_equal(
+                extended["indexes"][dataset][column].offsets, index.offsets
+            )
+
+
+def test_extend_state_map(states):
+    full, extended = states
+    assert sorted(extended["map_pyramid"].cells) == sorted(full["map_pyramid"].cells)
+    assert extended["map_pyramid"].resolutions == full["map_pyramid"].resolutions
+
+
+def test_extend_state_rejects_loaded_periods(states, raw_emissions):
+    _, extended = states
+    with pytest.raises(ValueError):
+        extend_state(extended, emissions=raw_emissions.copy())
@@ -0,0 +1,108 @@
+"""Background loading and reloading of the serving structures."""
+
+import os
+import threading
+import time
+
+import pytest
+
+from data_utils.registry import DataNotReady, DataRegistry
+
+
+class Source:
+    """Versioned stand-in for the datasets."""
+
+    def __init__(self):
+        self.version = 1
+        self.loads = 0
+
+    def probe(self):
+        return self.version
+
+    def load(self, previous, version):
+        self.loads += 1
+        return {"version": version}
+
+
+def test_first_load_waits_for_start():
+    source = Source()
+    registry = DataRegistry(probe=source.probe, loader=source.load, wait_timeout=0.05)
+    with pytest.raises(DataNotReady):
+        registry.current
+    registry.start()
+    assert registry.wait_ready(5)
+    assert registry.current["version"] == 1
+    registry.stop()
+
+
+def test_start_twice_starts_one_thread():
+    source = Source()
+    registry = DataRegistry(probe=source.probe, loader=source.load, poll_interval=60)
+    threads = [threading.Thread(target=registry.start) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert registry.wait_ready(5)
+    registry.stop()
+    assert source.loads == 1
+
+
+def test_reload_swaps_changed_versions():
+    source = Source()
+    registry = DataRegistry({"version": 1}, 1, probe=source.probe, loader=source.load)
+    assert not registry.reload()
+    source.version = 2
+    assert registry.reload()
+    assert registry.current["version"] == 2
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_child_polls_for_itself():
+    source = Source()
+    registry = DataRegistry(probe=source.probe, loader=source.load, poll_interval=0.01)
+    registry.start()
+    assert registry.wait_ready(5)
+    parent_thread = registry._thread
+
+    pid = os.fork()
+    if pid == 0:
+        # Keep the version loaded before the fork and start a poller on demand
+        ok = registry.current["version"] == 1 and registry._thread is None
+        source.version = 2
+        registry.start()
+        for _ in range(500):
+            if registry.current["version"] == 2:
+                break
+            time.sleep(0.01)
+        ok = ok and registry.current["version"] == 2
+        os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+
+    # The parent keeps polling until told to stop
+    assert registry._thread is parent_thread and parent_thread.is_alive()
+    registry.stop()
+    parent_thread.join(5)
+    assert not parent_thread.is_alive()
+
+
+def test_stopped_registry_polls_again_on_start():
+    source = Source()
+    registry = DataRegistry(probe=source.probe, loader=source.load, poll_interval=0.01)
+    registry.start()
+    assert registry.wait_ready(5)
+    first_thread = registry._thread
+    registry.stop()
+    first_thread.join(5)
+    assert not first_thread.is_alive()
+
+    registry.start()
+    source.version = 2
+    for _ in range(500):
+        if registry.current["version"] == 2:
+            break
+        time.sleep(0.01)
+    assert registry.current["version"] == 2
+    assert registry._thread is not first_thread and registry._thread.is_alive()
+    registry.stop()
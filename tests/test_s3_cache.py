@@ -0,0 +1,180 @@
+"""S3 access through the disk cache and ranged reads, against moto's S3."""
+
+import io
+import json
+
+import boto3
+import numpy as np
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+from data_utils.s3_cache import S3ObjectCache, S3RangeReader
+from data_utils.schemas import dataset_schemas
+
+BUCKET = "canal-data"
+KEY = "emissions.parquet"
+
+
+class RecordingClient:
+    """S3 client recording the arguments and outcome of each ``get_object``."""
+
+    def __init__(self, client):
+        self.client = client
+        self.gets = []
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def get_object(self, **request):
+        try:
+            response = self.client.get_object(**request)
+        except ClientError as error:
+            self.gets.append((request, error.response["ResponseMetadata"]["HTTPStatusCode"]))
+            raise
+        self.gets.append((request, response["ResponseMetadata"]["HTTPStatusCode"]))
+        return response
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield RecordingClient(client)
+
+
+@pytest.fixture
+def cache(s3, tmp_path):
+    return S3ObjectCache(s3, tmp_path)
+
+
+def test_first_fetch_downloads(s3, cache):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b"first version")
+    path = cache.fetch(BUCKET, KEY)
+
+    assert path.read_bytes() == b"first version"
+    [(request, status)] = s3.gets
+    assert "IfNoneMatch" not in request
+    assert status == 200
+    _, meta_path = cache.paths(BUCKET, KEY)
+    assert json.loads(meta_path.read_text())["ETag"] == s3.head_object(Bucket=BUCKET, Key=KEY)["ETag"]
+
+
+def test_unchanged_object_is_reused(s3, cache):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b"first version")
+    etag = s3.head_object(Bucket=BUCKET, Key=KEY)["ETag"]
+    cache.fetch(BUCKET, KEY)
+    path = cache.fetch(BUCKET, KEY)
+
+    assert path.read_bytes() == b"first version"
+    request, status = s3.gets[-1]
+    assert request["IfNoneMatch"] == etag
+    assert status == 304
+
+
+def test_changed_object_is_fetched_again(s3, cache):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b"first version")
+    cache.fetch(BUCKET, KEY)
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b"second version")
+    path = cache.fetch(BUCKET, KEY)
+
+    assert path.read_bytes() == b"second version"
+    assert s3.gets[-1][1] == 200
+    _, meta_path = cache.paths(BUCKET, KEY)
+    assert json.loads(meta_path.read_text())["ETag"] == s3.head_object(Bucket=BUCKET, Key=KEY)["ETag"]
+
+
+@pytest.mark.parametrize("damage", [
+    lambda data_path, meta_path: data_path.write_bytes(b"first versioX"),
+    lambda data_path, meta_path: data_path.write_bytes(b"first"),
+    lambda data_path, meta_path: meta_path.write_text("{not json"),
+    lambda data_path, meta_path: meta_path.unlink(),
+])
+def test_damaged_cache_entry_is_fetched_again(s3, cache, damage):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b"first version")
+    cache.fetch(BUCKET, KEY)
+    damage(*cache.paths(BUCKET, KEY))
+    path = cache.fetch(BUCKET, KEY)
+
+    assert path.read_bytes() == b"first version"
+    request, status = s3.gets[-1]
+    assert "IfNoneMatch" not in request
+    assert status == 200
+    # The entry is intact again, so the next fetch revalidates it
+    cache.fetch(BUCKET, KEY)
+    assert s3.gets[-1][1] == 304
+
+
+def test_cached_copy_is_used_when_s3_fails(s3, cache):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b"first version")
+    cache.fetch(BUCKET, KEY)
+    s3.delete_object(Bucket=BUCKET, Key=KEY)
+
+    assert cache.fetch(BUCKET, KEY).read_bytes() == b"first version"
+
+
+def test_damaged_copy_is_not_used_when_s3_fails(s3, cache):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b"first version")
+    cache.fetch(BUCKET, KEY)
+    s3.delete_object(Bucket=BUCKET, Key=KEY)
+    data_path, _ = cache.paths(BUCKET, KEY)
+    data_path.write_bytes(b"first")
+
+    with pytest.raises(ClientError):
+        cache.fetch(BUCKET, KEY)
+
+
+def test_range_reader_reads_byte_ranges(s3):
+    body = bytes(range(256)) * 40
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=body)
+    etag = s3.head_object(Bucket=BUCKET, Key=KEY)["ETag"]
+    reader = S3RangeReader(s3, BUCKET, KEY)
+
+    assert reader.size == len(body)
+    reader.seek(-100, io.SEEK_END)
+    assert reader.read(1000) == body[-100:]
+    reader.seek(1000)
+    assert reader.read(24) == body[1000:1024]
+    assert reader.tell() == 1024
+    assert reader.read(0) == b""
+    reader.seek(len(body))
+    assert reader.read(10) == b""
+
+    assert [request["Range"] for request, _ in s3.gets] == [
+        f"bytes={len(body) - 100}-{len(body) - 1}",
+        "bytes=1000-1023",
+    ]
+    assert all(request["IfMatch"] == etag for request, _ in s3.gets)
+    assert all(status == 206 for _, status in s3.gets)
+
+
+def test_range_reader_fails_when_the_object_changes(s3):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b"first version")
+    reader = S3RangeReader(s3, BUCKET, KEY)
+    assert reader.read(5) == b"first"
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b"second version")
+
+    with pytest.raises(ClientError) as error:
+        reader.read(5)
+    assert error.value.response["ResponseMetadata"]["HTTPStatusCode"] == 412
+
+
+def test_dataset_is_read_in_place_without_a_cache(s3, raw_emissions):
+    prefix = "emissions/"
+    for year_month, rows in raw_emissions.groupby(["year", "month"]):
+        body = io.BytesIO()
+        rows.to_parquet(body, index=False)
+        s3.put_object(Bucket=BUCKET, Key=f"{prefix}{year_month[0]}{year_month[1]:02d}.parquet",
+                      Body=body.getvalue())
+    cache = S3ObjectCache(s3)
+    cache.range_buffer_size = 4096
+    schema, _, _ = dataset_schemas()
+
+    df = cache.read_dataset(BUCKET, prefix, schema=schema)
+
+    expected = raw_emissions.sort_values(["year", "month"], kind="stable").reset_index(drop=True)
+    assert len(df) == len(expected)
+    np.testing.assert_array_equal(df["resolution_id"], expected["resolution_id"])
+    np.testing.assert_allclose(df["co2_equivalent_t"], expected["co2_equivalent_t"], rtol=1e-6)
+    assert all("Range" in request for request, _ in s3.gets)
@@ -0,0 +1,32 @@
+"""Schema-driven Parquet reads."""
+
+import pandas as pd
+
+from data_utils.schemas import dataset_schemas, history_filter, read_parquet_files
+
+
+def test_waiting_times_keep_the_explorer_columns(raw_waiting_times, tmp_path):
+    path = tmp_path / "waiting.parquet"
+    raw_waiting_times.assign(unused=1.0).to_parquet(path, index=False)
+    _, schema, _ = dataset_schemas()
+
+    df = read_parquet_files([path], schema=schema)
+
+    # Stored order, without the columns missing from the schema
+    assert list(df.columns) == list(raw_waiting_times.columns)
+    assert df["year"].dtype == "int16"
+    assert isinstance(df["stop_area"].dtype, pd.CategoricalDtype)
+    assert list(df["stop_area"].cat.categories) == sorted(raw_waiting_times["stop_area"].unique())
+    pd.testing.assert_series_equal(df["sample_size"], raw_waiting_times["sample_size"])
+    pd.testing.assert_series_equal(df["neo_transit"], raw_waiting_times["neo_transit"])
+
+
+def test_history_filter(raw_emissions, tmp_path):
+    path = tmp_path / "emissions.parquet"
+    raw_emissions.to_parquet(path, index=False)
+    schema, _, _ = dataset_schemas()
+
+    df = read_parquet_files([path], schema=schema, filters=history_filter(2023))
+
+    assert len(df) == (raw_emissions["year"] >= 2023).sum()
+    assert df["year"].min() == 2023
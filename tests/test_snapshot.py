@@ -0,0 +1,45 @@
+"""Snapshot files and their memory-mapped buffers."""
+
+import pickle
+
+import numpy as np
+
+from data_utils.preprocessing import SERVING_KEYS
+from data_utils.snapshot import load_snapshot, write_snapshot
+
+
+def serving_state(value):
+    return {key: np.full(100, value, dtype="float64") for key in SERVING_KEYS}
+
+
+def buffers_files(path):
+    return sorted(stale.name for stale in path.parent.glob(f"{path.name}.*.buffers"))
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = tmp_path / "serving.pkl"
+    write_snapshot(serving_state(1.0), path, {"weight": None})
+
+    state = load_snapshot(path, {"weight": None})
+
+    for key in SERVING_KEYS:
+        np.testing.assert_array_equal(state[key], np.full(100, 1.0))
+        assert not state[key].flags.writeable
+
+
+def test_rebuild_keeps_the_buffers_of_the_replaced_snapshot(tmp_path):
+    path = tmp_path / "serving.pkl"
+    write_snapshot(serving_state(1.0), path)
+    # A worker has read the header but not opened the buffers yet
+    with open(path, "rb") as f:
+        first = pickle.load(f)["buffers_file"]
+
+    write_snapshot(serving_state(2.0), path)
+    with open(path, "rb") as f:
+        second = pickle.load(f)["buffers_file"]
+    assert buffers_files(path) == sorted([first, second])
+
+    write_snapshot(serving_state(3.0), path)
+    assert second in buffers_files(path) and first not in buffers_files(path)
+    assert len(buffers_files(path)) == 2
+    np.testing.assert_array_equal(load_snapshot(path)[SERVING_KEYS[0]], np.full(100, 3.0))